@@ -0,0 +1,63 @@
+// Gera o subconjunto dos ícones Font Awesome (solid) usados nos templates:
+// vmm/static/vmm/webfonts/fa-solid-900.woff2 e vmm/static/vmm/css/icones.css.
+import { readFileSync, readdirSync, writeFileSync, mkdirSync } from 'node:fs';
+import { join } from 'node:path';
+import { createRequire } from 'node:module';
+import { fontawesomeSubset } from 'fontawesome-subset';
+
+const require = createRequire(import.meta.url);
+const metadados = require('@fortawesome/fontawesome-free/metadata/icons.json');
+
+const PASTAS = ['templates', 'vmm/templates'];
+const DESTINO_CSS = 'vmm/static/vmm/css/icones.css';
+const DESTINO_FONTES = 'vmm/static/vmm/webfonts';
+const CLASSES_ESTILO = new Set(['solid', 'regular', 'brands', 'fw']);
+
+// Nome usado no template (inclusive apelidos do FA5, como fa-times) -> ícone canônico
+const canonicos = {};
+for (const [nome, icone] of Object.entries(metadados)) {
+  if (!icone.styles.includes('solid')) continue;
+  canonicos[nome] = nome;
+  for (const apelido of icone.aliases?.names ?? []) canonicos[apelido] = nome;
+}
+
+const usados = new Set();
+for (const pasta of PASTAS) {
+  for (const arquivo of readdirSync(pasta, { recursive: true })) {
+    if (!arquivo.endsWith('.html')) continue;
+    const texto = readFileSync(join(pasta, arquivo), 'utf-8');
+    for (const [, nome] of texto.matchAll(/\bfa-([a-z0-9-]+)/g)) {
+      if (!CLASSES_ESTILO.has(nome)) usados.add(nome);
+    }
+  }
+}
+
+const desconhecidos = [...usados].filter((nome) => !canonicos[nome]);
+if (desconhecidos.length) {
+  console.error(`Ícones inexistentes no Font Awesome Free (solid): ${desconhecidos.join(', ')}`);
+  process.exit(1);
+}
+
+const regras = [...usados].sort().map((nome) => {
+  const unicode = metadados[canonicos[nome]].unicode;
+  return `.fa-${nome}::before{content:"\\${unicode}"}`;
+});
+
+mkdirSync(DESTINO_FONTES, { recursive: true });
+await fontawesomeSubset(
+  { solid: [...new Set([...usados].map((nome) => canonicos[nome]))] },
+  DESTINO_FONTES,
+  { package: 'free', targetFormats: ['woff2'] },
+);
+
+writeFileSync(DESTINO_CSS, [
+  '@font-face{font-family:"Font Awesome 6 Free";font-style:normal;font-weight:900;font-display:block;'
+    + 'src:url("../webfonts/fa-solid-900.woff2") format("woff2")}',
+  '.fa-solid{-moz-osx-font-smoothing:grayscale;-webkit-font-smoothing:antialiased;display:inline-block;'
+    + 'font-style:normal;font-variant:normal;line-height:1;text-rendering:auto;'
+    + 'font-family:"Font Awesome 6 Free";font-weight:900}',
+  ...regras,
+  '',
+].join('\n'));
+
+console.log(`${usados.size} ícones em ${DESTINO_CSS}`);
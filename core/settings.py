@@ -3,6 +3,8 @@ from pathlib import Path
 import environ
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -10,8 +12,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
+env = environ.Env()
+environ.Env.read_env(os.path.join(BASE_DIR, '.env'))
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-kjr6#ucx&5g46khzswkhpe#-@+0l7!vrs(%1z^nrk=8fx&6oz*'
+SECRET_KEY = env('SECRET_KEY', default='django-insecure-kjr6#ucx&5g46khzswkhpe#-@+0l7!vrs(%1z^nrk=8fx&6oz*')
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
@@ -64,9 +69,6 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-env = environ.Env()
-environ.Env.read_env(os.path.join(BASE_DIR, '.env'))
-
 DATABASES = {
     'default': {
         'ENGINE': env('DB_ENGINE'),
@@ -81,6 +83,63 @@ DATABASES = {
     }
 }
 
+# Cache (relatórios, estatísticas e sessões em cached_db). Com mais de um
+# processo use um cache compartilhado, ex.: CACHE_URL=redis://localhost:6379/1
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Sessões e mensagens (SESSION_MODO):
+#   db        - padrão do Django: sessão lida e gravada no banco a cada requisição
+#   cached_db - sessão lida do cache e gravada no banco só quando muda
+#   cookie    - sessão assinada no próprio cookie, sem consultas ao banco
+# Em cached_db e cookie as mensagens ficam só em cookie e nunca gravam a sessão.
+# Compare os modos com "python manage.py medir_sessoes".
+SESSION_MODOS = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cookie': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_MODO = env('SESSION_MODO', default='cached_db')
+if SESSION_MODO not in SESSION_MODOS:
+    raise ImproperlyConfigured(f'SESSION_MODO deve ser um de: {", ".join(SESSION_MODOS)}.')
+if SESSION_MODO == 'cookie' and SECRET_KEY.startswith('django-insecure-'):
+    # Quem conhece a chave consegue forjar a sessão assinada
+    raise ImproperlyConfigured('SESSION_MODO=cookie exige um SECRET_KEY próprio no ambiente.')
+
+SESSION_ENGINE = SESSION_MODOS[SESSION_MODO]
+if SESSION_MODO != 'db':
+    MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Pub/sub do feed ao vivo dos eventos (SSE). Sem URL, usa memória do processo.
+PUBSUB_REDIS_URL = env('PUBSUB_REDIS_URL', default=None)
+
+
+# Email
+# Em desenvolvimento aponte EMAIL_HOST/EMAIL_PORT para um SMTP local de testes
+# (ex.: python -m aiosmtpd -n -l localhost:1025) ou use o backend de console.
+
+EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = env('EMAIL_HOST', default='localhost')
+EMAIL_PORT = env.int('EMAIL_PORT', default=1025)
+EMAIL_HOST_USER = env('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = env.bool('EMAIL_USE_TLS', default=False)
+DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='Veja Um Mundo Melhor <nao-responda@sicoob.com.br>')
+
+# Avisos de alteração de eventos: mensagens por lote, envios por segundo e
+# janela (segundos) em que um aviso repetido ao mesmo voluntário é ignorado
+NOTIFICACOES_TAMANHO_LOTE = env.int('NOTIFICACOES_TAMANHO_LOTE', default=50)
+NOTIFICACOES_POR_SEGUNDO = env.float('NOTIFICACOES_POR_SEGUNDO', default=50.0)
+NOTIFICACOES_JANELA_DEDUPE = env.int('NOTIFICACOES_JANELA_DEDUPE', default=60 * 60)
+
+# Retenção (LGPD): dias após a inativação até o registro ser apagado ou, para
+# voluntários, anonimizado por "manage.py aplicar_retencao"
+RETENCAO_DIAS = env.int('RETENCAO_DIAS', default=730)
+
+# Arquivos gerados pela fila de tarefas (exportações)
+EXPORTACOES_DIR = env('EXPORTACOES_DIR', default=str(BASE_DIR / 'exportacoes'))
+
 
 
 # Password validation
@@ -115,6 +174,13 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = env('STATIC_ROOT', default=str(BASE_DIR / 'staticfiles'))
+
+# Nomes com hash (manifesto) e variantes .gz/.br geradas no collectstatic
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'vmm.estaticos.ArmazenamentoEstatico'},
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
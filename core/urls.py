@@ -1,7 +1,17 @@
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from vmm.estaticos import servir_estatico
 
 urlpatterns = [
     path('admin/', admin.site.urls),  
     path('', include('vmm.urls')),   
-]
\ No newline at end of file
+]
+
+# Em DEBUG o runserver serve os estáticos; fora dele, servir_estatico entrega
+# o STATIC_ROOT com cache longo e variantes pré-comprimidas
+if not settings.DEBUG:
+    urlpatterns += [
+        re_path(rf'^{settings.STATIC_URL.strip("/")}/(?P<caminho>.+)$', servir_estatico),
+    ]
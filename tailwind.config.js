@@ -0,0 +1,11 @@
+/** Classes geradas apenas a partir do que os templates usam (inclusive em strings JS) */
+module.exports = {
+  content: [
+    './templates/**/*.html',
+    './vmm/templates/**/*.html',
+  ],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};
@@ -1,3 +1,276 @@
-from django.contrib import admin
+"""
+Admin para a equipe de operação corrigir dados direto nas tabelas.
 
-# Register your models here.
+Feito para tabelas grandes (centenas de milhares de vínculos): sem COUNT(*)
+da tabela inteira, FKs por autocomplete em vez de <select> com todos os
+registros, buscas por prefixo (usam índice) e ações em lote de inativar e
+reativar que rodam como um único UPDATE, como o soft delete do restante do
+sistema.
+"""
+import re
+
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .ical import invalidar_feeds
+from .signals import publicar_em_lote
+from .models import (
+    Evento, EventoArquivado, EventoVeiculo, EventoVeiculoArquivado, Tarefa, Veiculo,
+    Voluntario, VoluntarioEvento, VoluntarioEventoArquivado,
+)
+
+
+# Abaixo disso o COUNT(*) é barato e a estimativa do banco imprecisa demais
+MINIMO_ESTIMATIVA = 10_000
+
+
+def contagem_estimada(modelo, banco='default'):
+    """Número de linhas segundo as estatísticas do banco, ou None se não houver"""
+    conexao = connections[banco]
+    tabela = modelo._meta.db_table
+
+    if conexao.vendor == 'mysql':
+        sql = (
+            'SELECT TABLE_ROWS FROM information_schema.TABLES '
+            'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+        )
+    elif conexao.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    else:
+        return None
+
+    with conexao.cursor() as cursor:
+        cursor.execute(sql, [tabela])
+        linha = cursor.fetchone()
+
+    # reltuples é -1 em tabelas nunca analisadas
+    if not linha or linha[0] is None or linha[0] < 0:
+        return None
+    return int(linha[0])
+
+
+# Termo só com dígitos e pontuação de CPF
+_FORMATO_CPF = re.compile(r'[\d.\-\s]+')
+
+
+class BuscaPorCpf:
+    """O CPF é gravado só com dígitos: a busca aceita o número com pontuação"""
+
+    def get_search_results(self, request, queryset, search_term):
+        if _FORMATO_CPF.fullmatch(search_term.strip()):
+            search_term = re.sub(r'\D', '', search_term)
+        return super().get_search_results(request, queryset, search_term)
+
+
+class PaginadorEstimado(Paginator):
+    """Sem filtros nem busca, o total da lista vem da estatística da tabela"""
+
+    @cached_property
+    def count(self):
+        consulta = self.object_list
+        if not consulta.query.where:
+            estimado = contagem_estimada(consulta.model, consulta.db)
+            if estimado is not None and estimado >= MINIMO_ESTIMATIVA:
+                return estimado
+        return super().count
+
+
+class SoftDeleteAdmin(BuscaPorCpf, admin.ModelAdmin):
+    """Base das tabelas com soft delete (ativo / data_inativacao)"""
+
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    list_per_page = 50
+    actions = ['inativar_selecionados', 'reativar_selecionados']
+    readonly_fields = ('data_inativacao',)
+
+    # Feeds iCal que mudam com os registros: {recurso: caminho do id do recurso}
+    feeds = {}
+    # Linhas exibidas ao vivo na página do evento: {modelo: caminho do id a partir da seleção}
+    ao_vivo = {}
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # queryset.delete() apagaria de verdade; a exclusão em lote é a inativação
+        actions.pop('delete_selected', None)
+        return actions
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset, duplicados = super().get_search_results(request, queryset, search_term)
+        # Autocomplete de outros formulários só oferece registros ativos
+        if request.resolver_match and request.resolver_match.url_name == 'autocomplete':
+            queryset = queryset.filter(ativo=True)
+        return queryset, duplicados
+
+    def feeds_afetados(self, queryset):
+        return {
+            recurso: set(queryset.values_list(campo, flat=True).distinct()) - {None}
+            for recurso, campo in self.feeds.items()
+        }
+
+    def inativar(self, queryset):
+        return queryset.soft_delete()
+
+    def reativar(self, queryset):
+        return queryset.reativar()
+
+    def _em_lote(self, request, queryset, operacao, verbo):
+        # Recursos lidos antes do UPDATE: depois dele um filtro por ativo não os encontra mais
+        afetados = self.feeds_afetados(queryset)
+        linhas = {
+            modelo: set(queryset.values_list(campo, flat=True)) - {None}
+            for modelo, campo in self.ao_vivo.items()
+        }
+        total = operacao(queryset)
+        for recurso, ids in afetados.items():
+            invalidar_feeds(recurso, ids)
+        for modelo, ids in linhas.items():
+            publicar_em_lote(modelo, ids)
+        self.message_user(request, f'{total} registro(s) {verbo}(s).', messages.SUCCESS)
+
+    @admin.action(description='Inativar selecionados')
+    def inativar_selecionados(self, request, queryset):
+        self._em_lote(request, queryset, self.inativar, 'inativado')
+
+    @admin.action(description='Reativar selecionados')
+    def reativar_selecionados(self, request, queryset):
+        self._em_lote(request, queryset, self.reativar, 'reativado')
+
+
+@admin.register(Voluntario)
+class VoluntarioAdmin(SoftDeleteAdmin):
+    list_display = ('nome_completo', 'email_corporativo', 'cpf', 'agencia', 'setor', 'status', 'ativo')
+    list_filter = ('ativo', 'status', 'agencia')
+    search_fields = ('^nome_completo', '^email_corporativo', '=cpf')
+    search_help_text = 'Início do nome ou do e-mail, ou CPF completo (com ou sem pontuação).'
+    ordering = ('-data_cadastro',)
+
+    def inativar(self, queryset):
+        # Mesma regra da tela de voluntários: quem está em eventos futuros fica ativo
+        escalados = VoluntarioEvento.ativos.filter(
+            evento__ativo=True,
+            evento__data_evento__gte=timezone.localdate(),
+        ).values('voluntario_id')
+        return queryset.filter(ativo=True).exclude(id__in=escalados).update(
+            ativo=False, status='inativo', data_inativacao=timezone.now()
+        )
+
+    def reativar(self, queryset):
+        return queryset.reativar(status='ativo')
+
+
+@admin.register(Veiculo)
+class VeiculoAdmin(SoftDeleteAdmin):
+    list_display = ('nome', 'placa', 'tipo', 'capacidade', 'status', 'ativo')
+    list_filter = ('ativo', 'status', 'tipo')
+    search_fields = ('^nome', '^placa')
+    ordering = ('nome',)
+    feeds = {'veiculo': 'id'}
+
+
+@admin.register(Evento)
+class EventoAdmin(SoftDeleteAdmin):
+    list_display = ('nome_escola', 'cidade', 'data_evento', 'hora_inicio', 'hora_fim', 'status', 'ativo')
+    list_filter = ('ativo', 'status')
+    search_fields = ('^nome_escola', '^cidade')
+    date_hierarchy = 'data_evento'
+    ordering = ('-data_evento', '-hora_inicio')
+    readonly_fields = ('serie', 'criado_por', 'data_inativacao')
+    feeds = {
+        'voluntario': 'voluntarioevento__voluntario_id',
+        'veiculo': 'eventoveiculo__veiculo_id',
+    }
+    ao_vivo = {VoluntarioEvento: 'voluntarioevento__id', EventoVeiculo: 'eventoveiculo__id'}
+
+    def feeds_afetados(self, queryset):
+        return {**super().feeds_afetados(queryset), 'geral': {0}}
+
+    def inativar(self, queryset):
+        # Como em excluir_evento: os vínculos saem junto, um UPDATE por tabela
+        eventos = queryset.filter(ativo=True).values('pk')
+        VoluntarioEvento.objects.filter(evento__in=eventos).soft_delete()
+        EventoVeiculo.objects.filter(evento__in=eventos).soft_delete()
+        return queryset.soft_delete()
+
+
+@admin.register(EventoVeiculo)
+class EventoVeiculoAdmin(SoftDeleteAdmin):
+    list_display = ('veiculo', 'evento', 'motorista', 'inicio', 'ativo')
+    list_select_related = ('veiculo', 'evento', 'motorista')
+    list_filter = ('ativo', 'evento__status')
+    search_fields = ('^veiculo__nome', '^veiculo__placa', '^evento__nome_escola')
+    autocomplete_fields = ('evento', 'veiculo', 'motorista')
+    # A ordenação padrão do modelo junta com evento; pela PK a lista lê só o índice primário
+    ordering = ('-id',)
+    feeds = {'veiculo': 'veiculo_id'}
+    ao_vivo = {EventoVeiculo: 'id'}
+
+
+@admin.register(VoluntarioEvento)
+class VoluntarioEventoAdmin(SoftDeleteAdmin):
+    list_display = ('voluntario', 'evento', 'funcao', 'presenca', 'vai_no_veiculo', 'inicio', 'ativo')
+    list_select_related = ('voluntario', 'evento')
+    list_filter = ('ativo', 'presenca', 'funcao', 'vai_no_veiculo', 'evento__status')
+    search_fields = ('^voluntario__nome_completo', '=voluntario__cpf', '^evento__nome_escola')
+    autocomplete_fields = ('evento', 'voluntario', 'evento_veiculo')
+    ordering = ('-id',)
+    feeds = {'voluntario': 'voluntario_id'}
+    ao_vivo = {VoluntarioEvento: 'id'}
+
+
+class ArquivoAdmin(BuscaPorCpf, admin.ModelAdmin):
+    """Tabelas de arquivo: só consulta, quem grava é o comando arquivar_eventos"""
+
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(EventoArquivado)
+class EventoArquivadoAdmin(ArquivoAdmin):
+    list_display = ('nome_escola', 'cidade', 'data_evento', 'hora_inicio', 'hora_fim', 'data_arquivamento')
+    search_fields = ('^nome_escola', '^cidade')
+    date_hierarchy = 'data_evento'
+    ordering = ('-data_evento',)
+
+
+@admin.register(EventoVeiculoArquivado)
+class EventoVeiculoArquivadoAdmin(ArquivoAdmin):
+    list_display = ('veiculo', 'evento', 'motorista', 'inicio')
+    list_select_related = ('veiculo', 'evento', 'motorista')
+    search_fields = ('^veiculo__nome', '^veiculo__placa', '^evento__nome_escola')
+    ordering = ('-id',)
+
+
+@admin.register(VoluntarioEventoArquivado)
+class VoluntarioEventoArquivadoAdmin(ArquivoAdmin):
+    list_display = ('voluntario', 'evento', 'funcao', 'presenca', 'inicio')
+    list_select_related = ('voluntario', 'evento')
+    list_filter = ('presenca', 'funcao')
+    search_fields = ('^voluntario__nome_completo', '=voluntario__cpf', '^evento__nome_escola')
+    ordering = ('-id',)
+
+
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'status', 'tentativas', 'executar_apos', 'data_conclusao')
+    list_filter = ('status',)
+    search_fields = ('=id', '^nome')
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    ordering = ('-id',)
@@ -0,0 +1,109 @@
+"""
+Arquivo histórico dos eventos concluídos.
+
+Eventos com status "concluído" de anos encerrados saem de Evento,
+EventoVeiculo e VoluntarioEvento e vão para EventoArquivado,
+EventoVeiculoArquivado e VoluntarioEventoArquivado, com os mesmos ids. As
+buscas de disponibilidade e as listas, que só olham a temporada atual e as
+próximas, passam a percorrer tabelas e índices menores; os relatórios de
+horas (estatisticas.py) somam as duas origens.
+
+Vão para o arquivo só os vínculos ativos: os inativos dos eventos arquivados
+são apagados junto com o evento. A cópia anda em lotes de até `lote` eventos
+consecutivos (por PK), cada lote em uma transação curta que copia e apaga.
+"""
+import time
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Max
+
+from .ical import invalidar_feeds
+from .models import (
+    Evento, EventoArquivado, EventoVeiculo, EventoVeiculoArquivado,
+    VoluntarioEvento, VoluntarioEventoArquivado,
+)
+
+
+def _campos(modelo):
+    """Colunas copiadas das tabelas do dia a dia (data_arquivamento é só do arquivo)"""
+    return [campo.attname for campo in modelo._meta.concrete_fields if campo.attname != 'data_arquivamento']
+
+
+def arquivaveis(ano):
+    """Eventos concluídos anteriores a 1º de janeiro de `ano`"""
+    return Evento.ativos.filter(status='concluido', data_evento__lt=date(ano, 1, 1))
+
+
+def data_limite_arquivo():
+    """Data do evento arquivado mais recente, ou None com o arquivo vazio"""
+    return EventoArquivado.objects.aggregate(limite=Max('data_evento'))['limite']
+
+
+def _arquivar_lote(consulta, ids):
+    # A faixa é refiltrada e travada dentro da transação: evento reaberto no meio do caminho fica
+    eventos = list(consulta.select_for_update().filter(id__in=ids).values(*_campos(EventoArquivado)))
+    ids = [evento['id'] for evento in eventos]
+    veiculos = list(EventoVeiculo.ativos.filter(evento_id__in=ids).values(*_campos(EventoVeiculoArquivado)))
+    vinculos = list(VoluntarioEvento.ativos.filter(evento_id__in=ids).values(*_campos(VoluntarioEventoArquivado)))
+
+    veiculos_ids = {veiculo['id'] for veiculo in veiculos}
+    for vinculo in vinculos:
+        # Lugar em veículo que foi retirado do evento não tem para onde apontar
+        if vinculo['evento_veiculo_id'] not in veiculos_ids:
+            vinculo['evento_veiculo_id'] = None
+
+    EventoArquivado.objects.bulk_create([EventoArquivado(**evento) for evento in eventos])
+    EventoVeiculoArquivado.objects.bulk_create([EventoVeiculoArquivado(**veiculo) for veiculo in veiculos])
+    VoluntarioEventoArquivado.objects.bulk_create([VoluntarioEventoArquivado(**vinculo) for vinculo in vinculos])
+
+    # Quem referencia sai antes de quem é referenciado
+    VoluntarioEvento.objects.filter(evento_id__in=ids).delete()
+    EventoVeiculo.objects.filter(evento_id__in=ids).delete()
+    Evento.objects.filter(id__in=ids).delete()
+
+    voluntarios = {vinculo['voluntario_id'] for vinculo in vinculos}
+    veiculos_feed = {veiculo['veiculo_id'] for veiculo in veiculos}
+
+    def invalidar():
+        invalidar_feeds('geral', [0])
+        invalidar_feeds('voluntario', voluntarios)
+        invalidar_feeds('veiculo', veiculos_feed)
+
+    transaction.on_commit(invalidar)
+    return len(eventos), len(veiculos), len(vinculos)
+
+
+def arquivar(ano, lote=200, pausa=0.0):
+    """
+    Move para o arquivo os eventos concluídos anteriores a `ano`, lote a lote.
+    Retorna {'eventos', 'veiculos', 'vinculos', 'lotes', 'segundos'}.
+    """
+    resultado = {'eventos': 0, 'veiculos': 0, 'vinculos': 0, 'lotes': 0, 'segundos': 0.0}
+    consulta = arquivaveis(ano)
+    inicio = time.perf_counter()
+    ultimo = None
+
+    while True:
+        candidatos = consulta.order_by('pk')
+        if ultimo is not None:
+            candidatos = candidatos.filter(pk__gt=ultimo)
+        ids = list(candidatos.values_list('pk', flat=True)[:lote])
+        if not ids:
+            break
+
+        with transaction.atomic():
+            eventos, veiculos, vinculos = _arquivar_lote(consulta, ids)
+        resultado['eventos'] += eventos
+        resultado['veiculos'] += veiculos
+        resultado['vinculos'] += vinculos
+        resultado['lotes'] += 1
+        ultimo = ids[-1]
+
+        if len(ids) < lote:
+            break
+        if pausa:
+            time.sleep(pausa)
+
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
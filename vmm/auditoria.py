@@ -0,0 +1,148 @@
+"""
+Auditoria de conflitos de agenda: voluntários e veículos alocados em dois
+eventos ativos com horários sobrepostos.
+
+As alocações são lidas com uma consulta por tipo de recurso, ordenadas por
+recurso e início, e percorridas com uma varredura (sweep line) que mantém em
+um heap os intervalos ainda abertos: O(n log n + conflitos), sem comparar
+eventos dois a dois no banco.
+"""
+import heapq
+from datetime import datetime, time, timedelta
+from itertools import count, groupby
+from operator import itemgetter
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DURACAO_MAXIMA_EVENTO, EventoVeiculo, VoluntarioEvento, intervalo_evento
+
+
+# (modelo, campo do recurso, campo com o nome exibido)
+RECURSOS = {
+    'voluntario': (VoluntarioEvento, 'voluntario_id', 'voluntario__nome_completo'),
+    'veiculo': (EventoVeiculo, 'veiculo_id', 'veiculo__nome'),
+}
+
+CAMPOS_EVENTO = (
+    'evento_id', 'evento__nome_escola', 'evento__data_evento',
+    'evento__hora_inicio', 'evento__hora_fim', 'inicio', 'fim',
+)
+
+# O painel audita só as próximas semanas e guarda o resultado por poucos minutos;
+# a agenda inteira fica com o comando auditar_conflitos
+JANELA_PAINEL = timedelta(days=30)
+CACHE_PAINEL = 60 * 5
+
+# Posições em cada linha: recurso, nome, evento, escola, data, horas exibidas e intervalo
+RECURSO, NOME, EVENTO, ESCOLA, DATA, HORA_INICIO, HORA_FIM, INICIO, FIM = range(9)
+
+
+def _alocacoes(tipo, filtro=None):
+    modelo, campo_recurso, campo_nome = RECURSOS[tipo]
+    consulta = modelo.ativos.filter(evento__ativo=True).exclude(evento__status='cancelado')
+    if filtro is not None:
+        consulta = consulta.filter(filtro)
+    return consulta.values_list(campo_recurso, campo_nome, *CAMPOS_EVENTO)
+
+
+def varrer(linhas):
+    """Pares (a, b) de linhas do mesmo recurso cujos horários se sobrepõem"""
+    ordenadas = sorted(linhas, key=itemgetter(RECURSO, INICIO))
+    desempate = count()
+
+    for _, grupo in groupby(ordenadas, key=itemgetter(RECURSO)):
+        abertos = []  # heap de (fim, desempate, linha)
+        for linha in grupo:
+            while abertos and abertos[0][0] <= linha[INICIO]:
+                heapq.heappop(abertos)
+            for _, _, aberta in abertos:
+                yield aberta, linha
+            heapq.heappush(abertos, (linha[FIM], next(desempate), linha))
+
+
+def _conflito(tipo, a, b):
+    return {
+        'recurso': tipo,
+        'recurso_id': a[RECURSO],
+        'nome': a[NOME],
+        'data': a[DATA],
+        'eventos': [
+            {
+                'id': linha[EVENTO],
+                'nome_escola': linha[ESCOLA],
+                'hora_inicio': linha[HORA_INICIO],
+                'hora_fim': linha[HORA_FIM],
+            }
+            for linha in (a, b)
+        ],
+    }
+
+
+def descrever(conflito):
+    """Texto curto para mensagens e para o comando de auditoria"""
+    a, b = conflito['eventos']
+    recurso = 'Veículo' if conflito['recurso'] == 'veiculo' else 'Voluntário'
+    return (
+        f'{recurso} {conflito["nome"]} em {conflito["data"]:%d/%m/%Y}: '
+        f'"{a["nome_escola"]}" ({a["hora_inicio"]:%H:%M}-{a["hora_fim"]:%H:%M}) e '
+        f'"{b["nome_escola"]}" ({b["hora_inicio"]:%H:%M}-{b["hora_fim"]:%H:%M})'
+    )
+
+
+def auditar_conflitos(desde=None, ate=None):
+    """Todos os conflitos entre desde e ate (datas inclusivas, opcionais)"""
+    filtro = Q()
+    if desde:
+        filtro &= Q(inicio__gte=timezone.make_aware(datetime.combine(desde, time.min)))
+    if ate:
+        filtro &= Q(inicio__lt=timezone.make_aware(datetime.combine(ate + timedelta(days=1), time.min)))
+
+    conflitos = [
+        _conflito(tipo, a, b)
+        for tipo in RECURSOS
+        for a, b in varrer(_alocacoes(tipo, filtro))
+    ]
+    return sorted(conflitos, key=lambda c: (c['data'], c['recurso'], c['nome']))
+
+
+def conflitos_proximos(hoje):
+    """Conflitos de hoje até JANELA_PAINEL, do cache quando calculados há menos de CACHE_PAINEL"""
+    ate = hoje + JANELA_PAINEL
+    chave = f'vmm:auditoria:{hoje:%Y-%m-%d}:{ate:%Y-%m-%d}'
+    conflitos = cache.get(chave)
+    if conflitos is None:
+        conflitos = auditar_conflitos(desde=hoje, ate=ate)
+        cache.set(chave, conflitos, CACHE_PAINEL)
+    return conflitos
+
+
+def conflitos_reagendamento(evento, data_evento, hora_inicio, hora_fim):
+    """
+    Conflitos que surgiriam se `evento` passasse para o novo horário: as
+    alocações do próprio evento são projetadas no horário novo e varridas
+    junto com as dos mesmos recursos na nova data.
+    """
+    inicio, fim = intervalo_evento(data_evento, hora_inicio, hora_fim)
+    mesma_faixa = Q(inicio__lt=fim, inicio__gt=inicio - DURACAO_MAXIMA_EVENTO, fim__gt=inicio)
+
+    conflitos = []
+    for tipo, (modelo, campo_recurso, _) in RECURSOS.items():
+        recursos = modelo.ativos.filter(evento=evento).values(campo_recurso)
+        linhas = [
+            (
+                linha[:DATA] + (data_evento, hora_inicio, hora_fim, inicio, fim)
+                if linha[EVENTO] == evento.id else linha
+            )
+            for linha in _alocacoes(
+                tipo,
+                Q(evento=evento) | (mesma_faixa & Q(**{f'{campo_recurso}__in': recursos}))
+            )
+        ]
+        conflitos += [
+            _conflito(tipo, a, b)
+            for a, b in varrer(linhas)
+            if evento.id in (a[EVENTO], b[EVENTO])
+        ]
+    return conflitos
@@ -0,0 +1,126 @@
+"""
+Check-in por QR code no dia do evento.
+
+Cada vínculo voluntário-evento tem um token assinado (HMAC do Django com
+SECRET_KEY e um salt próprio) com os ids do evento e do vínculo. A leitura
+confere a assinatura em memória, sem sessão nem consulta, e marca a presença
+com um único UPDATE condicional pela chave primária. Só quando nada é
+atualizado uma segunda consulta explica o motivo (já presente, fora do
+horário, evento cancelado).
+"""
+from datetime import timedelta
+from functools import lru_cache
+
+from django.core import signing
+from django.db import connections
+from django.utils import timezone
+
+from .models import Evento, VoluntarioEvento
+from .tempo_real import publicar_alteracao
+
+try:
+    import segno
+except ImportError:  # dependência opcional: sem ela a página de impressão mostra só os links
+    segno = None
+
+
+SALT_CHECKIN = 'vmm.checkin'
+
+# Janela aceita em torno do horário do evento
+ANTECEDENCIA_CHECKIN = timedelta(hours=2)
+TOLERANCIA_CHECKIN = timedelta(hours=2)
+
+PRESENTE = 'presente'
+JA_PRESENTE = 'ja_presente'
+INEXISTENTE = 'inexistente'
+FORA_DO_HORARIO = 'fora_do_horario'
+CANCELADO = 'cancelado'
+
+
+def gerar_token(vol_evento):
+    return signing.Signer(salt=SALT_CHECKIN).sign(f'{vol_evento.evento_id}.{vol_evento.id}')
+
+
+def ler_token(token):
+    """(evento_id, voluntario_evento_id) do token, ou None se a assinatura não confere"""
+    try:
+        valor = signing.Signer(salt=SALT_CHECKIN).unsign(token)
+        evento_id, vol_evento_id = valor.split('.')
+        return int(evento_id), int(vol_evento_id)
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def _motivo(evento_id, vol_evento_id, agora):
+    vinculo = VoluntarioEvento.objects.filter(id=vol_evento_id, evento_id=evento_id).values(
+        'ativo', 'presenca', 'inicio', 'fim', 'evento__ativo', 'evento__status',
+    ).first()
+
+    if vinculo is None or not vinculo['ativo'] or not vinculo['evento__ativo']:
+        return INEXISTENTE
+    if vinculo['evento__status'] == 'cancelado':
+        return CANCELADO
+    if vinculo['presenca'] == PRESENTE:
+        return JA_PRESENTE
+    return FORA_DO_HORARIO
+
+
+@lru_cache(maxsize=None)
+def _sql_checkin(banco):
+    """
+    UPDATE do check-in montado uma vez por processo. Pelo ORM, compilar os
+    filtros custava mais que o próprio comando no banco; o SQL é o mesmo que
+    VoluntarioEvento.objects.filter(...).update(...) geraria.
+    """
+    q = connections[banco].ops.quote_name
+    vinculo, evento = VoluntarioEvento._meta, Evento._meta
+
+    def coluna(meta, campo):
+        return q(meta.get_field(campo).column)
+
+    return (
+        f'UPDATE {q(vinculo.db_table)} '
+        f'SET {coluna(vinculo, "presenca")} = %s, {coluna(vinculo, "data_atualizacao")} = %s '
+        f'WHERE {coluna(vinculo, "id")} = %s AND {coluna(vinculo, "evento")} = %s '
+        f'AND {coluna(vinculo, "ativo")} = %s AND {coluna(vinculo, "presenca")} <> %s '
+        f'AND {coluna(vinculo, "inicio")} <= %s AND {coluna(vinculo, "fim")} >= %s '
+        # Subconsulta em outra tabela: o UPDATE continua sendo um só comando
+        f'AND {coluna(vinculo, "evento")} IN ('
+        f'SELECT {coluna(evento, "id")} FROM {q(evento.db_table)} '
+        f'WHERE {coluna(evento, "id")} = %s AND {coluna(evento, "ativo")} = %s '
+        f'AND {coluna(evento, "status")} <> %s)'
+    )
+
+
+def registrar_checkin(evento_id, vol_evento_id, banco='default'):
+    """Marca o voluntário como presente e devolve o resultado (PRESENTE, JA_PRESENTE...)"""
+    agora = timezone.now()
+    conexao = connections[banco]
+    data = conexao.ops.adapt_datetimefield_value
+    with conexao.cursor() as cursor:
+        cursor.execute(_sql_checkin(banco), [
+            PRESENTE, data(agora),
+            vol_evento_id, evento_id, True, PRESENTE,
+            data(agora + ANTECEDENCIA_CHECKIN), data(agora - TOLERANCIA_CHECKIN),
+            evento_id, True, 'cancelado',
+        ])
+        marcados = cursor.rowcount
+
+    if not marcados:
+        return _motivo(evento_id, vol_evento_id, agora)
+
+    # O UPDATE não dispara post_save: avisa a página do evento diretamente
+    publicar_alteracao(evento_id, {
+        'tipo': 'presenca',
+        'id': vol_evento_id,
+        'presenca': PRESENTE,
+        'presenca_display': dict(VoluntarioEvento.STATUS_PRESENCA)[PRESENTE],
+    })
+    return PRESENTE
+
+
+def qr_svg(conteudo):
+    """QR code em SVG para incluir no HTML, ou None sem o pacote segno"""
+    if segno is None:
+        return None
+    return segno.make(conteudo, error='m').svg_inline(scale=4, border=2)
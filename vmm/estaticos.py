@@ -0,0 +1,171 @@
+"""
+Arquivos estáticos compilados: Tailwind pré-compilado e subconjunto dos
+ícones Font Awesome (gerados por ``npm run build``), nomes com hash via
+manifesto, variantes .gz/.br geradas no collectstatic e cache de um ano
+para os arquivos com hash.
+"""
+import gzip
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.http import Http404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.static import serve
+
+try:
+    import brotli
+except ImportError:  # dependência opcional: sem ela só o .gz é gerado
+    brotli = None
+
+
+CACHE_IMUTAVEL = 60 * 60 * 24 * 365
+CACHE_SEM_HASH = 60 * 10
+
+EXTENSOES_COMPRIMIVEIS = ('.css', '.js', '.svg', '.json', '.txt', '.map', '.html')
+TAMANHO_MINIMO_COMPRESSAO = 512
+
+PASTAS_TEMPLATES = ('templates', 'vmm/templates')
+# Gerados por "npm run build" (tailwind.css, icones.css) e CSS próprio do projeto
+ARQUIVOS_CSS = ('vmm/css/tailwind.css', 'vmm/css/icones.css', 'vmm/css/style.css')
+
+# Classes usadas só como gancho de JavaScript ou marcador, sem estilo próprio
+CLASSES_SEM_ESTILO = {
+    'agencia-checkbox-all', 'agencia-checkbox-item', 'agencia-option',
+    'veiculo-item', 'voluntario-item',
+    'custom-scrollbar', 'printing', 'responsive-table', 'table-container',
+}
+
+
+def _comprimir(caminho):
+    """Grava caminho.gz e caminho.br quando a versão comprimida é menor"""
+    dados = caminho.read_bytes()
+    if len(dados) < TAMANHO_MINIMO_COMPRESSAO:
+        return
+
+    variantes = {'.gz': gzip.compress(dados, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variantes['.br'] = brotli.compress(dados, quality=11)
+
+    for sufixo, comprimido in variantes.items():
+        if len(comprimido) < len(dados):
+            caminho.with_name(caminho.name + sufixo).write_bytes(comprimido)
+
+
+class ArmazenamentoEstatico(ManifestStaticFilesStorage):
+    """Manifesto com hash nos nomes e variantes pré-comprimidas de cada arquivo de texto"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        nomes = set(self.hashed_files.values()) | set(paths)
+        for nome in nomes:
+            if nome.endswith(EXTENSOES_COMPRIMIVEIS) and self.exists(nome):
+                _comprimir(Path(self.path(nome)))
+
+
+@lru_cache(maxsize=1)
+def _nomes_com_hash():
+    # O manifesto é lido uma vez por processo, como faz o próprio storage
+    manifesto = getattr(staticfiles_storage, 'hashed_files', None) or {}
+    return set(manifesto.values())
+
+
+def servir_estatico(request, caminho):
+    """
+    Serve STATIC_ROOT fora do modo DEBUG. Arquivos com hash ficam em cache por
+    um ano (immutable) e, quando o navegador aceita, a variante .br ou .gz é
+    enviada no lugar do original.
+    """
+    raiz = Path(settings.STATIC_ROOT)
+    aceitas = request.headers.get('Accept-Encoding', '')
+    escolhido = caminho
+    for sufixo, codificacao in (('.br', 'br'), ('.gz', 'gzip')):
+        if codificacao in aceitas and (raiz / (caminho + sufixo)).is_file():
+            escolhido = caminho + sufixo
+            break
+
+    try:
+        response = serve(request, escolhido, document_root=raiz)
+    except Http404:
+        raise Http404('Arquivo estático não encontrado')
+
+    if caminho.endswith(EXTENSOES_COMPRIMIVEIS):
+        patch_vary_headers(response, ['Accept-Encoding'])
+    if caminho in _nomes_com_hash():
+        patch_cache_control(response, public=True, max_age=CACHE_IMUTAVEL, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=CACHE_SEM_HASH)
+    return response
+
+
+# ==================== VERIFICAÇÃO DE CLASSES ====================
+
+_ATRIBUTO_CLASS = re.compile(r'''class=(["'])(.*?)\1''', re.S)
+_CLASS_LIST = re.compile(r'''classList\.(?:add|remove|toggle)\((["'])([^"']+)\1''')
+_TAG_TEMPLATE = re.compile(r'\{[%{].*?[%}]\}', re.S)
+_BLOCO_STYLE = re.compile(r'<style[^>]*>(.*?)</style>', re.S)
+_SELETOR_CLASSE = re.compile(r'\.((?:\\.|[\w-])+)')
+_COMENTARIO_CSS = re.compile(r'/\*.*?\*/', re.S)
+
+
+def _arquivos_templates():
+    for pasta in PASTAS_TEMPLATES:
+        yield from sorted((Path(settings.BASE_DIR) / pasta).rglob('*.html'))
+
+
+def _classes_css(texto):
+    texto = _COMENTARIO_CSS.sub('', texto)
+    # Só os seletores (antes de cada "{"), sem valores de propriedades como 0.5rem
+    seletores = re.findall(r'([^{}]+)\{', texto)
+    return {
+        re.sub(r'\\(.)', r'\1', classe)
+        for seletor in seletores
+        for classe in _SELETOR_CLASSE.findall(seletor)
+    }
+
+
+def classes_usadas():
+    """{classe: {templates que a usam}} a partir de class="..." e classList"""
+    usadas = {}
+    for arquivo in _arquivos_templates():
+        texto = arquivo.read_text(encoding='utf-8')
+        nome = str(arquivo.relative_to(settings.BASE_DIR))
+        trechos = [m.group(2) for m in _ATRIBUTO_CLASS.finditer(texto)]
+        trechos += [m.group(2) for m in _CLASS_LIST.finditer(texto)]
+        for trecho in trechos:
+            # O texto dentro de {% if %} continua valendo; as tags em si saem
+            for classe in _TAG_TEMPLATE.sub(' ', trecho).split():
+                if re.fullmatch(r'[\w:/.\[\]#%-]+', classe) and '${' not in classe:
+                    usadas.setdefault(classe, set()).add(nome)
+    return usadas
+
+
+def classes_definidas():
+    """Classes presentes nos ARQUIVOS_CSS e nos blocos <style> dos templates"""
+    definidas = set()
+    for css in ARQUIVOS_CSS:
+        caminho = finders.find(css)
+        if caminho is None:
+            raise FileNotFoundError(f'{css} não encontrado; rode "npm run build" antes.')
+        definidas |= _classes_css(Path(caminho).read_text(encoding='utf-8'))
+
+    for arquivo in _arquivos_templates():
+        for bloco in _BLOCO_STYLE.findall(arquivo.read_text(encoding='utf-8')):
+            definidas |= _classes_css(bloco)
+    return definidas
+
+
+def classes_ausentes():
+    """{classe: {templates}} das classes usadas que não existem em nenhum CSS"""
+    definidas = classes_definidas() | CLASSES_SEM_ESTILO
+    return {
+        classe: templates
+        for classe, templates in classes_usadas().items()
+        if classe not in definidas
+    }
@@ -0,0 +1,292 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from .arquivo import data_limite_arquivo
+from .models import Voluntario, VoluntarioEvento, VoluntarioEventoArquivado
+
+
+# Campos usados no GROUP BY de cada agrupamento aceito pela API
+AGRUPAMENTOS = {
+    'agencia': ('voluntario__agencia',),
+    'setor': ('voluntario__setor',),
+    'voluntario': ('voluntario_id', 'voluntario__nome_completo', 'voluntario__agencia'),
+}
+
+# Meses já encerrados não mudam com frequência, então ficam em cache por um dia
+CACHE_MESES_FECHADOS = 60 * 60 * 24
+
+DURACAO_EVENTO = ExpressionWrapper(
+    F('evento__fim') - F('evento__inicio'),
+    output_field=DurationField()
+)
+
+CONTADORES = ('total_alocacoes', 'presentes', 'ausentes', 'cancelados')
+DURACOES = ('segundos_escalados', 'segundos_servidos')
+
+
+def _metricas():
+    """Agregações condicionais calculadas em uma única passada no banco"""
+    return {
+        'total_alocacoes': Count('id'),
+        'presentes': Count('id', filter=Q(presenca='presente')),
+        'ausentes': Count('id', filter=Q(presenca='ausente')),
+        'cancelados': Count('id', filter=Q(presenca='cancelado')),
+        'duracao_escalada': Sum(DURACAO_EVENTO),
+        'duracao_servida': Sum(DURACAO_EVENTO, filter=Q(presenca='presente')),
+    }
+
+
+def _alocacoes_validas():
+    return VoluntarioEvento.ativos.filter(
+        evento__ativo=True,
+    ).exclude(evento__status='cancelado')
+
+
+def _origens(data_inicio):
+    """Alocações do dia a dia e, se o período alcança o arquivo, as arquivadas"""
+    origens = [_alocacoes_validas()]
+    limite = data_limite_arquivo()
+    if limite is not None and data_inicio <= limite:
+        # Só eventos concluídos vão para o arquivo, sempre com vínculos ativos
+        origens.append(VoluntarioEventoArquivado.objects.all())
+    return origens
+
+
+def _normalizar(linha, campos):
+    """Converte uma linha agregada em dicionário serializável (durações em segundos)"""
+    return {
+        'chave': [linha[campo] for campo in campos],
+        'total_alocacoes': linha['total_alocacoes'],
+        'presentes': linha['presentes'],
+        'ausentes': linha['ausentes'],
+        'cancelados': linha['cancelados'],
+        'segundos_escalados': (linha['duracao_escalada'] or timedelta()).total_seconds(),
+        'segundos_servidos': (linha['duracao_servida'] or timedelta()).total_seconds(),
+    }
+
+
+def _meses_fechados(data_inicio, data_fim):
+    """Meses inteiramente contidos no intervalo e anteriores ao mês atual"""
+    inicio_mes_atual = timezone.localdate().replace(day=1)
+    meses = []
+    ano, mes = data_inicio.year, data_inicio.month
+    if data_inicio.day != 1:
+        ano, mes = (ano, mes + 1) if mes < 12 else (ano + 1, 1)
+
+    while True:
+        primeiro_dia = date(ano, mes, 1)
+        proximo = date(ano, mes + 1, 1) if mes < 12 else date(ano + 1, 1, 1)
+        ultimo_dia = proximo - timedelta(days=1)
+        if ultimo_dia > data_fim or primeiro_dia >= inicio_mes_atual:
+            break
+        meses.append((ano, mes))
+        ano, mes = proximo.year, proximo.month
+
+    return meses
+
+
+def _chave_cache(agrupamento, ano, mes):
+    return f'vmm:horas:{agrupamento}:{ano}-{mes:02d}'
+
+
+def _agregar_meses(agrupamento, meses):
+    """Busca no cache os meses fechados e calcula os faltantes em uma única consulta"""
+    campos = AGRUPAMENTOS[agrupamento]
+    chaves = {_chave_cache(agrupamento, ano, mes): (ano, mes) for ano, mes in meses}
+    resultado = cache.get_many(list(chaves))
+
+    faltantes = {chaves[chave]: chave for chave in chaves if chave not in resultado}
+    if faltantes:
+        ano_ini, mes_ini = min(faltantes)
+        ano_fim, mes_fim = max(faltantes)
+        fim = date(ano_fim, mes_fim + 1, 1) if mes_fim < 12 else date(ano_fim + 1, 1, 1)
+
+        inicio = date(ano_ini, mes_ini, 1)
+        calculados = {chave: [] for chave in faltantes.values()}
+        for origem in _origens(inicio):
+            linhas = (
+                origem
+                .filter(
+                    evento__data_evento__gte=inicio,
+                    evento__data_evento__lt=fim,
+                )
+                .annotate(
+                    ano=ExtractYear('evento__data_evento'),
+                    mes=ExtractMonth('evento__data_evento'),
+                )
+                .values('ano', 'mes', *campos)
+                .annotate(**_metricas())
+                .order_by()
+            )
+            for linha in linhas:
+                chave = faltantes.get((linha['ano'], linha['mes']))
+                if chave:
+                    calculados[chave].append(_normalizar(linha, campos))
+
+        cache.set_many(calculados, CACHE_MESES_FECHADOS)
+        resultado.update(calculados)
+
+    return [linha for linhas in resultado.values() for linha in linhas]
+
+
+def _agregar_intervalo(agrupamento, data_inicio, data_fim):
+    campos = AGRUPAMENTOS[agrupamento]
+    return [
+        _normalizar(linha, campos)
+        for origem in _origens(data_inicio)
+        for linha in (
+            origem
+            .filter(
+                evento__data_evento__gte=data_inicio,
+                evento__data_evento__lte=data_fim,
+            )
+            .values(*campos)
+            .annotate(**_metricas())
+            .order_by()
+        )
+    ]
+
+
+def resumo_horas(agrupamento, data_inicio, data_fim):
+    """
+    Totaliza horas escaladas/servidas e faltas por agência, setor ou voluntário.
+
+    Meses fechados vêm do cache; apenas as bordas do intervalo e o mês corrente
+    são consultados diretamente. Eventos arquivados entram na soma como os demais.
+    """
+    if agrupamento not in AGRUPAMENTOS:
+        raise ValueError(f'Agrupamento inválido: {agrupamento}')
+
+    meses = _meses_fechados(data_inicio, data_fim)
+    parciais = []
+
+    if meses:
+        bloco_inicio = date(*meses[0], 1)
+        ano_fim, mes_fim = meses[-1]
+        bloco_fim = (date(ano_fim, mes_fim + 1, 1) if mes_fim < 12 else date(ano_fim + 1, 1, 1)) - timedelta(days=1)
+
+        parciais.extend(_agregar_meses(agrupamento, meses))
+        if data_inicio < bloco_inicio:
+            parciais.extend(_agregar_intervalo(agrupamento, data_inicio, bloco_inicio - timedelta(days=1)))
+        if data_fim > bloco_fim:
+            parciais.extend(_agregar_intervalo(agrupamento, bloco_fim + timedelta(days=1), data_fim))
+    else:
+        parciais.extend(_agregar_intervalo(agrupamento, data_inicio, data_fim))
+
+    # Soma os totais parciais de cada mês/intervalo por grupo
+    totais = {}
+    for parcial in parciais:
+        chave = tuple(parcial['chave'])
+        acumulado = totais.setdefault(chave, dict.fromkeys(CONTADORES + DURACOES, 0))
+        for campo in CONTADORES + DURACOES:
+            acumulado[campo] += parcial[campo]
+
+    agencias = dict(Voluntario.AGENCIAS_CHOICES)
+    resultado = []
+    for chave, valores in totais.items():
+        item = dict(zip(AGRUPAMENTOS[agrupamento], chave))
+        faltas = valores['ausentes'] + valores['cancelados']
+
+        linha = {
+            'horas_escaladas': round(valores['segundos_escalados'] / 3600, 2),
+            'horas_servidas': round(valores['segundos_servidos'] / 3600, 2),
+            'total_alocacoes': valores['total_alocacoes'],
+            'presentes': valores['presentes'],
+            'ausentes': valores['ausentes'],
+            'cancelados': valores['cancelados'],
+            'taxa_faltas': round(faltas / valores['total_alocacoes'], 4) if valores['total_alocacoes'] else 0,
+        }
+
+        if agrupamento == 'agencia':
+            linha['agencia'] = item['voluntario__agencia']
+            linha['agencia_nome'] = agencias.get(item['voluntario__agencia'], item['voluntario__agencia'])
+        elif agrupamento == 'setor':
+            linha['setor'] = item['voluntario__setor']
+        else:
+            linha['voluntario_id'] = item['voluntario_id']
+            linha['nome'] = item['voluntario__nome_completo']
+            linha['agencia'] = agencias.get(item['voluntario__agencia'], item['voluntario__agencia'])
+
+        resultado.append(linha)
+
+    resultado.sort(key=lambda linha: linha['horas_servidas'], reverse=True)
+    return resultado
+
+
+def _consultas_estatisticas(evento_ids):
+    """Agregação condicional por evento e contagem agrupada por função"""
+    alocacoes = VoluntarioEvento.ativos.filter(evento_id__in=evento_ids)
+
+    contagens = (
+        alocacoes
+        .values('evento_id')
+        .annotate(
+            total_voluntarios=Count('id'),
+            confirmados=Count('id', filter=Q(presenca='confirmado')),
+            presentes=Count('id', filter=Q(presenca='presente')),
+            ausentes=Count('id', filter=Q(presenca='ausente')),
+            cancelados=Count('id', filter=Q(presenca='cancelado')),
+        )
+        .order_by()
+    )
+    por_funcao = (
+        alocacoes
+        .values('evento_id', 'funcao', 'funcao_customizada')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    return contagens, por_funcao
+
+
+def _montar_estatisticas(evento_ids, contagens, por_funcao):
+    stats = {
+        evento_id: {
+            'total_voluntarios': 0,
+            'confirmados': 0,
+            'presentes': 0,
+            'ausentes': 0,
+            'cancelados': 0,
+            'por_funcao': {},
+        }
+        for evento_id in evento_ids
+    }
+
+    for linha in contagens:
+        linha = dict(linha)
+        stats[linha.pop('evento_id')].update(linha)
+
+    funcoes = dict(VoluntarioEvento.FUNCOES)
+    for linha in por_funcao:
+        if linha['funcao'] == 'outro':
+            nome = linha['funcao_customizada']
+        else:
+            nome = funcoes.get(linha['funcao'], linha['funcao'])
+        agrupado = stats[linha['evento_id']]['por_funcao']
+        agrupado[nome] = agrupado.get(nome, 0) + linha['total']
+
+    return stats
+
+
+def estatisticas_eventos(evento_ids):
+    """
+    Estatísticas de presença e distribuição por função de vários eventos.
+
+    Usa uma agregação condicional agrupada por evento e uma contagem agrupada
+    por função, independentemente da quantidade de eventos.
+    """
+    evento_ids = list(evento_ids)
+    contagens, por_funcao = _consultas_estatisticas(evento_ids)
+    return _montar_estatisticas(evento_ids, contagens, por_funcao)
+
+
+async def aestatisticas_eventos(evento_ids):
+    """Versão assíncrona de estatisticas_eventos (ORM assíncrono do Django)"""
+    evento_ids = list(evento_ids)
+    contagens, por_funcao = _consultas_estatisticas(evento_ids)
+    contagens = [linha async for linha in contagens]
+    por_funcao = [linha async for linha in por_funcao]
+    return _montar_estatisticas(evento_ids, contagens, por_funcao)
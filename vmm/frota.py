@@ -0,0 +1,204 @@
+"""
+Relatório da frota: utilização por veículo (horas reservadas x disponíveis),
+veículos ociosos, semanas em que a demanda de assentos supera a oferta e
+eventos futuros que ficam sem veículo por manutenção.
+
+A demanda da semana são os voluntários que vão no veículo, tenham ou não um
+lugar atribuído; a oferta são os lugares dos veículos alocados que estão
+disponíveis (um veículo em manutenção não leva ninguém).
+
+Cada semana é calculada com duas consultas agrupadas (uma sobre
+EventoVeiculo e outra sobre VoluntarioEvento) e guardada no cache: semanas
+encerradas por um dia, a semana atual e as futuras por poucos minutos.
+"""
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .models import EventoVeiculo, Veiculo, VoluntarioEvento
+
+
+# Horas em que um veículo pode ser reservado por semana (5 dias x 10 horas)
+HORAS_DISPONIVEIS_SEMANA = 50
+MAX_SEMANAS = 26
+
+CACHE_SEMANAS_FECHADAS = 60 * 60 * 24
+CACHE_SEMANAS_ABERTAS = 60 * 5
+
+DURACAO_VINCULO = ExpressionWrapper(F('fim') - F('inicio'), output_field=DurationField())
+
+
+def segunda_feira(data):
+    return data - timedelta(days=data.weekday())
+
+
+def _momento(data):
+    return timezone.make_aware(datetime.combine(data, time.min))
+
+
+def _chave_cache(segunda):
+    ano, semana, _ = segunda.isocalendar()
+    return f'vmm:frota:{ano}-W{semana:02d}'
+
+
+def _semana(valor):
+    # TruncWeek sobre DateField devolve date, mas alguns backends devolvem datetime
+    return valor.date() if isinstance(valor, datetime) else valor
+
+
+def _validos(modelo, inicio, fim):
+    return modelo.ativos.filter(
+        evento__ativo=True,
+        inicio__gte=_momento(inicio),
+        inicio__lt=_momento(fim),
+    ).exclude(evento__status='cancelado').annotate(
+        semana=TruncWeek('evento__data_evento'),
+    )
+
+
+def _agregar_semanas(semanas):
+    """
+    {segunda-feira: {'veiculos': {id: {...}}, 'demanda': n, 'oferta': n}}.
+    Busca as semanas no cache e calcula as faltantes em uma consulta por tabela.
+    """
+    chaves = {_chave_cache(segunda): segunda for segunda in semanas}
+    em_cache = cache.get_many(list(chaves))
+    resultado = {chaves[chave]: valor for chave, valor in em_cache.items()}
+
+    faltantes = [segunda for segunda in semanas if segunda not in resultado]
+    if not faltantes:
+        return resultado
+
+    calculadas = {segunda: {'veiculos': {}, 'demanda': 0, 'oferta': 0} for segunda in faltantes}
+    inicio, fim = min(faltantes), max(faltantes) + timedelta(weeks=1)
+
+    vinculos = (
+        _validos(EventoVeiculo, inicio, fim)
+        .values('semana', 'veiculo_id')
+        .annotate(
+            eventos=Count('id'),
+            duracao=Sum(DURACAO_VINCULO),
+            # Oferta: só veículos em operação; os em manutenção continuam na utilização
+            assentos=Sum('veiculo__capacidade', filter=Q(veiculo__status='disponivel', veiculo__ativo=True)),
+        )
+        .order_by()
+    )
+    for linha in vinculos:
+        semana = calculadas.get(_semana(linha['semana']))
+        if semana is None:
+            continue
+        semana['oferta'] += linha['assentos'] or 0
+        semana['veiculos'][linha['veiculo_id']] = {
+            'eventos': linha['eventos'],
+            'segundos': (linha['duracao'] or timedelta()).total_seconds(),
+            'passageiros': 0,
+        }
+
+    # Demanda: todos que precisam de transporte, com ou sem lugar já atribuído
+    passageiros = (
+        _validos(VoluntarioEvento, inicio, fim)
+        .filter(vai_no_veiculo=True)
+        .values('semana', 'evento_veiculo__veiculo_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for linha in passageiros:
+        semana = calculadas.get(_semana(linha['semana']))
+        if semana is None:
+            continue
+        semana['demanda'] += linha['total']
+        veiculo = semana['veiculos'].get(linha['evento_veiculo__veiculo_id'])
+        if veiculo is not None:
+            veiculo['passageiros'] += linha['total']
+
+    atual = segunda_feira(timezone.localdate())
+    fechadas = {_chave_cache(s): v for s, v in calculadas.items() if s < atual}
+    abertas = {_chave_cache(s): v for s, v in calculadas.items() if s >= atual}
+    if fechadas:
+        cache.set_many(fechadas, CACHE_SEMANAS_FECHADAS)
+    if abertas:
+        cache.set_many(abertas, CACHE_SEMANAS_ABERTAS)
+
+    resultado.update(calculadas)
+    return resultado
+
+
+def eventos_sem_veiculo(veiculo_ids=None):
+    """
+    Vínculos de eventos futuros com veículos fora de operação (manutenção ou
+    indisponível) ou, se informado, com os veículos de `veiculo_ids`.
+    """
+    vinculos = EventoVeiculo.ativos.filter(
+        evento__ativo=True,
+        fim__gt=timezone.now(),
+    ).exclude(evento__status='cancelado')
+
+    if veiculo_ids is None:
+        vinculos = vinculos.exclude(veiculo__status='disponivel')
+    else:
+        vinculos = vinculos.filter(veiculo_id__in=veiculo_ids)
+
+    return vinculos.select_related('evento', 'veiculo').only(
+        'inicio', 'veiculo__nome', 'veiculo__status', 'veiculo__capacidade',
+        'evento__nome_escola', 'evento__cidade', 'evento__data_evento',
+        'evento__hora_inicio', 'evento__hora_fim', 'evento__status',
+    ).order_by('inicio')
+
+
+def relatorio_frota(semanas_passadas=4, semanas_futuras=8):
+    """
+    Utilização de cada veículo nas semanas encerradas e previsão de demanda
+    de assentos da semana atual em diante.
+    """
+    if not (1 <= semanas_passadas <= MAX_SEMANAS and 1 <= semanas_futuras <= MAX_SEMANAS):
+        raise ValueError(f'O número de semanas deve estar entre 1 e {MAX_SEMANAS}.')
+
+    atual = segunda_feira(timezone.localdate())
+    passadas = [atual - timedelta(weeks=n) for n in range(semanas_passadas, 0, -1)]
+    futuras = [atual + timedelta(weeks=n) for n in range(semanas_futuras)]
+    semanas = _agregar_semanas(passadas + futuras)
+
+    horas_disponiveis = HORAS_DISPONIVEIS_SEMANA * len(passadas)
+    utilizacao = []
+    for veiculo in Veiculo.ativos.order_by('nome').only('nome', 'placa', 'capacidade', 'status'):
+        usos = [semanas[s]['veiculos'].get(veiculo.id) for s in passadas]
+        usos = [uso for uso in usos if uso]
+        previstos = [semanas[s]['veiculos'].get(veiculo.id) for s in futuras]
+        previstos = [uso for uso in previstos if uso]
+        horas_reservadas = sum(uso['segundos'] for uso in usos) / 3600
+
+        utilizacao.append({
+            'veiculo': veiculo,
+            'eventos': sum(uso['eventos'] for uso in usos),
+            'passageiros': sum(uso['passageiros'] for uso in usos),
+            'horas_reservadas': round(horas_reservadas, 1),
+            'horas_disponiveis': horas_disponiveis,
+            'taxa_utilizacao': round(100 * horas_reservadas / horas_disponiveis, 1),
+            'ocioso': not usos,
+            'eventos_previstos': sum(uso['eventos'] for uso in previstos),
+            'horas_previstas': round(sum(uso['segundos'] for uso in previstos) / 3600, 1),
+        })
+
+    previsao = [
+        {
+            'semana': segunda,
+            'fim_semana': segunda + timedelta(days=6),
+            'demanda': semanas[segunda]['demanda'],
+            'oferta': semanas[segunda]['oferta'],
+            'deficit': max(semanas[segunda]['demanda'] - semanas[segunda]['oferta'], 0),
+        }
+        for segunda in futuras
+    ]
+
+    return {
+        'periodo_inicio': passadas[0],
+        'periodo_fim': atual - timedelta(days=1),
+        'utilizacao': utilizacao,
+        'ociosos': [linha for linha in utilizacao if linha['ocioso']],
+        'previsao': previsao,
+        'semanas_deficit': [semana for semana in previsao if semana['deficit']],
+        'sem_veiculo': list(eventos_sem_veiculo()),
+    }
@@ -0,0 +1,201 @@
+"""
+Feeds iCalendar (.ics) da escala de voluntários, veículos e da agenda geral.
+
+Cada feed é gerado com uma única consulta e transmitido linha a linha. O
+corpo gerado fica em cache por recurso, identificado por uma versão que os
+signals incrementam quando um vínculo, evento, veículo ou voluntário muda; a
+mesma versão compõe o ETag, permitindo responder 304 sem tocar no banco.
+UPDATEs em lote não disparam signals: quem os faz chama invalidar_feeds (ou
+signals.publicar_em_lote, para vínculos).
+"""
+import time
+from datetime import timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Evento, EventoVeiculo, VoluntarioEvento
+
+
+# Eventos mais antigos que isso ficam fora dos feeds
+JANELA_PASSADO_DIAS = 90
+CACHE_FEED = 60 * 60 * 24
+RECURSOS_ICAL = ('geral', 'voluntario', 'veiculo')
+
+
+def _chave_versao(recurso, objeto_id):
+    return f'vmm:ical:{recurso}:{objeto_id}:versao'
+
+
+def versao_feed(recurso, objeto_id=0):
+    """Versão atual do feed; iniciada com o relógio para não repetir após limpar o cache"""
+    chave = _chave_versao(recurso, objeto_id)
+    versao = cache.get(chave)
+    if versao is None:
+        cache.add(chave, time.time_ns(), None)
+        versao = cache.get(chave)
+    return versao
+
+
+def invalidar_feeds(recurso, objeto_ids):
+    """Incrementa a versão dos feeds informados (o conteúdo antigo expira sozinho)"""
+    for objeto_id in set(objeto_ids):
+        chave = _chave_versao(recurso, objeto_id)
+        try:
+            cache.incr(chave)
+        except ValueError:
+            cache.set(chave, time.time_ns(), None)
+
+
+def etag_feed(recurso, objeto_id=0):
+    # A data entra no ETag porque a janela de eventos passados anda a cada dia
+    return f'"{recurso}-{objeto_id}-{versao_feed(recurso, objeto_id)}-{timezone.localdate():%Y%m%d}"'
+
+
+def _chave_conteudo(recurso, objeto_id):
+    return f'vmm:ical:{recurso}:{objeto_id}:{etag_feed(recurso, objeto_id).strip(chr(34))}'
+
+
+def _texto(valor):
+    """Escapa um valor TEXT conforme a RFC 5545"""
+    return (
+        str(valor).replace('\\', '\\\\').replace(';', '\\;')
+        .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _linha(conteudo):
+    """Quebra a linha em blocos de até 75 octetos, com continuação iniciada por espaço"""
+    dados = conteudo.encode('utf-8')
+    if len(dados) <= 75:
+        return conteudo + '\r\n'
+
+    partes, atual, limite = [], b'', 75
+    for caractere in conteudo:
+        codificado = caractere.encode('utf-8')
+        if len(atual) + len(codificado) > limite:
+            partes.append(atual.decode('utf-8'))
+            atual, limite = b'', 74
+        atual += codificado
+    partes.append(atual.decode('utf-8'))
+    return '\r\n '.join(partes) + '\r\n'
+
+
+def _utc(momento):
+    return momento.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _vevento(evento, uid, resumo, descricao, carimbo):
+    yield _linha('BEGIN:VEVENT')
+    yield _linha(f'UID:{uid}')
+    yield _linha(f'DTSTAMP:{carimbo}')
+    yield _linha(f'DTSTART:{_utc(evento.inicio)}')
+    yield _linha(f'DTEND:{_utc(evento.fim)}')
+    yield _linha(f'SUMMARY:{_texto(resumo)}')
+    yield _linha(f'LOCATION:{_texto(f"{evento.endereco} - {evento.cidade}")}')
+    if descricao:
+        yield _linha(f'DESCRIPTION:{_texto(descricao)}')
+    yield _linha('STATUS:CANCELLED' if evento.status == 'cancelado' else 'STATUS:CONFIRMED')
+    yield _linha('END:VEVENT')
+
+
+def _eventos_geral(objeto_id, desde, carimbo):
+    eventos = Evento.ativos.filter(inicio__gte=desde).only(
+        'id', 'nome_escola', 'cidade', 'endereco', 'data_evento',
+        'inicio', 'fim', 'status',
+    ).order_by('inicio')
+
+    for evento in eventos.iterator(chunk_size=500):
+        yield from _vevento(
+            evento, f'evento-{evento.id}@vmm', f'VMM: {evento.nome_escola}',
+            evento.get_status_display(), carimbo,
+        )
+
+
+def _eventos_voluntario(voluntario_id, desde, carimbo):
+    alocacoes = VoluntarioEvento.ativos.filter(
+        voluntario_id=voluntario_id,
+        evento__ativo=True,
+        inicio__gte=desde,
+    ).select_related('evento', 'evento_veiculo__veiculo').only(
+        'id', 'funcao', 'funcao_customizada',
+        'evento__id', 'evento__nome_escola', 'evento__cidade', 'evento__endereco',
+        'evento__data_evento', 'evento__inicio', 'evento__fim', 'evento__status',
+        'evento_veiculo__id', 'evento_veiculo__veiculo__id', 'evento_veiculo__veiculo__nome',
+    ).order_by('inicio')
+
+    for ve in alocacoes.iterator(chunk_size=500):
+        funcao = ve.funcao_customizada if ve.funcao == 'outro' else ve.get_funcao_display()
+        descricao = f'Função: {funcao}'
+        if ve.evento_veiculo:
+            descricao += f'\nVeículo: {ve.evento_veiculo.veiculo.nome}'
+        yield from _vevento(
+            ve.evento, f'evento-{ve.evento_id}-voluntario-{voluntario_id}@vmm',
+            f'VMM: {ve.evento.nome_escola}', descricao, carimbo,
+        )
+
+
+def _eventos_veiculo(veiculo_id, desde, carimbo):
+    vinculos = EventoVeiculo.ativos.filter(
+        veiculo_id=veiculo_id,
+        evento__ativo=True,
+        inicio__gte=desde,
+    ).select_related('evento', 'motorista').only(
+        'id',
+        'evento__id', 'evento__nome_escola', 'evento__cidade', 'evento__endereco',
+        'evento__data_evento', 'evento__inicio', 'evento__fim', 'evento__status',
+        'motorista__id', 'motorista__nome_completo',
+    ).order_by('inicio')
+
+    for ev in vinculos.iterator(chunk_size=500):
+        descricao = f'Motorista: {ev.motorista.nome_completo}' if ev.motorista else ''
+        yield from _vevento(
+            ev.evento, f'evento-{ev.evento_id}-veiculo-{veiculo_id}@vmm',
+            f'VMM: {ev.evento.nome_escola}', descricao, carimbo,
+        )
+
+
+_GERADORES = {
+    'geral': (_eventos_geral, 'Eventos Veja Um Mundo Melhor'),
+    'voluntario': (_eventos_voluntario, 'Minha escala - Veja Um Mundo Melhor'),
+    'veiculo': (_eventos_veiculo, 'Agenda do veículo - Veja Um Mundo Melhor'),
+}
+
+
+def _gerar(recurso, objeto_id):
+    gerador, nome = _GERADORES[recurso]
+    carimbo = _utc(timezone.now())
+    desde = timezone.now() - timedelta(days=JANELA_PASSADO_DIAS)
+
+    yield _linha('BEGIN:VCALENDAR')
+    yield _linha('VERSION:2.0')
+    yield _linha('PRODID:-//Sicoob//Veja Um Mundo Melhor//PT-BR')
+    yield _linha('CALSCALE:GREGORIAN')
+    yield _linha('METHOD:PUBLISH')
+    yield _linha(f'X-WR-CALNAME:{_texto(nome)}')
+    yield _linha('REFRESH-INTERVAL;VALUE=DURATION:PT15M')
+    yield from gerador(objeto_id, desde, carimbo)
+    yield _linha('END:VCALENDAR')
+
+
+def conteudo_feed(recurso, objeto_id=0):
+    """
+    Corpo do feed: do cache, como string única, ou um gerador que transmite
+    o resultado da consulta e grava o corpo completo no cache ao terminar.
+    """
+    if recurso not in RECURSOS_ICAL:
+        raise ValueError(f'Recurso de calendário inválido: {recurso}')
+
+    chave = _chave_conteudo(recurso, objeto_id)
+    corpo = cache.get(chave)
+    if corpo is not None:
+        return corpo
+
+    def transmitir():
+        partes = []
+        for linha in _gerar(recurso, objeto_id):
+            partes.append(linha)
+            yield linha
+        cache.set(chave, ''.join(partes), CACHE_FEED)
+
+    return transmitir()
@@ -0,0 +1,196 @@
+"""
+Chaves de idempotência para os formulários que gravam dados.
+
+Cada formulário leva um campo oculto com uma chave aleatória
+(``{% chave_idempotencia %}``). A primeira requisição com a chave executa a
+view e guarda a resposta; reenvios da mesma chave dentro de VALIDADE (duplo
+clique, conexão móvel que caiu antes da resposta) recebem a resposta guardada
+sem passar pela view nem pelo ORM. A chave vale só para o mesmo endereço, o
+mesmo usuário (ou sessão) e o mesmo conteúdo do formulário: outro conteúdo com
+a mesma chave é tratado como um envio novo.
+
+Respostas JSON (os fragmentos da página do evento) ficam só no cache. Redirects
+ficam também na tabela RespostaIdempotente, sem corpo, para processos que não
+compartilham cache ou depois de uma limpeza dele. Páginas HTML devolvidas pela
+view (formulário com erros, que repete os dados digitados, como CPF e telefone)
+não são guardadas: o reenvio executa a view de novo. Por isso os formulários
+decorados redirecionam depois do sucesso (post/redirect/get).
+
+Um reenvio que chega com o original ainda em execução espera até
+ESPERA_MAXIMA; se o original não terminar, recebe uma página "em
+processamento" (ou JSON com status 409, nos pedidos via fetch).
+"""
+import hashlib
+import json
+import re
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
+
+from .models import RespostaIdempotente
+
+
+CAMPO_CHAVE = 'chave_idempotencia'
+VALIDADE = timedelta(minutes=30)
+
+# Uma requisição repetida enquanto a original ainda roda espera por ela
+EM_ANDAMENTO = 'em_andamento'
+PRAZO_EXECUCAO = 60
+ESPERA_MAXIMA = 5.0
+INTERVALO_ESPERA = 0.1
+
+CABECALHOS_GUARDADOS = ('Content-Type', 'Location')
+
+# Campos que mudam entre envios do mesmo formulário sem mudar o pedido
+CAMPOS_IGNORADOS = {CAMPO_CHAVE, 'csrfmiddlewaretoken'}
+
+_FORMATO_CHAVE = re.compile(r'[0-9a-fA-F-]{16,64}')
+
+
+def _dono(request):
+    """Usuário logado, senão a sessão, senão o cookie CSRF (todo formulário daqui o tem)"""
+    if request.user.is_authenticated:
+        return f'usuario:{request.user.pk}'
+    if request.session.session_key:
+        return f'sessao:{request.session.session_key}'
+    if request.META.get('CSRF_COOKIE'):
+        return f'csrf:{request.META["CSRF_COOKIE"]}'
+    return None
+
+
+def _conteudo(request):
+    campos = sorted(
+        (nome, valor)
+        for nome in request.POST if nome not in CAMPOS_IGNORADOS
+        for valor in request.POST.getlist(nome)
+    )
+    return json.dumps(campos, ensure_ascii=False)
+
+
+def _chave(request):
+    """Chave do cache para o reenvio: endereço, dono e conteúdo entram junto com a chave do formulário"""
+    chave = request.POST.get(CAMPO_CHAVE, '')
+    dono = _dono(request)
+    # Sem como identificar quem envia, a chave sozinha seria compartilhada entre clientes
+    if not _FORMATO_CHAVE.fullmatch(chave) or dono is None:
+        return None
+    partes = '|'.join((request.path, dono, _conteudo(request), chave))
+    return 'idempotencia:' + hashlib.sha256(partes.encode()).hexdigest()
+
+
+def _mensagens_novas(request, antes):
+    # Mensagens adicionadas pela view e ainda não exibidas (saem no cookie do redirect)
+    fila = getattr(messages.get_messages(request), '_queued_messages', [])
+    return [[m.level, str(m.message), m.extra_tags] for m in fila[antes:]]
+
+
+def _guardar(chave, request, response, antes):
+    redirect = 300 <= response.status_code < 400
+    fragmentos_json = response.get('Content-Type', '').startswith('application/json')
+    if response.streaming or response.status_code >= 500 or not (redirect or fragmentos_json):
+        cache.delete(chave)
+        return
+
+    resposta = {
+        'status': response.status_code,
+        'conteudo': response.content,
+        'cabecalhos': {nome: response[nome] for nome in CABECALHOS_GUARDADOS if response.has_header(nome)},
+        'mensagens': _mensagens_novas(request, antes),
+    }
+    cache.set(chave, resposta, VALIDADE.total_seconds())
+    if not redirect:
+        return
+    try:
+        RespostaIdempotente.objects.create(chave=chave, **{**resposta, 'conteudo': b''})
+    except IntegrityError:
+        # Outro processo, sem o mesmo cache, já gravou a resposta desta chave
+        pass
+
+
+def _buscar_no_banco(chave):
+    resposta = RespostaIdempotente.objects.filter(
+        chave=chave, data_criacao__gte=timezone.now() - VALIDADE
+    ).values('status', 'conteudo', 'cabecalhos', 'mensagens').first()
+    if resposta is not None:
+        resposta['conteudo'] = bytes(resposta['conteudo'])
+        cache.set(chave, resposta, VALIDADE.total_seconds())
+    return resposta
+
+
+def _aguardar(chave):
+    limite = time.monotonic() + ESPERA_MAXIMA
+    while time.monotonic() < limite:
+        time.sleep(INTERVALO_ESPERA)
+        resposta = cache.get(chave)
+        if resposta != EM_ANDAMENTO:
+            return resposta
+    return None
+
+
+def _reproduzir(request, resposta):
+    response = HttpResponse(resposta['conteudo'], status=resposta['status'])
+    for nome, valor in resposta['cabecalhos'].items():
+        response[nome] = valor
+    for nivel, texto, extra in resposta['mensagens']:
+        messages.add_message(request, nivel, texto, extra_tags=extra)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _em_processamento(request):
+    """Resposta ao reenvio que chegou enquanto o envio original ainda roda"""
+    mensagem = 'O envio anterior deste formulário ainda está sendo processado. Aguarde alguns segundos e confira o resultado.'
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({'erro': mensagem}, status=409)
+
+    voltar = request.META.get('HTTP_REFERER', '')
+    if not url_has_allowed_host_and_scheme(voltar, allowed_hosts={request.get_host()}, require_https=request.is_secure()):
+        voltar = request.path
+    return render(request, 'em_processamento.html', {'mensagem': mensagem, 'voltar': voltar}, status=409)
+
+
+def idempotente(view):
+    """
+    Responde reenvios de um POST com a mesma chave de idempotência usando a
+    resposta da primeira execução. Sem chave no formulário, a view roda normalmente.
+    """
+    @wraps(view)
+    def _view(request, *args, **kwargs):
+        chave = _chave(request) if request.method == 'POST' else None
+        if chave is None:
+            return view(request, *args, **kwargs)
+
+        resposta = cache.get(chave)
+        if resposta is None:
+            resposta = _buscar_no_banco(chave)
+
+        if resposta is None and cache.add(chave, EM_ANDAMENTO, PRAZO_EXECUCAO):
+            antes = len(getattr(messages.get_messages(request), '_queued_messages', []))
+            try:
+                response = view(request, *args, **kwargs)
+            except BaseException:
+                cache.delete(chave)
+                raise
+            _guardar(chave, request, response, antes)
+            return response
+
+        if resposta is None or resposta == EM_ANDAMENTO:
+            resposta = _aguardar(chave)
+        if resposta is None:
+            return _em_processamento(request)
+        return _reproduzir(request, resposta)
+
+    return _view
+
+
+def limpar_expiradas():
+    """Apaga do banco as respostas mais antigas que VALIDADE"""
+    return RespostaIdempotente.objects.filter(data_criacao__lt=timezone.now() - VALIDADE).delete()[0]
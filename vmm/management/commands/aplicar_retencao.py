@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from vmm.retencao import etapas, executar
+
+
+class Command(BaseCommand):
+    help = (
+        'Apaga registros inativos há mais de RETENCAO_DIAS e anonimiza os voluntários '
+        '(LGPD). Trabalha em lotes pequenos, cada um em uma transação curta, e pode '
+        'rodar em horário comercial.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=settings.RETENCAO_DIAS,
+                            help=f'Dias desde a inativação (padrão: RETENCAO_DIAS={settings.RETENCAO_DIAS}).')
+        parser.add_argument('--lote', type=int, default=1000,
+                            help='Registros por transação (padrão: 1000).')
+        parser.add_argument('--pausa', type=float, default=0.05,
+                            help='Segundos de espera entre lotes, para não disputar com o uso normal (padrão: 0.05).')
+        parser.add_argument('--excluir-voluntarios', action='store_true',
+                            help='Apaga os voluntários (e suas participações) em vez de anonimizá-los; '
+                                 'quem tem participações arquivadas continua sendo anonimizado.')
+        parser.add_argument('--simular', action='store_true',
+                            help='Só conta o que seria apagado ou anonimizado.')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 1 or options['lote'] < 1:
+            raise CommandError('--dias e --lote devem ser positivos.')
+
+        limite = timezone.now() - timedelta(days=options['dias'])
+        self.stdout.write(f'Registros inativos desde antes de {timezone.localtime(limite):%d/%m/%Y %H:%M}')
+
+        total_linhas = total_segundos = 0
+        for nome, consulta, anonimizar in etapas(limite, options['excluir_voluntarios']):
+            acao = 'anonimizado(s)' if anonimizar else 'apagado(s)'
+            if options['simular']:
+                self.stdout.write(f'{nome:<24} {consulta.count():>8} a serem {acao}')
+                continue
+
+            resultado = executar(consulta, anonimizar, options['lote'], options['pausa'])
+            total_linhas += resultado['linhas']
+            total_segundos += resultado['segundos']
+            por_segundo = resultado['linhas'] / resultado['segundos'] if resultado['segundos'] else 0
+            self.stdout.write(
+                f'{nome:<24} {resultado["linhas"]:>8} {acao} em {resultado["lotes"]} lote(s), '
+                f'{resultado["segundos"]:.2f}s, {por_segundo:.0f} linhas/s'
+            )
+
+        if not options['simular']:
+            por_segundo = total_linhas / total_segundos if total_segundos else 0
+            self.stdout.write(self.style.SUCCESS(
+                f'Total: {total_linhas} linha(s) em {total_segundos:.2f}s ({por_segundo:.0f} linhas/s)'
+            ))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from vmm.arquivo import arquivar, arquivaveis
+from vmm.models import EventoVeiculo, VoluntarioEvento
+
+
+class Command(BaseCommand):
+    help = (
+        'Move os eventos concluídos de anos encerrados, com seus voluntários e '
+        'veículos, para as tabelas de arquivo. Os relatórios de horas continuam '
+        'contando esses eventos. Trabalha em lotes, cada um em uma transação curta.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ano', type=int, default=timezone.localdate().year,
+                            help='Arquiva os eventos anteriores a 1º de janeiro deste ano (padrão: o ano atual).')
+        parser.add_argument('--lote', type=int, default=200,
+                            help='Eventos por transação (padrão: 200).')
+        parser.add_argument('--pausa', type=float, default=0.05,
+                            help='Segundos de espera entre lotes (padrão: 0.05).')
+        parser.add_argument('--simular', action='store_true',
+                            help='Só conta o que seria arquivado.')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser positivo.')
+        if options['ano'] > timezone.localdate().year:
+            raise CommandError('Só anos encerrados podem ser arquivados: a temporada atual fica nas tabelas do dia a dia.')
+
+        self.stdout.write(f'Eventos concluídos antes de 01/01/{options["ano"]}')
+
+        if options['simular']:
+            consulta = arquivaveis(options['ano'])
+            self.stdout.write(f'{"eventos":<12} {consulta.count():>8}')
+            self.stdout.write(f'{"veículos":<12} {EventoVeiculo.ativos.filter(evento__in=consulta).count():>8}')
+            self.stdout.write(f'{"voluntários":<12} {VoluntarioEvento.ativos.filter(evento__in=consulta).count():>8}')
+            return
+
+        resultado = arquivar(options['ano'], options['lote'], options['pausa'])
+        linhas = resultado['eventos'] + resultado['veiculos'] + resultado['vinculos']
+        por_segundo = linhas / resultado['segundos'] if resultado['segundos'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado["eventos"]} evento(s), {resultado["veiculos"]} veículo(s) e '
+            f'{resultado["vinculos"]} voluntário(s) arquivados em {resultado["lotes"]} lote(s), '
+            f'{resultado["segundos"]:.2f}s ({por_segundo:.0f} linhas/s)'
+        ))
@@ -0,0 +1,40 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from vmm.auditoria import auditar_conflitos, descrever
+
+
+def _data(valor):
+    return date.fromisoformat(valor)
+
+
+class Command(BaseCommand):
+    help = 'Lista voluntários e veículos alocados em eventos com horários sobrepostos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=_data,
+                            help='Data inicial (AAAA-MM-DD). Padrão: hoje.')
+        parser.add_argument('--ate', type=_data,
+                            help='Data final (AAAA-MM-DD). Padrão: sem limite.')
+        parser.add_argument('--todos', action='store_true',
+                            help='Inclui eventos passados (ignora --desde).')
+        parser.add_argument('--falhar', action='store_true',
+                            help='Encerra com erro se houver conflitos (útil em cron/CI).')
+
+    def handle(self, *args, **options):
+        desde = None if options['todos'] else (options['desde'] or timezone.localdate())
+        conflitos = auditar_conflitos(desde=desde, ate=options['ate'])
+
+        for conflito in conflitos:
+            self.stdout.write(self.style.WARNING(descrever(conflito)))
+
+        if not conflitos:
+            self.stdout.write(self.style.SUCCESS('Nenhum conflito de agenda encontrado.'))
+            return
+
+        resumo = f'{len(conflitos)} conflito(s) de agenda encontrado(s).'
+        if options['falhar']:
+            raise CommandError(resumo)
+        self.stdout.write(resumo)
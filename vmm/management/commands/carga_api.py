@@ -0,0 +1,91 @@
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _cliente(url, fim, latencias, erros, trava):
+    """Dispara requisições em sequência, reaproveitando a conexão (keep-alive)"""
+    partes = urlsplit(url)
+    caminho = partes.path + (f'?{partes.query}' if partes.query else '')
+    classe = http.client.HTTPSConnection if partes.scheme == 'https' else http.client.HTTPConnection
+    conexao = None
+    locais, falhas = [], 0
+
+    while time.perf_counter() < fim:
+        inicio = time.perf_counter()
+        try:
+            if conexao is None:
+                conexao = classe(partes.netloc, timeout=10)
+            conexao.request('GET', caminho)
+            resposta = conexao.getresponse()
+            resposta.read()
+            if resposta.status >= 500:
+                falhas += 1
+            else:
+                locais.append(time.perf_counter() - inicio)
+        except (OSError, http.client.HTTPException):
+            falhas += 1
+            if conexao is not None:
+                conexao.close()
+            conexao = None
+
+    if conexao is not None:
+        conexao.close()
+    with trava:
+        latencias.extend(locais)
+        erros.append(falhas)
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga simples para comparar endpoints servidos via WSGI e ASGI. '
+        'Ex.: suba o projeto com "gunicorn core.wsgi -w 1" e "uvicorn core.asgi:application '
+        '--workers 1" e passe a mesma rota de cada servidor com --url.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', required=True,
+                            help='URL completa a ser testada (pode ser repetida).')
+        parser.add_argument('--concorrencia', type=int, default=50,
+                            help='Clientes simultâneos (padrão: 50).')
+        parser.add_argument('--duracao', type=float, default=10.0,
+                            help='Duração de cada rodada em segundos (padrão: 10).')
+
+    def handle(self, *args, **options):
+        concorrencia = options['concorrencia']
+        duracao = options['duracao']
+        if concorrencia < 1 or duracao <= 0:
+            raise CommandError('Concorrência e duração devem ser positivas.')
+
+        for url in options['url']:
+            latencias, erros = [], []
+            trava = threading.Lock()
+            fim = time.perf_counter() + duracao
+
+            clientes = [
+                threading.Thread(target=_cliente, args=(url, fim, latencias, erros, trava))
+                for _ in range(concorrencia)
+            ]
+            for cliente in clientes:
+                cliente.start()
+            for cliente in clientes:
+                cliente.join()
+
+            total_erros = sum(erros)
+            if not latencias:
+                self.stdout.write(self.style.ERROR(f'{url}: nenhuma resposta válida ({total_erros} erros)'))
+                continue
+
+            latencias.sort()
+            p95 = latencias[int(len(latencias) * 0.95) - 1] if len(latencias) >= 20 else latencias[-1]
+            self.stdout.write(
+                f'{url}\n'
+                f'  requisições/s: {len(latencias) / duracao:.1f}\n'
+                f'  latência p50:  {statistics.median(latencias) * 1000:.1f} ms\n'
+                f'  latência p95:  {p95 * 1000:.1f} ms\n'
+                f'  erros:         {total_erros}'
+            )
@@ -0,0 +1,110 @@
+import statistics
+import time
+from datetime import time as hora
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from vmm.checkin import gerar_token
+from vmm.models import Evento, Voluntario, VoluntarioEvento
+
+
+def _rodada(cliente, urls):
+    """Lê todos os QR codes em sequência; devolve latências e respostas fora do esperado"""
+    latencias, falhas = [], 0
+    inicio_rodada = time.perf_counter()
+    for url in urls:
+        inicio = time.perf_counter()
+        resposta = cliente.post(url)
+        latencias.append(time.perf_counter() - inicio)
+        if resposta.status_code != 200:
+            falhas += 1
+    return time.perf_counter() - inicio_rodada, latencias, falhas
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a vazão do check-in por QR code em um único processo: cria um evento '
+        'acontecendo agora com N voluntários e faz o POST de cada token pela pilha '
+        'completa de middlewares. Nada é gravado: tudo roda em uma transação desfeita.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voluntarios', type=int, default=2000,
+                            help='Voluntários escalados no evento de teste (padrão: 2000).')
+
+    def handle(self, *args, **options):
+        total = options['voluntarios']
+        if total < 1:
+            raise CommandError('O número de voluntários deve ser positivo.')
+
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=hosts):
+            urls = self._preparar(total)
+            cliente = Client()
+
+            with CaptureQueriesContext(connection) as consultas:
+                cliente.post(urls[0])
+            primeira = len(consultas)
+
+            rodadas = {
+                'primeira leitura': _rodada(cliente, urls[1:]),
+                'leitura repetida': _rodada(cliente, urls),
+            }
+            with CaptureQueriesContext(connection) as consultas:
+                cliente.post(urls[0])
+            repetida = len(consultas)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'Check-in de {total} voluntário(s), um processo, banco {connection.vendor}')
+        self.stdout.write(f'Consultas por leitura: {primeira} (primeira), {repetida} (repetida)\n')
+        for nome, (duracao, latencias, falhas) in rodadas.items():
+            ordenadas = sorted(latencias)
+            p95 = ordenadas[int(len(ordenadas) * 0.95) - 1] if len(ordenadas) > 1 else ordenadas[0]
+            self.stdout.write(
+                f'{nome:<18} {len(latencias) / duracao:>8.0f} req/s   '
+                f'p50 {1000 * statistics.median(ordenadas):.2f}ms   '
+                f'p95 {1000 * p95:.2f}ms   falhas {falhas}'
+            )
+
+    def _preparar(self, total):
+        evento = Evento.objects.create(
+            nome_escola='Medição de check-in',
+            responsavel_escola='-',
+            telefone_responsavel='-',
+            cidade='-',
+            endereco='-',
+            data_evento=timezone.localdate(),
+            hora_inicio=hora(0, 0),
+            hora_fim=hora(23, 59),
+        )
+        voluntarios = Voluntario.objects.bulk_create([
+            Voluntario(
+                nome_completo=f'Check-in {i}',
+                email_corporativo=f'medir-checkin-{i}@exemplo.invalid',
+                cpf=f'chk{i:011d}',
+                telefone='(00) 00000-0000',
+                agencia='001',
+                setor='-',
+                tamanho_camiseta='M',
+            )
+            for i in range(total)
+        ])
+        # bulk_create não chama save(): o intervalo do evento vai preenchido aqui
+        vinculos = VoluntarioEvento.objects.bulk_create([
+            VoluntarioEvento(
+                evento=evento, voluntario=voluntario, funcao='monitor',
+                inicio=evento.inicio, fim=evento.fim,
+            )
+            for voluntario in voluntarios
+        ])
+        if vinculos[0].id is None:
+            # Bancos sem RETURNING (MySQL) não devolvem as chaves do bulk_create
+            vinculos = list(VoluntarioEvento.objects.filter(evento=evento).order_by('id'))
+        return [reverse('vmm:checkin', args=[gerar_token(v)]) for v in vinculos]
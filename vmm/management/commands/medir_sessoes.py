@@ -0,0 +1,118 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from vmm.models import Evento
+
+
+MENSAGENS_COOKIE = 'django.contrib.messages.storage.cookie.CookieStorage'
+MENSAGENS_PADRAO = 'django.contrib.messages.storage.fallback.FallbackStorage'
+
+
+def _passos(evento_id):
+    """Navegação típica de um coordenador: lista, ação com mensagem, detalhe e admin"""
+    detalhe = reverse('vmm:detalhe_evento', args=[evento_id])
+    return [
+        ('lista de eventos', 'get', reverse('vmm:lista_eventos')),
+        # Formulário vazio: gera a mensagem de erro sem alterar dados
+        ('ação no evento', 'post', reverse('vmm:adicionar_voluntario_evento', args=[evento_id])),
+        ('detalhe (com mensagem)', 'get', detalhe),
+        ('detalhe', 'get', detalhe),
+        # Páginas que usam request.user carregam a sessão a cada requisição
+        ('admin', 'get', reverse('admin:index')),
+    ]
+
+
+def _medir(cliente, metodo, url):
+    with CaptureQueriesContext(connection) as consultas:
+        inicio = time.perf_counter()
+        getattr(cliente, metodo)(url)
+        duracao = time.perf_counter() - inicio
+    sessao = sum(1 for consulta in consultas if 'django_session' in consulta['sql'])
+    return len(consultas), sessao, duracao
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara as consultas ao banco por requisição em cada SESSION_MODO '
+        '(db, cached_db, cookie) nas páginas de lista e de detalhe de eventos, '
+        'com um coordenador logado. Nada é gravado: tudo roda em uma transação desfeita.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--evento', type=int,
+                            help='Evento usado na página de detalhe (padrão: o primeiro ativo).')
+        parser.add_argument('--repeticoes', type=int, default=20,
+                            help='Vezes que a navegação é repetida para medir o tempo (padrão: 20).')
+
+    def handle(self, *args, **options):
+        repeticoes = options['repeticoes']
+        if repeticoes < 1:
+            raise CommandError('O número de repetições deve ser positivo.')
+
+        evento_id = options['evento'] or Evento.ativos.values_list('id', flat=True).first()
+        if evento_id is None or not Evento.objects.filter(id=evento_id).exists():
+            raise CommandError('Nenhum evento encontrado para a página de detalhe.')
+
+        resultados = {}
+        with transaction.atomic():
+            usuario = get_user_model().objects.create(
+                username='medir_sessoes', is_staff=True, is_superuser=True
+            )
+            for modo, engine in settings.SESSION_MODOS.items():
+                resultados[modo] = self._medir_modo(engine, modo, usuario, evento_id, repeticoes)
+            transaction.set_rollback(True)
+
+        self._relatorio(resultados, evento_id)
+
+    def _medir_modo(self, engine, modo, usuario, evento_id, repeticoes):
+        mensagens = MENSAGENS_PADRAO if modo == 'db' else MENSAGENS_COOKIE
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(SESSION_ENGINE=engine, MESSAGE_STORAGE=mensagens, ALLOWED_HOSTS=hosts):
+            cliente = Client()
+            cliente.force_login(usuario)
+            passos = _passos(evento_id)
+
+            # A primeira volta aquece caches (sessão em cached_db, templates, consultas)
+            for _, metodo, url in passos:
+                getattr(cliente, metodo)(url)
+
+            medidas = {nome: [] for nome, _, _ in passos}
+            for _ in range(repeticoes):
+                for nome, metodo, url in passos:
+                    medidas[nome].append(_medir(cliente, metodo, url))
+
+        return {
+            nome: {
+                # Contagens são iguais em todas as voltas; o tempo é a média
+                'consultas': valores[-1][0],
+                'sessao': valores[-1][1],
+                'ms': 1000 * sum(v[2] for v in valores) / len(valores),
+            }
+            for nome, valores in medidas.items()
+        }
+
+    def _relatorio(self, resultados, evento_id):
+        modos = list(resultados)
+        self.stdout.write(f'Consultas por requisição (sessão entre parênteses), evento {evento_id}\n')
+        self.stdout.write(f'{"página":<26}' + ''.join(f'{modo:>20}' for modo in modos))
+
+        for nome in resultados[modos[0]]:
+            celulas = ''.join(
+                f'{resultados[m][nome]["consultas"]:>6} ({resultados[m][nome]["sessao"]}) '
+                f'{resultados[m][nome]["ms"]:>6.1f}ms'
+                for m in modos
+            )
+            self.stdout.write(f'{nome:<26}{celulas}')
+
+        base = sum(passo['consultas'] for passo in resultados['db'].values())
+        self.stdout.write('')
+        for modo in modos[1:]:
+            total = sum(passo['consultas'] for passo in resultados[modo].values())
+            self.stdout.write(f'{modo}: {base - total} consulta(s) a menos que db na navegação completa')
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from vmm.idempotencia import VALIDADE, limpar_expiradas
+from vmm.tarefas import processar_lote
+
+
+class Command(BaseCommand):
+    help = 'Worker da fila de tarefas em segundo plano (modelo Tarefa).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=50,
+                            help='Máximo de tarefas reservadas por vez (padrão: 50).')
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos de espera quando a fila está vazia (padrão: 2).')
+        parser.add_argument('--uma-vez', action='store_true',
+                            help='Processa a fila até esvaziar e encerra.')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Worker de tarefas iniciado.')
+        ultima_limpeza = None
+        try:
+            while True:
+                processadas = processar_lote(options['lote'])
+                if processadas:
+                    self.stdout.write(f'{processadas} tarefa(s) processada(s).')
+                    continue
+                # Fila vazia: aproveita para apagar as respostas idempotentes vencidas
+                if ultima_limpeza is None or time.monotonic() - ultima_limpeza >= VALIDADE.total_seconds():
+                    limpar_expiradas()
+                    ultima_limpeza = time.monotonic()
+                if options['uma_vez']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write('Worker de tarefas encerrado.')
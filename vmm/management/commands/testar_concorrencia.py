@@ -0,0 +1,186 @@
+import random
+import threading
+import time
+from contextlib import nullcontext
+from datetime import time as hora, timedelta
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from vmm.models import Evento, EventoVeiculo, Veiculo, Voluntario, VoluntarioEvento
+
+
+PREFIXO = 'Concorrência'
+
+
+def _trabalhador(fila, trava, contagem):
+    """Tenta cada alocação da fila como um coordenador faria, em conexão própria"""
+    locais = {'aceitas': 0, 'recusadas': 0, 'erros': 0}
+    try:
+        while True:
+            with trava:
+                if not fila:
+                    break
+                evento, voluntario_id, evento_veiculo = fila.pop()
+            try:
+                VoluntarioEvento(
+                    evento=evento,
+                    voluntario_id=voluntario_id,
+                    funcao='monitor',
+                    vai_no_veiculo=True,
+                    evento_veiculo=evento_veiculo,
+                ).alocar()
+                locais['aceitas'] += 1
+            except ValidationError:
+                locais['recusadas'] += 1
+            except DatabaseError:
+                # Deadlock ou timeout de trava: o banco desfez a transação inteira
+                locais['erros'] += 1
+    finally:
+        connections.close_all()
+        with trava:
+            for chave, valor in locais.items():
+                contagem[chave] += valor
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de estresse da alocação de voluntários: várias threads, cada uma com '
+        'a sua conexão, disputam os lugares dos veículos de dois eventos no mesmo '
+        'horário. No fim confere que nenhum veículo passou da capacidade e que nenhum '
+        'voluntário ficou em dois eventos simultâneos. Os dados de teste são gravados '
+        'de verdade (as threads precisam enxergar os commits umas das outras) e '
+        'apagados ao final. Use um banco de desenvolvimento.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16,
+                            help='Alocações simultâneas (padrão: 16).')
+        parser.add_argument('--voluntarios', type=int, default=200,
+                            help='Voluntários disputando os lugares (padrão: 200).')
+        parser.add_argument('--veiculos', type=int, default=5,
+                            help='Veículos em cada evento (padrão: 5).')
+        parser.add_argument('--capacidade', type=int, default=8,
+                            help='Lugares por veículo (padrão: 8).')
+        parser.add_argument('--sem-travas', action='store_true',
+                            help='Desliga as travas de linha, para comparar (deve gerar excessos).')
+
+    def handle(self, *args, **options):
+        for opcao in ('threads', 'voluntarios', 'veiculos', 'capacidade'):
+            if options[opcao] < 1:
+                raise CommandError(f'--{opcao} deve ser positivo.')
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                'SQLite ignora SELECT ... FOR UPDATE e trava o arquivo inteiro a cada escrita: '
+                'o resultado não representa o MySQL de produção.'
+            ))
+
+        self.criados = {Evento: [], Veiculo: [], Voluntario: []}
+        try:
+            eventos, vinculos, voluntarios = self._preparar(options)
+            fila = [
+                (evento, voluntario.id, random.choice(vinculos[evento.id]))
+                for evento in eventos
+                for voluntario in voluntarios
+            ]
+            random.shuffle(fila)
+            tentativas = len(fila)
+
+            contagem = {'aceitas': 0, 'recusadas': 0, 'erros': 0}
+            trava = threading.Lock()
+            threads = [
+                threading.Thread(target=_trabalhador, args=(fila, trava, contagem))
+                for _ in range(options['threads'])
+            ]
+
+            sem_travas = (
+                mock.patch.object(VoluntarioEvento, 'travar_recursos', lambda self: None)
+                if options['sem_travas'] else nullcontext()
+            )
+            with sem_travas:
+                inicio = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                duracao = time.perf_counter() - inicio
+
+            self._relatorio(eventos, options, contagem, tentativas, duracao)
+        finally:
+            self._limpar()
+
+    def _preparar(self, options):
+        # Dois eventos sobrepostos daqui a um ano, longe de qualquer escala real
+        data = timezone.localdate() + timedelta(days=365)
+        eventos = []
+        for i, (inicio, fim) in enumerate(((hora(8), hora(12)), (hora(10), hora(14)))):
+            eventos.append(Evento.objects.create(
+                nome_escola=f'{PREFIXO} {i + 1}', responsavel_escola='-', telefone_responsavel='-',
+                cidade='-', endereco='-', data_evento=data, hora_inicio=inicio, hora_fim=fim,
+            ))
+            self.criados[Evento].append(eventos[-1].id)
+
+        vinculos = {}
+        for evento in eventos:
+            for j in range(options['veiculos']):
+                veiculo = Veiculo.objects.create(
+                    nome=f'{PREFIXO} {evento.id}-{j}', placa=f'ZZ{evento.id % 1000:03d}{j:02d}',
+                    tipo='van', capacidade=options['capacidade'],
+                )
+                self.criados[Veiculo].append(veiculo.id)
+                vinculos.setdefault(evento.id, []).append(
+                    EventoVeiculo.objects.create(evento=evento, veiculo=veiculo)
+                )
+
+        marca = int(time.time()) % 10**6
+        Voluntario.objects.bulk_create([
+            Voluntario(
+                nome_completo=f'{PREFIXO} {i}', email_corporativo=f'concorrencia-{marca}-{i}@exemplo.invalid',
+                cpf=f'cc{marca:06d}{i:05d}', telefone='(00) 00000-0000',
+                agencia='001', setor='-', tamanho_camiseta='M',
+            )
+            for i in range(options['voluntarios'])
+        ])
+        # MySQL não devolve os ids do bulk_create
+        voluntarios = list(Voluntario.objects.filter(
+            email_corporativo__startswith=f'concorrencia-{marca}-'
+        ))
+        self.criados[Voluntario] = [voluntario.id for voluntario in voluntarios]
+        return eventos, vinculos, voluntarios
+
+    def _relatorio(self, eventos, options, contagem, tentativas, duracao):
+        lotados = EventoVeiculo.objects.filter(evento__in=eventos).annotate(
+            ocupantes=Count('voluntarioevento', filter=Q(voluntarioevento__ativo=True))
+        ).filter(ocupantes__gt=options['capacidade']).count()
+        duplicados = VoluntarioEvento.ativos.filter(evento__in=eventos).values(
+            'voluntario_id'
+        ).annotate(total=Count('id')).filter(total__gt=1).count()
+
+        lugares = len(eventos) * options['veiculos'] * options['capacidade']
+        self.stdout.write(
+            f'{tentativas} tentativas, {options["threads"]} threads, '
+            f'{lugares} lugares, banco {connection.vendor}'
+        )
+        self.stdout.write(
+            f'aceitas {contagem["aceitas"]}, recusadas {contagem["recusadas"]}, '
+            f'erros de banco {contagem["erros"]}'
+        )
+        self.stdout.write(f'{tentativas / duracao:.0f} tentativas/s ({duracao:.2f}s)')
+
+        estilo = self.style.SUCCESS if not (lotados or duplicados) else self.style.ERROR
+        self.stdout.write(estilo(
+            f'veículos acima da capacidade: {lotados}; '
+            f'voluntários em eventos simultâneos: {duplicados}'
+        ))
+
+    def _limpar(self):
+        # Remoção física: são só os dados criados por este comando
+        eventos = self.criados[Evento]
+        VoluntarioEvento.objects.filter(evento_id__in=eventos).delete()
+        EventoVeiculo.objects.filter(evento_id__in=eventos).delete()
+        for modelo, ids in self.criados.items():
+            modelo.objects.filter(id__in=ids).delete()
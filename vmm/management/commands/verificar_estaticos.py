@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from vmm.estaticos import classes_ausentes
+
+
+class Command(BaseCommand):
+    help = ('Falha se algum template usa uma classe CSS que não existe no Tailwind '
+            'compilado, nos ícones gerados ou no CSS do projeto.')
+
+    def handle(self, *args, **options):
+        try:
+            ausentes = classes_ausentes()
+        except FileNotFoundError as erro:
+            raise CommandError(str(erro))
+
+        for classe, templates in sorted(ausentes.items()):
+            self.stdout.write(self.style.WARNING(f'{classe}: {", ".join(sorted(templates))}'))
+
+        if ausentes:
+            raise CommandError(
+                f'{len(ausentes)} classe(s) sem CSS. Rode "npm run build" ou corrija os templates.'
+            )
+        self.stdout.write(self.style.SUCCESS('Todas as classes dos templates estão no CSS compilado.'))
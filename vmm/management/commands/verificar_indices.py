@@ -0,0 +1,147 @@
+import json
+import re
+from datetime import date, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from vmm.models import Evento, EventoVeiculo, Voluntario, VoluntarioEvento, intervalo_evento
+
+
+def consultas_criticas():
+    """
+    Consultas mais frequentes do sistema e, para cada tabela, as colunas iniciais
+    do índice que deve ser escolhido.
+
+    Os valores dos filtros são fictícios: apenas o plano de execução importa.
+    """
+    inicio, fim = intervalo_evento(date(2025, 1, 1), time(8, 0), time(12, 0))
+
+    return [
+        (
+            'Conflito de horário do voluntário',
+            VoluntarioEvento.ativos.filter(voluntario_id=1).sobrepostos(inicio, fim),
+            {'vmm_voluntarioevento': ['voluntario_id', 'inicio']},
+        ),
+        (
+            'Conflito de horário do veículo',
+            EventoVeiculo.ativos.filter(veiculo_id=1).sobrepostos(inicio, fim),
+            {'vmm_eventoveiculo': ['veiculo_id', 'inicio']},
+        ),
+        (
+            'Eventos sobrepostos no dia',
+            Evento.ativos.sobrepostos(inicio, fim),
+            {'vmm_evento': ['inicio', 'fim']},
+        ),
+        (
+            'Lista de voluntários',
+            Voluntario.ativos.order_by('-data_cadastro')[:10],
+            {'vmm_voluntario': ['data_cadastro']},
+        ),
+        (
+            'Lista de voluntários por status',
+            Voluntario.ativos.filter(status='ativo').order_by('-data_cadastro')[:10],
+            {'vmm_voluntario': ['status', 'data_cadastro']},
+        ),
+        (
+            'Lista de eventos ativos',
+            Evento.ativos.order_by('-data_evento', '-hora_inicio')[:10],
+            {'vmm_evento': ['data_evento', 'hora_inicio']},
+        ),
+        (
+            'Voluntários de um evento',
+            VoluntarioEvento.ativos.filter(evento_id=1),
+            {'vmm_voluntarioevento': ['evento_id']},
+        ),
+    ]
+
+
+def indices_esperados(tabela, colunas):
+    """Nomes dos índices da tabela que começam pelas colunas informadas, lidos do próprio banco"""
+    with connection.cursor() as cursor:
+        restricoes = connection.introspection.get_constraints(cursor, tabela)
+    return {
+        nome for nome, restricao in restricoes.items()
+        if restricao['index'] and restricao['columns'][:len(colunas)] == colunas
+    }
+
+
+def _indices_sqlite(plano, tabelas):
+    """Índice usado em cada tabela no plano do SQLite (None para varredura completa)"""
+    usados = {}
+    for linha in plano.splitlines():
+        encontrado = re.search(r'\b(?:SCAN|SEARCH) (\w+)(?: USING (?:COVERING )?INDEX (\w+))?', linha)
+        if encontrado and encontrado.group(1) in tabelas:
+            usados.setdefault(encontrado.group(1), encontrado.group(2))
+    return usados
+
+
+def _indices_mysql(plano, tabelas):
+    """Índice ("key") usado em cada tabela no EXPLAIN FORMAT=JSON do MySQL"""
+    usados = {}
+
+    def percorrer(no):
+        if isinstance(no, dict):
+            if no.get('table_name') in tabelas:
+                usados.setdefault(no['table_name'], no.get('key'))
+            for valor in no.values():
+                percorrer(valor)
+        elif isinstance(no, list):
+            for valor in no:
+                percorrer(valor)
+
+    percorrer(json.loads(plano))
+    return usados
+
+
+def explicar(queryset, tabelas):
+    """Plano da consulta e o índice escolhido em cada uma das tabelas informadas"""
+    if connection.vendor == 'mysql':
+        plano = queryset.explain(format='json')
+        return plano, _indices_mysql(plano, tabelas)
+    plano = queryset.explain()
+    return plano, _indices_sqlite(plano, tabelas)
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa EXPLAIN nas consultas críticas e falha se alguma delas não usar '
+        'o índice previsto (ou fizer varredura completa). Suporta SQLite e MySQL; '
+        'os mesmos planos são verificados pelos testes (vmm.tests.IndicesTests).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plano',
+            action='store_true',
+            help='Exibe o plano completo de cada consulta.',
+        )
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in ('sqlite', 'mysql'):
+            raise CommandError(f'Banco "{vendor}" não suportado. Use SQLite ou MySQL.')
+
+        falhas = []
+        for descricao, queryset, esperados in consultas_criticas():
+            plano, usados = explicar(queryset, esperados)
+
+            erros = []
+            for tabela, colunas in esperados.items():
+                usado = usados.get(tabela)
+                if usado not in indices_esperados(tabela, colunas):
+                    lido = f'índice {usado}' if usado else 'varredura completa'
+                    erros.append(f'{tabela} lida por {lido}, esperado índice em ({", ".join(colunas)})')
+
+            if erros:
+                falhas.append(descricao)
+                self.stdout.write(self.style.ERROR(f'[FALHA] {descricao}: {"; ".join(erros)}'))
+            else:
+                usados_texto = ', '.join(f'{tabela}: {usados[tabela]}' for tabela in esperados)
+                self.stdout.write(self.style.SUCCESS(f'[OK] {descricao} ({usados_texto})'))
+
+            if options['verbose_plano']:
+                self.stdout.write(plano)
+
+        if falhas:
+            raise CommandError(f'{len(falhas)} consulta(s) sem o índice esperado.')
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmm', '0007_evento_data_inativacao_eventoveiculo_ativo_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='evento',
+            name='vmm_evento_ativo_ce5bb2_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='eventoveiculo',
+            name='vmm_eventov_ativo_22db0d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='veiculo',
+            name='vmm_veiculo_ativo_db870b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='voluntario',
+            name='vmm_volunta_ativo_4bf07f_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='voluntarioevento',
+            name='vmm_volunta_ativo_0459f9_idx',
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['ativo', 'data_evento'], name='vmm_evento_ativo_069c3e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoveiculo',
+            index=models.Index(fields=['ativo', 'evento'], name='vmm_eventov_ativo_6edced_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='veiculo',
+            index=models.Index(fields=['ativo', 'status'], name='vmm_veiculo_ativo_22dc4a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voluntario',
+            index=models.Index(fields=['ativo', 'status'], name='vmm_volunta_ativo_6f0e81_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voluntarioevento',
+            index=models.Index(fields=['ativo', 'evento'], name='vmm_volunta_ativo_c7e7f2_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmm', '0008_soft_delete_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='evento',
+            name='vmm_evento_data_ev_8fc89c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='evento',
+            name='vmm_evento_ativo_069c3e_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='voluntario',
+            name='vmm_volunta_ativo_6f0e81_idx',
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['data_evento', 'hora_inicio', 'hora_fim', 'ativo'], name='vmm_evento_data_ev_c052f8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['ativo', '-data_evento', '-hora_inicio'], name='vmm_evento_ativo_173b6a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoveiculo',
+            index=models.Index(fields=['veiculo', 'ativo'], name='vmm_eventov_veiculo_d3416b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voluntario',
+            index=models.Index(fields=['ativo', 'status', '-data_cadastro'], name='vmm_volunta_ativo_db9842_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voluntarioevento',
+            index=models.Index(fields=['voluntario', 'ativo'], name='vmm_volunta_volunta_b7159e_idx'),
+        ),
+    ]
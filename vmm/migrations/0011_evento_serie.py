@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmm', '0010_tarefa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evento',
+            name='serie',
+            field=models.UUIDField(blank=True, db_index=True, null=True, verbose_name='Série'),
+        ),
+    ]
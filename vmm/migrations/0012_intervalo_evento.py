@@ -0,0 +1,120 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:24
+
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+
+def preencher_intervalos(apps, schema_editor):
+    Evento = apps.get_model('vmm', 'Evento')
+    EventoVeiculo = apps.get_model('vmm', 'EventoVeiculo')
+    VoluntarioEvento = apps.get_model('vmm', 'VoluntarioEvento')
+
+    lote = []
+    for evento in Evento.objects.only('data_evento', 'hora_inicio', 'hora_fim').iterator(chunk_size=1000):
+        evento.inicio = timezone.make_aware(datetime.combine(evento.data_evento, evento.hora_inicio))
+        evento.fim = timezone.make_aware(datetime.combine(evento.data_evento, evento.hora_fim))
+        if evento.fim <= evento.inicio:
+            evento.fim += timedelta(days=1)
+        lote.append(evento)
+        if len(lote) == 1000:
+            Evento.objects.bulk_update(lote, ['inicio', 'fim'])
+            lote = []
+    Evento.objects.bulk_update(lote, ['inicio', 'fim'])
+
+    # Vínculos copiam o intervalo do evento com um UPDATE por tabela
+    for modelo in (EventoVeiculo, VoluntarioEvento):
+        eventos = Evento.objects.filter(pk=OuterRef('evento_id'))
+        modelo.objects.update(
+            inicio=Subquery(eventos.values('inicio')[:1]),
+            fim=Subquery(eventos.values('fim')[:1]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmm', '0011_evento_serie'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='evento',
+            name='vmm_evento_data_ev_c052f8_idx',
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='fim',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Término'),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='inicio',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Início'),
+        ),
+        migrations.AddField(
+            model_name='eventoveiculo',
+            name='fim',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='eventoveiculo',
+            name='inicio',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='voluntarioevento',
+            name='fim',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='voluntarioevento',
+            name='inicio',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(preencher_intervalos, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='evento',
+            name='inicio',
+            field=models.DateTimeField(editable=False, verbose_name='Início'),
+        ),
+        migrations.AlterField(
+            model_name='evento',
+            name='fim',
+            field=models.DateTimeField(editable=False, verbose_name='Término'),
+        ),
+        migrations.AlterField(
+            model_name='eventoveiculo',
+            name='inicio',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='eventoveiculo',
+            name='fim',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='voluntarioevento',
+            name='inicio',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='voluntarioevento',
+            name='fim',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['inicio', 'fim'], name='vmm_evento_inicio_c314a1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoveiculo',
+            index=models.Index(fields=['veiculo', 'inicio'], name='vmm_eventov_veiculo_cb30e7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voluntarioevento',
+            index=models.Index(fields=['voluntario', 'inicio'], name='vmm_volunta_volunta_7cf0a6_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmm', '0012_intervalo_evento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RespostaIdempotente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(max_length=80, unique=True)),
+                ('status', models.PositiveSmallIntegerField()),
+                ('conteudo', models.BinaryField()),
+                ('cabecalhos', models.JSONField(default=dict)),
+                ('mensagens', models.JSONField(default=list)),
+                ('data_criacao', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Resposta Idempotente',
+                'verbose_name_plural': 'Respostas Idempotentes',
+            },
+        ),
+    ]
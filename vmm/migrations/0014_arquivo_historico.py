@@ -0,0 +1,83 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmm', '0013_resposta_idempotente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoArquivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('nome_escola', models.CharField(max_length=255, verbose_name='Nome da Escola')),
+                ('responsavel_escola', models.CharField(max_length=255, verbose_name='Responsável da Escola')),
+                ('telefone_responsavel', models.CharField(max_length=15, verbose_name='Telefone do Responsável')),
+                ('cidade', models.CharField(max_length=100, verbose_name='Cidade')),
+                ('endereco', models.TextField(verbose_name='Endereço Completo')),
+                ('data_evento', models.DateField(db_index=True, verbose_name='Data do Evento')),
+                ('hora_inicio', models.TimeField(verbose_name='Hora de Início')),
+                ('hora_fim', models.TimeField(verbose_name='Hora de Término')),
+                ('inicio', models.DateTimeField(verbose_name='Início')),
+                ('fim', models.DateTimeField(verbose_name='Término')),
+                ('qtd_tv', models.IntegerField(default=0, verbose_name='Quantidade de TVs')),
+                ('qtd_computador', models.IntegerField(default=0, verbose_name='Quantidade de Computadores')),
+                ('status', models.CharField(choices=[('planejamento', 'Em Planejamento'), ('confirmado', 'Confirmado'), ('em_andamento', 'Em Andamento'), ('concluido', 'Concluído'), ('cancelado', 'Cancelado')], max_length=20, verbose_name='Status do Evento')),
+                ('observacoes', models.TextField(blank=True, verbose_name='Observações')),
+                ('serie', models.UUIDField(blank=True, null=True, verbose_name='Série')),
+                ('criado_por', models.CharField(blank=True, max_length=255, verbose_name='Criado Por')),
+                ('data_criacao', models.DateTimeField()),
+                ('data_atualizacao', models.DateTimeField()),
+                ('data_arquivamento', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data de Arquivamento')),
+            ],
+            options={
+                'verbose_name': 'Evento Arquivado',
+                'verbose_name_plural': 'Eventos Arquivados',
+                'ordering': ['-data_evento'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EventoVeiculoArquivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('observacoes', models.TextField(blank=True)),
+                ('inicio', models.DateTimeField()),
+                ('fim', models.DateTimeField()),
+                ('evento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='veiculos', to='vmm.eventoarquivado')),
+                ('motorista', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='veiculos_dirigidos_arquivados', to='vmm.voluntario')),
+                ('veiculo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_arquivados', to='vmm.veiculo')),
+            ],
+            options={
+                'verbose_name': 'Veículo em Evento Arquivado',
+                'verbose_name_plural': 'Veículos em Eventos Arquivados',
+            },
+        ),
+        migrations.CreateModel(
+            name='VoluntarioEventoArquivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('funcao', models.CharField(choices=[('coordenador', 'Coordenador do Evento'), ('motorista', 'Motorista'), ('apoio_logistico', 'Apoio Logístico'), ('triagem', 'Triagem'), ('monitor', 'Monitor de Atividades'), ('fotografo', 'Fotógrafo/Registro'), ('outro', 'Outro')], max_length=30, verbose_name='Função no Evento')),
+                ('funcao_customizada', models.CharField(blank=True, max_length=100, verbose_name='Descrição Customizada da Função')),
+                ('presenca', models.CharField(choices=[('pendente', 'Pendente'), ('confirmado', 'Confirmado'), ('presente', 'Presente'), ('ausente', 'Ausente'), ('cancelado', 'Cancelado')], max_length=20, verbose_name='Status de Presença')),
+                ('vai_no_veiculo', models.BooleanField(default=False)),
+                ('observacoes', models.TextField(blank=True, verbose_name='Observações')),
+                ('data_vinculo', models.DateTimeField()),
+                ('inicio', models.DateTimeField()),
+                ('fim', models.DateTimeField()),
+                ('evento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='voluntarios', to='vmm.eventoarquivado')),
+                ('evento_veiculo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='vmm.eventoveiculoarquivado')),
+                ('voluntario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_arquivados', to='vmm.voluntario')),
+            ],
+            options={
+                'verbose_name': 'Voluntário em Evento Arquivado',
+                'verbose_name_plural': 'Voluntários em Eventos Arquivados',
+                'indexes': [models.Index(fields=['voluntario', 'inicio'], name='vmm_volunta_volunta_be00f9_idx')],
+            },
+        ),
+    ]
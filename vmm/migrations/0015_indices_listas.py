@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vmm', '0014_arquivo_historico'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='evento',
+            name='vmm_evento_ativo_173b6a_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='voluntario',
+            name='vmm_volunta_status_f06f05_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='voluntario',
+            name='vmm_volunta_ativo_db9842_idx',
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['-data_evento', '-hora_inicio'], name='vmm_evento_data_ev_a6b570_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voluntario',
+            index=models.Index(fields=['status', '-data_cadastro'], name='vmm_volunta_status_ed86f5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voluntario',
+            index=models.Index(fields=['-data_cadastro'], name='vmm_volunta_data_ca_5cc286_idx'),
+        ),
+    ]
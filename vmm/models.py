@@ -1,8 +1,61 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    def ativos(self):
+        return self.filter(ativo=True)
+
+    def inativos(self):
+        return self.filter(ativo=False)
+
+    def soft_delete(self):
+        """Soft delete em lote - um único UPDATE ao invés de save() por instância"""
+        return self.filter(ativo=True).update(ativo=False, data_inativacao=timezone.now())
+
+    def reativar(self, **campos):
+        """Reativação em lote - um único UPDATE, com campos extras opcionais"""
+        return self.filter(ativo=False).update(ativo=True, data_inativacao=None, **campos)
+
+
+class AllObjectsManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """Manager padrão: inclui registros inativos (soft delete)"""
+
+
+class ActiveManager(AllObjectsManager):
+    """Manager que retorna apenas registros com ativo=True"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(ativo=True)
+
+
+# Nenhum evento dura mais que isso; limita a faixa lida do índice nas buscas por sobreposição
+DURACAO_MAXIMA_EVENTO = timedelta(days=1)
+
+
+def intervalo_evento(data_evento, hora_inicio, hora_fim):
+    """Início e fim como datetimes; término antes do início indica que passa da meia-noite"""
+    inicio = timezone.make_aware(datetime.combine(data_evento, hora_inicio))
+    fim = timezone.make_aware(datetime.combine(data_evento, hora_fim))
+    if fim <= inicio:
+        fim += timedelta(days=1)
+    return inicio, fim
+
+
+class IntervaloQuerySet(SoftDeleteQuerySet):
+    def sobrepostos(self, inicio, fim):
+        """Registros cujo [inicio, fim) cruza o intervalo informado, como uma única faixa de índice"""
+        return self.filter(
+            inicio__lt=fim,
+            inicio__gt=inicio - DURACAO_MAXIMA_EVENTO,
+            fim__gt=inicio,
+        )
+
 
 class Voluntario(models.Model):
     TAMANHOS_CAMISETA = [
@@ -77,6 +130,9 @@ class Voluntario(models.Model):
     data_cadastro = models.DateTimeField(default=timezone.now, verbose_name="Data de Cadastro")
     data_atualizacao = models.DateTimeField(auto_now=True, verbose_name="Última Atualização")
 
+    objects = AllObjectsManager()
+    ativos = ActiveManager()
+
     def delete(self, using=None, keep_parents=False):
         """Soft delete - marca como inativo ao invés de deletar"""
         self.ativo = False
@@ -91,12 +147,8 @@ class Voluntario(models.Model):
         return cpf
 
     def verificar_disponibilidade(self, data_evento, hora_inicio, hora_fim):
-        return not VoluntarioEvento.objects.filter(
-            voluntario=self,
-            evento__data_evento=data_evento,
-            evento__hora_inicio__lt=hora_fim,
-            evento__hora_fim__gt=hora_inicio,
-            ativo=True
+        return not VoluntarioEvento.ativos.filter(voluntario=self).sobrepostos(
+            *intervalo_evento(data_evento, hora_inicio, hora_fim)
         ).exists()
 
     class Meta:
@@ -106,8 +158,10 @@ class Voluntario(models.Model):
         indexes = [
             models.Index(fields=['email_corporativo']),
             models.Index(fields=['cpf']),
-            models.Index(fields=['status']),
-            models.Index(fields=['ativo']),
+            # "ativo" não lidera os índices: o Django filtra com WHERE "ativo" sem comparação, que
+            # nenhum dos dois bancos usa como busca no índice; a ordem da lista é o que o índice atende
+            models.Index(fields=['status', '-data_cadastro']),
+            models.Index(fields=['-data_cadastro']),
         ]
 
     def __str__(self):
@@ -145,6 +199,9 @@ class Veiculo(models.Model):
     data_cadastro = models.DateTimeField(auto_now_add=True)
     data_atualizacao = models.DateTimeField(auto_now=True)
 
+    objects = AllObjectsManager()
+    ativos = ActiveManager()
+
     def delete(self, using=None, keep_parents=False):
         """Soft delete - marca como inativo ao invés de deletar"""
         self.ativo = False
@@ -155,12 +212,8 @@ class Veiculo(models.Model):
         if self.status != 'disponivel' or not self.ativo:
             return False
             
-        return not EventoVeiculo.objects.filter(
-            veiculo=self,
-            evento__data_evento=data_evento,
-            evento__hora_inicio__lt=hora_fim,
-            evento__hora_fim__gt=hora_inicio,
-            ativo=True
+        return not EventoVeiculo.ativos.filter(veiculo=self).sobrepostos(
+            *intervalo_evento(data_evento, hora_inicio, hora_fim)
         ).exists()
 
     class Meta:
@@ -168,13 +221,58 @@ class Veiculo(models.Model):
         verbose_name_plural = "Veículos"
         ordering = ['nome']
         indexes = [
-            models.Index(fields=['ativo']),
+            models.Index(fields=['ativo', 'status']),
         ]
 
     def __str__(self):
         return f"{self.nome} - {self.placa}"
 
 
+def _subquery_contagem(queryset):
+    """Contagem correlacionada por evento, sem multiplicar linhas no JOIN"""
+    return Coalesce(
+        Subquery(
+            queryset.filter(evento=OuterRef('pk'))
+            .order_by()
+            .values('evento')
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+class EventoQuerySet(IntervaloQuerySet):
+    def with_counts(self):
+        """Anota voluntários, veículos e lugares ativos de cada evento"""
+        return self.annotate(
+            num_voluntarios=_subquery_contagem(
+                VoluntarioEvento.ativos.all()
+            ),
+            num_veiculos=_subquery_contagem(
+                EventoVeiculo.ativos.all()
+            ),
+            vagas_ocupadas=_subquery_contagem(
+                VoluntarioEvento.ativos.filter(
+                    vai_no_veiculo=True,
+                    evento_veiculo__ativo=True
+                )
+            ),
+            vagas_total=Coalesce(
+                Subquery(
+                    EventoVeiculo.ativos.filter(evento=OuterRef('pk'))
+                    .order_by()
+                    .values('evento')
+                    .annotate(total=Sum('veiculo__capacidade'))
+                    .values('total'),
+                    output_field=IntegerField()
+                ),
+                0
+            ),
+        )
+
+
 class Evento(models.Model):
     STATUS_EVENTO = [
         ('planejamento', 'Em Planejamento'),
@@ -194,6 +292,10 @@ class Evento(models.Model):
     hora_inicio = models.TimeField(verbose_name="Hora de Início")
     hora_fim = models.TimeField(verbose_name="Hora de Término")
     
+    # Cópia de data_evento + horas como datetimes, mantida no save() para buscas por faixa
+    inicio = models.DateTimeField(editable=False, verbose_name="Início")
+    fim = models.DateTimeField(editable=False, verbose_name="Término")
+    
     qtd_tv = models.IntegerField(default=0, verbose_name="Quantidade de TVs")
     qtd_computador = models.IntegerField(default=0, verbose_name="Quantidade de Computadores")
     
@@ -205,12 +307,30 @@ class Evento(models.Model):
     )
     observacoes = models.TextField(blank=True, verbose_name="Observações")
     
+    # Eventos criados juntos por repetição/duplicação compartilham a série
+    serie = models.UUIDField(null=True, blank=True, db_index=True, verbose_name="Série")
+    
     criado_por = models.CharField(max_length=255, blank=True, verbose_name="Criado Por")
     data_criacao = models.DateTimeField(auto_now_add=True)
     data_atualizacao = models.DateTimeField(auto_now=True)
     ativo = models.BooleanField(default=True, verbose_name="Ativo no Sistema")
     data_inativacao = models.DateTimeField(null=True, blank=True, verbose_name="Data de Inativação")
 
+    objects = AllObjectsManager.from_queryset(EventoQuerySet)()
+    ativos = ActiveManager.from_queryset(EventoQuerySet)()
+
+    def save(self, *args, **kwargs):
+        self.inicio, self.fim = intervalo_evento(self.data_evento, self.hora_inicio, self.hora_fim)
+        adicionando = self._state.adding
+        super().save(*args, **kwargs)
+
+        if not adicionando:
+            # Mantém a cópia do intervalo nos vínculos (um UPDATE por tabela, só se mudou)
+            for modelo in (VoluntarioEvento, EventoVeiculo):
+                modelo.objects.filter(evento=self).exclude(
+                    inicio=self.inicio, fim=self.fim
+                ).update(inicio=self.inicio, fim=self.fim)
+
     def delete(self, using=None, keep_parents=False):
         """Soft delete - marca como inativo ao invés de deletar"""
         self.ativo = False
@@ -220,30 +340,49 @@ class Evento(models.Model):
     def clean(self):
         super().clean()
         
-        if self.hora_inicio and self.hora_fim:
-            if self.hora_inicio >= self.hora_fim:
-                raise ValidationError({
-                    'hora_fim': 'A hora de término deve ser posterior à hora de início.'
-                })
+        # Término antes do início é um evento que passa da meia-noite (ver intervalo_evento)
+        if self.hora_inicio and self.hora_fim and self.hora_inicio == self.hora_fim:
+            raise ValidationError({
+                'hora_fim': 'A hora de término deve ser diferente da hora de início.'
+            })
 
     def get_voluntarios_count(self):
-        return self.voluntarioevento_set.filter(ativo=True).count()
+        return self.voluntarioevento_set.ativos().count()
 
     class Meta:
         verbose_name = "Evento"
         verbose_name_plural = "Eventos"
         ordering = ['data_evento', 'hora_inicio']
         indexes = [
-            models.Index(fields=['data_evento', 'hora_inicio']),
+            models.Index(fields=['inicio', 'fim']),
             models.Index(fields=['status']),
-            models.Index(fields=['ativo']),
+            models.Index(fields=['-data_evento', '-hora_inicio']),
         ]
 
     def __str__(self):
         return f"{self.nome_escola} - {self.data_evento.strftime('%d/%m/%Y')}"
 
 
-class EventoVeiculo(models.Model):
+class CopiaIntervaloEvento:
+    """
+    Vínculos com evento guardam uma cópia de Evento.inicio/fim; ela é refeita
+    no save() de vínculo novo ou que passou para outro evento
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._evento_carregado = instancia.__dict__.get('evento_id')
+        return instancia
+
+    def save(self, *args, **kwargs):
+        if self.inicio is None or self.evento_id != getattr(self, '_evento_carregado', None):
+            self.inicio, self.fim = self.evento.inicio, self.evento.fim
+        super().save(*args, **kwargs)
+        self._evento_carregado = self.evento_id
+
+
+class EventoVeiculo(CopiaIntervaloEvento, models.Model):
     evento = models.ForeignKey(Evento, on_delete=models.CASCADE)
     veiculo = models.ForeignKey(Veiculo, on_delete=models.CASCADE)
     motorista = models.ForeignKey(
@@ -257,6 +396,13 @@ class EventoVeiculo(models.Model):
     ativo = models.BooleanField(default=True, verbose_name="Ativo")
     data_inativacao = models.DateTimeField(null=True, blank=True, verbose_name="Data de Inativação")
     
+    # Intervalo do evento, copiado para indexar (veiculo, inicio)
+    inicio = models.DateTimeField(editable=False)
+    fim = models.DateTimeField(editable=False)
+    
+    objects = AllObjectsManager.from_queryset(IntervaloQuerySet)()
+    ativos = ActiveManager.from_queryset(IntervaloQuerySet)()
+
     def delete(self, using=None, keep_parents=False):
         """Soft delete - marca como inativo ao invés de deletar"""
         self.ativo = False
@@ -268,15 +414,19 @@ class EventoVeiculo(models.Model):
         verbose_name = "Veículo no Evento"
         verbose_name_plural = "Veículos nos Eventos"
         indexes = [
-            models.Index(fields=['ativo']),
+            models.Index(fields=['ativo', 'evento']),
+            models.Index(fields=['veiculo', 'ativo']),
+            models.Index(fields=['veiculo', 'inicio']),
         ]
 
     @property
     def voluntarios_count(self):
-        return VoluntarioEvento.objects.filter(
+        # Preenchido pela anotação "passageiros" quando a lista já vem agregada
+        if hasattr(self, 'passageiros'):
+            return self.passageiros
+        return VoluntarioEvento.ativos.filter(
             evento=self.evento,
-            evento_veiculo=self,
-            ativo=True
+            evento_veiculo=self
         ).count()
     
     @property
@@ -289,7 +439,7 @@ class EventoVeiculo(models.Model):
         return f"{self.veiculo.nome} - {self.evento.nome_escola}"
 
 
-class VoluntarioEvento(models.Model):
+class VoluntarioEvento(CopiaIntervaloEvento, models.Model):
     FUNCOES = [
         ('coordenador', 'Coordenador do Evento'),
         ('motorista', 'Motorista'),
@@ -341,6 +491,13 @@ class VoluntarioEvento(models.Model):
     data_inativacao = models.DateTimeField(null=True, blank=True, verbose_name="Data de Inativação")
     data_vinculo = models.DateTimeField(auto_now_add=True)
     data_atualizacao = models.DateTimeField(auto_now=True)
+    
+    # Intervalo do evento, copiado para indexar (voluntario, inicio)
+    inicio = models.DateTimeField(editable=False)
+    fim = models.DateTimeField(editable=False)
+
+    objects = AllObjectsManager.from_queryset(IntervaloQuerySet)()
+    ativos = ActiveManager.from_queryset(IntervaloQuerySet)()
 
     def delete(self, using=None, keep_parents=False):
         """Soft delete - marca como inativo ao invés de deletar"""
@@ -348,15 +505,33 @@ class VoluntarioEvento(models.Model):
         self.data_inativacao = timezone.now()
         self.save()
 
+    def travar_recursos(self):
+        """
+        Trava as linhas do voluntário e do veículo no evento (SELECT ... FOR
+        UPDATE) até o fim da transação. Alocações do mesmo voluntário ou no
+        mesmo veículo esperam a anterior terminar; as demais seguem em paralelo.
+        Sempre na mesma ordem (voluntário, depois veículo) para não haver deadlock.
+        """
+        if not transaction.get_connection().in_atomic_block:
+            # Em autocommit a trava acabaria junto com o próprio SELECT
+            return
+        list(Voluntario.objects.select_for_update().filter(pk=self.voluntario_id).values_list('pk'))
+        if self.evento_veiculo_id:
+            list(EventoVeiculo.objects.select_for_update().filter(pk=self.evento_veiculo_id).values_list('pk'))
+
+    def alocar(self):
+        """Valida e grava o vínculo com voluntário e veículo travados"""
+        with transaction.atomic():
+            self.full_clean()
+            self.save()
+
     def clean(self):
         super().clean()
+        # Dentro de uma transação (alocar(), admin) as contagens abaixo valem até o commit
+        self.travar_recursos()
         
-        conflitos = VoluntarioEvento.objects.filter(
-            voluntario=self.voluntario,
-            evento__data_evento=self.evento.data_evento,
-            evento__hora_inicio__lt=self.evento.hora_fim,
-            evento__hora_fim__gt=self.evento.hora_inicio,
-            ativo=True
+        conflitos = VoluntarioEvento.ativos.filter(voluntario=self.voluntario).sobrepostos(
+            *intervalo_evento(self.evento.data_evento, self.evento.hora_inicio, self.evento.hora_fim)
         ).exclude(pk=self.pk)
         
         if conflitos.exists():
@@ -367,10 +542,9 @@ class VoluntarioEvento(models.Model):
             )
         
         if self.vai_no_veiculo and self.evento_veiculo:
-            ocupantes = VoluntarioEvento.objects.filter(
+            ocupantes = VoluntarioEvento.ativos.filter(
                 evento=self.evento,
-                evento_veiculo=self.evento_veiculo,
-                ativo=True
+                evento_veiculo=self.evento_veiculo
             ).exclude(pk=self.pk).count()
             
             if ocupantes >= self.evento_veiculo.veiculo.capacidade:
@@ -387,9 +561,150 @@ class VoluntarioEvento(models.Model):
         indexes = [
             models.Index(fields=['evento', 'voluntario']),
             models.Index(fields=['presenca']),
-            models.Index(fields=['ativo']),
+            models.Index(fields=['ativo', 'evento']),
+            models.Index(fields=['voluntario', 'ativo']),
+            models.Index(fields=['voluntario', 'inicio']),
         ]
 
     def __str__(self):
         funcao_display = self.funcao_customizada if self.funcao == 'outro' else self.get_funcao_display()
-        return f"{self.voluntario.nome_completo} - {funcao_display} ({self.evento})"
\ No newline at end of file
+        return f"{self.voluntario.nome_completo} - {funcao_display} ({self.evento})"
+
+# Histórico: eventos concluídos de anos encerrados saem das tabelas do dia a dia
+# para estas, com o mesmo id (ver vmm/arquivo.py). Só os relatórios as leem.
+
+class EventoArquivado(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    nome_escola = models.CharField(max_length=255, verbose_name="Nome da Escola")
+    responsavel_escola = models.CharField(max_length=255, verbose_name="Responsável da Escola")
+    telefone_responsavel = models.CharField(max_length=15, verbose_name="Telefone do Responsável")
+    cidade = models.CharField(max_length=100, verbose_name="Cidade")
+    endereco = models.TextField(verbose_name="Endereço Completo")
+    data_evento = models.DateField(db_index=True, verbose_name="Data do Evento")
+    hora_inicio = models.TimeField(verbose_name="Hora de Início")
+    hora_fim = models.TimeField(verbose_name="Hora de Término")
+    inicio = models.DateTimeField(verbose_name="Início")
+    fim = models.DateTimeField(verbose_name="Término")
+    qtd_tv = models.IntegerField(default=0, verbose_name="Quantidade de TVs")
+    qtd_computador = models.IntegerField(default=0, verbose_name="Quantidade de Computadores")
+    status = models.CharField(max_length=20, choices=Evento.STATUS_EVENTO, verbose_name="Status do Evento")
+    observacoes = models.TextField(blank=True, verbose_name="Observações")
+    serie = models.UUIDField(null=True, blank=True, verbose_name="Série")
+    criado_por = models.CharField(max_length=255, blank=True, verbose_name="Criado Por")
+    data_criacao = models.DateTimeField()
+    data_atualizacao = models.DateTimeField()
+    data_arquivamento = models.DateTimeField(default=timezone.now, verbose_name="Data de Arquivamento")
+
+    class Meta:
+        verbose_name = "Evento Arquivado"
+        verbose_name_plural = "Eventos Arquivados"
+        ordering = ['-data_evento']
+
+    def __str__(self):
+        return f"{self.nome_escola} - {self.data_evento.strftime('%d/%m/%Y')}"
+
+
+class EventoVeiculoArquivado(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    evento = models.ForeignKey(EventoArquivado, on_delete=models.CASCADE, related_name='veiculos')
+    veiculo = models.ForeignKey(Veiculo, on_delete=models.CASCADE, related_name='eventos_arquivados')
+    motorista = models.ForeignKey(
+        Voluntario,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='veiculos_dirigidos_arquivados'
+    )
+    observacoes = models.TextField(blank=True)
+    inicio = models.DateTimeField()
+    fim = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Veículo em Evento Arquivado"
+        verbose_name_plural = "Veículos em Eventos Arquivados"
+
+    def __str__(self):
+        return f"{self.veiculo.nome} - {self.evento.nome_escola}"
+
+
+class VoluntarioEventoArquivado(models.Model):
+    # Mesmos nomes de campo de VoluntarioEvento: as agregações de estatisticas.py
+    # (evento__data_evento, voluntario__agencia, presenca...) servem para as duas
+    id = models.BigIntegerField(primary_key=True)
+    evento = models.ForeignKey(EventoArquivado, on_delete=models.CASCADE, related_name='voluntarios')
+    voluntario = models.ForeignKey(Voluntario, on_delete=models.CASCADE, related_name='eventos_arquivados')
+    funcao = models.CharField(max_length=30, choices=VoluntarioEvento.FUNCOES, verbose_name="Função no Evento")
+    funcao_customizada = models.CharField(max_length=100, blank=True, verbose_name="Descrição Customizada da Função")
+    presenca = models.CharField(max_length=20, choices=VoluntarioEvento.STATUS_PRESENCA, verbose_name="Status de Presença")
+    vai_no_veiculo = models.BooleanField(default=False)
+    evento_veiculo = models.ForeignKey(EventoVeiculoArquivado, on_delete=models.SET_NULL, null=True, blank=True)
+    observacoes = models.TextField(blank=True, verbose_name="Observações")
+    data_vinculo = models.DateTimeField()
+    inicio = models.DateTimeField()
+    fim = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Voluntário em Evento Arquivado"
+        verbose_name_plural = "Voluntários em Eventos Arquivados"
+        indexes = [
+            models.Index(fields=['voluntario', 'inicio']),
+        ]
+
+    def __str__(self):
+        funcao_display = self.funcao_customizada if self.funcao == 'outro' else self.get_funcao_display()
+        return f"{self.voluntario.nome_completo} - {funcao_display} ({self.evento})"
+
+
+class RespostaIdempotente(models.Model):
+    """Resposta guardada de um POST com chave de idempotência (ver vmm/idempotencia.py)"""
+    chave = models.CharField(max_length=80, unique=True)
+    status = models.PositiveSmallIntegerField()
+    conteudo = models.BinaryField()
+    cabecalhos = models.JSONField(default=dict)
+    mensagens = models.JSONField(default=list)
+    data_criacao = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = "Resposta Idempotente"
+        verbose_name_plural = "Respostas Idempotentes"
+
+    def __str__(self):
+        return f"{self.chave} ({self.status})"
+
+
+class Tarefa(models.Model):
+    STATUS_TAREFA = [
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluida', 'Concluída'),
+        ('falhou', 'Falhou'),
+    ]
+
+    nome = models.CharField(max_length=100, verbose_name="Tarefa")
+    parametros = models.JSONField(default=dict, blank=True, verbose_name="Parâmetros")
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_TAREFA,
+        default='pendente',
+        verbose_name="Status"
+    )
+    tentativas = models.PositiveSmallIntegerField(default=0, verbose_name="Tentativas")
+    max_tentativas = models.PositiveSmallIntegerField(default=5, verbose_name="Máximo de Tentativas")
+    executar_apos = models.DateTimeField(default=timezone.now, verbose_name="Executar Após")
+    resultado = models.JSONField(null=True, blank=True, verbose_name="Resultado")
+    erro = models.TextField(blank=True, verbose_name="Último Erro")
+
+    data_criacao = models.DateTimeField(auto_now_add=True)
+    data_inicio = models.DateTimeField(null=True, blank=True, verbose_name="Início da Execução")
+    data_conclusao = models.DateTimeField(null=True, blank=True, verbose_name="Conclusão")
+
+    class Meta:
+        verbose_name = "Tarefa em Segundo Plano"
+        verbose_name_plural = "Tarefas em Segundo Plano"
+        ordering = ['executar_apos', 'id']
+        indexes = [
+            models.Index(fields=['status', 'executar_apos']),
+        ]
+
+    def __str__(self):
+        return f"{self.nome} #{self.id} ({self.get_status_display()})"
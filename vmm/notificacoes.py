@@ -0,0 +1,123 @@
+"""
+Envio em lote dos avisos de alteração de eventos aos voluntários escalados.
+
+Os voluntários afetados são buscados em uma única consulta, as mensagens são
+renderizadas a partir de templates compilados uma única vez e enviadas por
+uma só conexão SMTP, em lotes, respeitando um limite de envios por segundo.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.template.loader import get_template
+
+from .models import VoluntarioEvento
+
+
+TIPOS_NOTIFICACAO = {
+    'cancelamento': ('Evento cancelado: {escola}', 'emails/evento_cancelado.txt'),
+    'reagendamento': ('Novo horário do evento: {escola}', 'emails/evento_reagendado.txt'),
+    'exclusao': ('Evento removido da agenda: {escola}', 'emails/evento_excluido.txt'),
+}
+
+_templates = {}
+
+
+def _template(tipo):
+    if tipo not in _templates:
+        _templates[tipo] = get_template(TIPOS_NOTIFICACAO[tipo][1])
+    return _templates[tipo]
+
+
+def _destinatarios(tipo, evento_ids):
+    """Vínculos afetados de todos os eventos em uma única consulta"""
+    alocacoes = VoluntarioEvento.objects.filter(evento_id__in=evento_ids)
+
+    if tipo == 'exclusao':
+        # Vínculos inativados em cascata junto com o evento
+        alocacoes = alocacoes.filter(
+            ativo=False,
+            data_inativacao__gte=F('evento__data_inativacao')
+        )
+    else:
+        alocacoes = alocacoes.filter(ativo=True)
+
+    return alocacoes.select_related('evento', 'voluntario').only(
+        'id', 'funcao', 'funcao_customizada',
+        'evento__id', 'evento__nome_escola', 'evento__cidade',
+        'evento__data_evento', 'evento__hora_inicio', 'evento__hora_fim',
+        'voluntario__id', 'voluntario__nome_completo', 'voluntario__email_corporativo',
+    )
+
+
+def _chave_dedupe(tipo, ve):
+    chave = f'vmm:notificacao:{tipo}:{ve.evento_id}:{ve.voluntario_id}'
+    if tipo == 'reagendamento':
+        # Um novo reagendamento dentro da janela gera um novo aviso
+        evento = ve.evento
+        chave += f':{evento.data_evento:%Y%m%d}{evento.hora_inicio:%H%M}{evento.hora_fim:%H%M}'
+    return chave
+
+
+def notificar_voluntarios(tipo, evento_ids, anteriores=None):
+    """
+    Envia o aviso `tipo` aos voluntários dos eventos informados.
+
+    `anteriores` mapeia evento_id -> dados do horário antigo (reagendamento).
+    Avisos iguais enviados dentro de NOTIFICACOES_JANELA_DEDUPE são ignorados.
+    Retorna a quantidade de mensagens enviadas.
+    """
+    if tipo not in TIPOS_NOTIFICACAO:
+        raise ValueError(f'Tipo de notificação inválido: {tipo}')
+
+    anteriores = anteriores or {}
+    assunto, _ = TIPOS_NOTIFICACAO[tipo]
+    template = _template(tipo)
+
+    alocacoes = list(_destinatarios(tipo, evento_ids))
+    chaves = {_chave_dedupe(tipo, ve): ve for ve in alocacoes}
+    ja_enviadas = cache.get_many(list(chaves))
+
+    mensagens = []
+    for chave, ve in chaves.items():
+        if chave in ja_enviadas:
+            continue
+        contexto = {
+            'voluntario': ve.voluntario,
+            'evento': ve.evento,
+            'funcao': ve.funcao_customizada if ve.funcao == 'outro' else ve.get_funcao_display(),
+            'anterior': anteriores.get(str(ve.evento_id)) or anteriores.get(ve.evento_id),
+        }
+        mensagens.append((chave, EmailMessage(
+            subject=assunto.format(escola=ve.evento.nome_escola),
+            body=template.render(contexto),
+            to=[ve.voluntario.email_corporativo],
+        )))
+
+    if not mensagens:
+        return 0
+
+    tamanho_lote = settings.NOTIFICACOES_TAMANHO_LOTE
+    por_segundo = settings.NOTIFICACOES_POR_SEGUNDO
+    enviadas = 0
+
+    with get_connection() as conexao:
+        for inicio in range(0, len(mensagens), tamanho_lote):
+            lote = mensagens[inicio:inicio + tamanho_lote]
+            comeco = time.monotonic()
+            enviadas += conexao.send_messages([mensagem for _, mensagem in lote]) or 0
+
+            # Registra cada lote enviado para que uma nova tentativa não o repita
+            cache.set_many(
+                {chave: True for chave, _ in lote},
+                settings.NOTIFICACOES_JANELA_DEDUPE
+            )
+
+            # Limite de taxa: cada lote ocupa pelo menos len(lote)/por_segundo segundos
+            restante = len(lote) / por_segundo - (time.monotonic() - comeco)
+            if restante > 0 and inicio + tamanho_lote < len(mensagens):
+                time.sleep(restante)
+
+    return enviadas
@@ -0,0 +1,220 @@
+"""
+Duplicação de eventos e séries recorrentes (semanal, quinzenal, mensal).
+
+Todas as ocorrências são criadas com bulk_create e os conflitos de veículos
+(e de voluntários, quando copiados) da série inteira são levantados com uma
+única consulta por tipo de recurso, antes de qualquer gravação.
+"""
+import calendar
+import uuid
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .ical import invalidar_feeds
+from .models import DURACAO_MAXIMA_EVENTO, Evento, EventoVeiculo, VoluntarioEvento, intervalo_evento
+
+
+FREQUENCIAS = [
+    ('unica', 'Data única (duplicar)'),
+    ('semanal', 'Semanal'),
+    ('quinzenal', 'Quinzenal'),
+    ('mensal', 'Mensal'),
+]
+MAX_OCORRENCIAS = 52
+
+CAMPOS_COPIADOS = (
+    'nome_escola', 'responsavel_escola', 'telefone_responsavel', 'cidade', 'endereco',
+    'hora_inicio', 'hora_fim', 'qtd_tv', 'qtd_computador', 'observacoes',
+)
+
+
+def _somar_meses(data, meses):
+    """Mesmo dia em `meses` meses à frente, limitado ao último dia do mês"""
+    indice = data.month - 1 + meses
+    ano, mes = data.year + indice // 12, indice % 12 + 1
+    return data.replace(year=ano, month=mes, day=min(data.day, calendar.monthrange(ano, mes)[1]))
+
+
+def gerar_datas(data_inicio, frequencia, ocorrencias):
+    """Datas das ocorrências a partir de data_inicio (inclusive)"""
+    if frequencia not in dict(FREQUENCIAS):
+        raise ValueError(f'Frequência inválida: {frequencia}')
+    if frequencia == 'unica':
+        return [data_inicio]
+    if not 1 <= ocorrencias <= MAX_OCORRENCIAS:
+        raise ValueError(f'O número de ocorrências deve estar entre 1 e {MAX_OCORRENCIAS}.')
+
+    if frequencia == 'mensal':
+        return [_somar_meses(data_inicio, i) for i in range(ocorrencias)]
+
+    passo = timedelta(weeks=1 if frequencia == 'semanal' else 2)
+    return [data_inicio + passo * i for i in range(ocorrencias)]
+
+
+def conflitos_serie(datas, hora_inicio, hora_fim, veiculo_ids=(), voluntario_ids=()):
+    """
+    Conflitos de toda a série, agrupados por data: {data: [mensagens]}.
+    Uma consulta por recurso cobre a série inteira: cada ocorrência vira uma
+    faixa de inicio no índice (recurso, inicio), unidas por OR.
+    """
+    conflitos = {}
+    intervalos = {data: intervalo_evento(data, hora_inicio, hora_fim) for data in datas}
+    filtro_intervalo = reduce(or_, (
+        Q(inicio__lt=fim, inicio__gt=inicio - DURACAO_MAXIMA_EVENTO, fim__gt=inicio)
+        for inicio, fim in intervalos.values()
+    ))
+
+    def data_da_ocorrencia(inicio, fim):
+        return next(data for data, (i, f) in intervalos.items() if inicio < f and fim > i)
+
+    if veiculo_ids:
+        ocupados = EventoVeiculo.ativos.filter(
+            filtro_intervalo, veiculo_id__in=veiculo_ids, evento__ativo=True
+        ).select_related('veiculo', 'evento').only(
+            'inicio', 'fim', 'veiculo__nome', 'evento__nome_escola',
+            'evento__hora_inicio', 'evento__hora_fim',
+        )
+        for ev in ocupados:
+            conflitos.setdefault(data_da_ocorrencia(ev.inicio, ev.fim), []).append(
+                f'Veículo {ev.veiculo.nome} já está no evento "{ev.evento.nome_escola}" '
+                f'das {ev.evento.hora_inicio:%H:%M} às {ev.evento.hora_fim:%H:%M}'
+            )
+
+    if voluntario_ids:
+        ocupados = VoluntarioEvento.ativos.filter(
+            filtro_intervalo, voluntario_id__in=voluntario_ids, evento__ativo=True
+        ).select_related('voluntario', 'evento').only(
+            'inicio', 'fim', 'voluntario__nome_completo', 'evento__nome_escola',
+            'evento__hora_inicio', 'evento__hora_fim',
+        )
+        for ve in ocupados:
+            conflitos.setdefault(data_da_ocorrencia(ve.inicio, ve.fim), []).append(
+                f'{ve.voluntario.nome_completo} já está no evento "{ve.evento.nome_escola}" '
+                f'das {ve.evento.hora_inicio:%H:%M} às {ve.evento.hora_fim:%H:%M}'
+            )
+
+    return dict(sorted(conflitos.items()))
+
+
+def modelo_escala(evento, copiar_veiculos=True, copiar_voluntarios=False):
+    """Veículos e funções do evento de origem que serão replicados"""
+    veiculos = []
+    if copiar_veiculos:
+        veiculos = list(EventoVeiculo.ativos.filter(evento=evento).values(
+            'id', 'veiculo_id', 'motorista_id', 'observacoes'
+        ))
+
+    voluntarios = []
+    if copiar_voluntarios:
+        voluntarios = list(VoluntarioEvento.ativos.filter(
+            evento=evento, voluntario__ativo=True
+        ).values(
+            'voluntario_id', 'funcao', 'funcao_customizada',
+            'vai_no_veiculo', 'evento_veiculo_id', 'observacoes',
+        ))
+
+    return veiculos, voluntarios
+
+
+def _atribuir_ids(objetos, consulta, chave):
+    """MySQL não devolve os ids de um INSERT em lote: busca-os em uma consulta"""
+    if connection.features.can_return_rows_from_bulk_insert:
+        return
+    ids = {tuple(linha[:-1]): linha[-1] for linha in consulta}
+    for objeto in objetos:
+        objeto.id = ids[chave(objeto)]
+
+
+def criar_serie(origem, datas, veiculos=(), voluntarios=(), criado_por='Sistema', status='planejamento'):
+    """
+    Cria uma cópia de `origem` em cada data, com os veículos e voluntários do
+    modelo de escala, usando um bulk_create por tabela. As cópias recebem o
+    status informado. Retorna os eventos criados.
+    """
+    if not datas:
+        return []
+
+    with transaction.atomic():
+        serie = origem.serie
+        if serie is None:
+            serie = uuid.uuid4()
+            Evento.objects.filter(id=origem.id).update(serie=serie)
+            origem.serie = serie
+
+        marco = timezone.now()
+        novos = []
+        for data in datas:
+            # bulk_create não chama save(): o intervalo é calculado aqui
+            inicio, fim = intervalo_evento(data, origem.hora_inicio, origem.hora_fim)
+            novos.append(Evento(
+                data_evento=data,
+                inicio=inicio,
+                fim=fim,
+                status=status,
+                serie=serie,
+                criado_por=criado_por,
+                **{campo: getattr(origem, campo) for campo in CAMPOS_COPIADOS}
+            ))
+        eventos = Evento.objects.bulk_create(novos)
+        _atribuir_ids(
+            eventos,
+            Evento.objects.filter(serie=serie, data_criacao__gte=marco).values_list('data_evento', 'id'),
+            lambda e: (e.data_evento,),
+        )
+
+        # O motorista só é copiado se também for copiado como voluntário
+        copiados = {v['voluntario_id'] for v in voluntarios}
+        vinculos = EventoVeiculo.objects.bulk_create([
+            EventoVeiculo(
+                evento_id=evento.id,
+                inicio=evento.inicio,
+                fim=evento.fim,
+                veiculo_id=v['veiculo_id'],
+                motorista_id=v['motorista_id'] if v['motorista_id'] in copiados else None,
+                observacoes=v['observacoes'],
+            )
+            for evento in eventos
+            for v in veiculos
+        ])
+        _atribuir_ids(
+            vinculos,
+            EventoVeiculo.objects.filter(evento_id__in=[e.id for e in eventos]).values_list(
+                'evento_id', 'veiculo_id', 'id'
+            ),
+            lambda ev: (ev.evento_id, ev.veiculo_id),
+        )
+
+        # Vínculo voluntário -> veículo: do id de origem para o novo, por evento
+        veiculo_por_origem = {v['id']: v['veiculo_id'] for v in veiculos}
+        vinculo_novo = {(ev.evento_id, ev.veiculo_id): ev.id for ev in vinculos}
+        VoluntarioEvento.objects.bulk_create([
+            VoluntarioEvento(
+                evento_id=evento.id,
+                inicio=evento.inicio,
+                fim=evento.fim,
+                voluntario_id=v['voluntario_id'],
+                funcao=v['funcao'],
+                funcao_customizada=v['funcao_customizada'],
+                vai_no_veiculo=v['vai_no_veiculo'] and v['evento_veiculo_id'] in veiculo_por_origem,
+                evento_veiculo_id=vinculo_novo.get(
+                    (evento.id, veiculo_por_origem.get(v['evento_veiculo_id']))
+                ),
+                observacoes=v['observacoes'],
+            )
+            for evento in eventos
+            for v in voluntarios
+        ])
+
+        # bulk_create não dispara signals: invalida os feeds manualmente
+        def invalidar():
+            invalidar_feeds('geral', [0])
+            invalidar_feeds('veiculo', [v['veiculo_id'] for v in veiculos])
+            invalidar_feeds('voluntario', copiados)
+        transaction.on_commit(invalidar)
+
+    return eventos
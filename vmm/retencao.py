@@ -0,0 +1,127 @@
+"""
+Retenção de registros inativos (LGPD).
+
+Registros com soft delete há mais de RETENCAO_DIAS são apagados de vez ou,
+no caso dos voluntários, anonimizados (nome, e-mail, CPF, telefone e dados
+profissionais substituídos; o histórico de participação continua contando
+nas estatísticas). Com excluir_voluntarios eles são apagados, menos os que
+têm participações no arquivo histórico (arquivo.py), que são anonimizados
+para o histórico continuar inteiro. O trabalho anda em lotes de até `lote` chaves primárias
+consecutivas entre os candidatos, cada lote em uma transação curta, e na
+ordem das FKs: vínculos antes de eventos, veículos e voluntários. Assim a
+limpeza pode rodar em horário comercial sem segurar travas por muito tempo.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import CharField, Exists, OuterRef, Q, Value
+from django.db.models.functions import Cast, Concat
+
+from .ical import invalidar_feeds
+from .models import (
+    Evento, EventoVeiculo, EventoVeiculoArquivado, Tarefa, Veiculo, Voluntario,
+    VoluntarioEvento, VoluntarioEventoArquivado,
+)
+
+
+DOMINIO_ANONIMO = 'anonimizado.invalid'
+
+
+def _expirado(limite, caminho=''):
+    return Q(**{f'{caminho}ativo': False, f'{caminho}data_inativacao__lt': limite})
+
+
+def etapas(limite, excluir_voluntarios=False):
+    """
+    [(nome, consulta, anonimizar)] na ordem das FKs: quem referencia sai antes
+    de quem é referenciado
+    """
+    veiculos_evento = _expirado(limite) | _expirado(limite, 'evento__')
+    vinculos = veiculos_evento
+    nao_anonimizados = Voluntario.objects.filter(_expirado(limite)).exclude(
+        email_corporativo__endswith=f'@{DOMINIO_ANONIMO}'
+    )
+    if excluir_voluntarios:
+        vinculos |= _expirado(limite, 'voluntario__')
+        # Apagar o voluntário levaria junto o histórico arquivado: esse é anonimizado
+        no_arquivo = (
+            Exists(VoluntarioEventoArquivado.objects.filter(voluntario=OuterRef('pk')))
+            | Exists(EventoVeiculoArquivado.objects.filter(motorista=OuterRef('pk')))
+        )
+        voluntarios = [
+            ('voluntários', Voluntario.objects.filter(_expirado(limite)).exclude(no_arquivo), False),
+            ('voluntários no arquivo', nao_anonimizados.filter(no_arquivo), True),
+        ]
+    else:
+        voluntarios = [('voluntários', nao_anonimizados, True)]
+
+    return [
+        ('voluntários em eventos', VoluntarioEvento.objects.filter(vinculos), False),
+        ('veículos em eventos', EventoVeiculo.objects.filter(veiculos_evento), False),
+        ('eventos', Evento.objects.filter(_expirado(limite)), False),
+        *voluntarios,
+        # Veículo com vínculos que continuam no histórico (ou no arquivo) fica, mesmo inativo
+        ('veículos', Veiculo.objects.filter(_expirado(limite)).exclude(
+            Exists(EventoVeiculo.objects.filter(veiculo=OuterRef('pk')))
+        ).exclude(
+            Exists(EventoVeiculoArquivado.objects.filter(veiculo=OuterRef('pk')))
+        ), False),
+        ('tarefas concluídas', Tarefa.objects.filter(
+            status__in=['concluida', 'falhou'], data_conclusao__lt=limite
+        ), False),
+    ]
+
+
+def anonimizar_voluntarios(consulta):
+    """Um UPDATE: dados pessoais trocados por valores derivados do id (únicos)"""
+    # O nome do motorista sai nos feeds .ics dos veículos
+    veiculos = list(EventoVeiculo.ativos.filter(motorista__in=consulta).values_list('veiculo_id', flat=True))
+    transaction.on_commit(lambda: invalidar_feeds('veiculo', veiculos))
+
+    id_texto = Cast('id', output_field=CharField())
+    return consulta.update(
+        nome_completo=Value('Voluntário anonimizado'),
+        email_corporativo=Concat(id_texto, Value(f'@{DOMINIO_ANONIMO}'), output_field=CharField()),
+        cpf=Concat(Value('anon'), id_texto, output_field=CharField()),
+        telefone=Value(''),
+        setor=Value(''),
+        cargo=Value(''),
+        experiencia_anterior=None,
+    )
+
+
+def executar(consulta, anonimizar=False, lote=1000, pausa=0.0):
+    """
+    Apaga (ou anonimiza) os registros da consulta lote a lote; cada lote é uma
+    faixa de PKs em uma transação. Retorna {'linhas', 'lotes', 'segundos'}.
+    """
+    resultado = {'linhas': 0, 'lotes': 0, 'segundos': 0.0}
+    rotulo = consulta.model._meta.label
+    inicio = time.perf_counter()
+    ultimo = None
+
+    while True:
+        candidatos = consulta.order_by('pk')
+        if ultimo is not None:
+            candidatos = candidatos.filter(pk__gt=ultimo)
+        ids = list(candidatos.values_list('pk', flat=True)[:lote])
+        if not ids:
+            break
+
+        # A faixa é refiltrada dentro da transação: só sai o que ainda está expirado
+        faixa = consulta.filter(pk__gte=ids[0], pk__lte=ids[-1])
+        with transaction.atomic():
+            if anonimizar:
+                resultado['linhas'] += anonimizar_voluntarios(faixa)
+            else:
+                resultado['linhas'] += faixa.delete()[1].get(rotulo, 0)
+        resultado['lotes'] += 1
+        ultimo = ids[-1]
+
+        if len(ids) < lote:
+            break
+        if pausa:
+            time.sleep(pausa)
+
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
@@ -0,0 +1,113 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .ical import invalidar_feeds
+from .models import Evento, EventoVeiculo, Veiculo, Voluntario, VoluntarioEvento
+from .tempo_real import publicar_alteracao
+
+
+def _mensagem_voluntario(instance):
+    """Estado compacto do voluntário no evento, como o feed ao vivo o recebe"""
+    return {
+        'tipo': 'voluntario',
+        'id': instance.id,
+        'voluntario_id': instance.voluntario_id,
+        'presenca': instance.presenca,
+        'presenca_display': instance.get_presenca_display(),
+        'funcao': instance.funcao,
+        'evento_veiculo_id': instance.evento_veiculo_id,
+        'ativo': instance.ativo,
+    }
+
+
+def _mensagem_veiculo(instance):
+    return {
+        'tipo': 'veiculo',
+        'id': instance.id,
+        'veiculo_id': instance.veiculo_id,
+        'motorista_id': instance.motorista_id,
+        'ativo': instance.ativo,
+    }
+
+
+MENSAGENS = {VoluntarioEvento: _mensagem_voluntario, EventoVeiculo: _mensagem_veiculo}
+
+# Feed .ics de cada vínculo: (recurso, campo com o id)
+FEEDS = {VoluntarioEvento: ('voluntario', 'voluntario_id'), EventoVeiculo: ('veiculo', 'veiculo_id')}
+
+
+def publicar_em_lote(modelo, ids):
+    """
+    UPDATE em lote (soft_delete, reativar, update) não dispara post_save: relê
+    as linhas alteradas, publica no feed ao vivo e invalida os feeds .ics como
+    o save() de cada uma faria
+    """
+    montar = MENSAGENS[modelo]
+    recurso, campo = FEEDS[modelo]
+    linhas = list(modelo.objects.filter(id__in=ids))
+    mensagens = [(linha.evento_id, montar(linha)) for linha in linhas]
+    feeds = [getattr(linha, campo) for linha in linhas]
+
+    def publicar():
+        for evento_id, mensagem in mensagens:
+            publicar_alteracao(evento_id, mensagem)
+        invalidar_feeds(recurso, feeds)
+    transaction.on_commit(publicar)
+
+
+@receiver(post_save, sender=VoluntarioEvento)
+def publicar_voluntario_evento(sender, instance, **kwargs):
+    """Envia ao feed ao vivo o estado compacto do voluntário no evento"""
+    mensagem = _mensagem_voluntario(instance)
+    evento_id = instance.evento_id
+    transaction.on_commit(lambda: publicar_alteracao(evento_id, mensagem))
+    transaction.on_commit(lambda: invalidar_feeds('voluntario', [instance.voluntario_id]))
+
+
+@receiver(post_save, sender=EventoVeiculo)
+def publicar_evento_veiculo(sender, instance, **kwargs):
+    """Envia ao feed ao vivo as alterações de veículos do evento"""
+    mensagem = _mensagem_veiculo(instance)
+    evento_id = instance.evento_id
+    transaction.on_commit(lambda: publicar_alteracao(evento_id, mensagem))
+    transaction.on_commit(lambda: invalidar_feeds('veiculo', [instance.veiculo_id]))
+
+
+@receiver(post_save, sender=Evento)
+def invalidar_feeds_evento(sender, instance, created, **kwargs):
+    """Data, horário ou status do evento mudam todos os feeds em que ele aparece"""
+    voluntarios, veiculos = [], []
+    if not created:
+        voluntarios = list(instance.voluntarioevento_set.ativos().values_list('voluntario_id', flat=True))
+        veiculos = list(instance.eventoveiculo_set.ativos().values_list('veiculo_id', flat=True))
+
+    def invalidar():
+        invalidar_feeds('geral', [0])
+        invalidar_feeds('voluntario', voluntarios)
+        invalidar_feeds('veiculo', veiculos)
+    transaction.on_commit(invalidar)
+
+
+@receiver(post_save, sender=Veiculo)
+def invalidar_feed_veiculo(sender, instance, created, **kwargs):
+    """O nome do veículo aparece também nos feeds dos voluntários que vão nele"""
+    passageiros = []
+    if not created:
+        passageiros = list(VoluntarioEvento.ativos.filter(
+            evento_veiculo__veiculo=instance
+        ).values_list('voluntario_id', flat=True))
+
+    def invalidar():
+        invalidar_feeds('veiculo', [instance.id])
+        invalidar_feeds('voluntario', passageiros)
+    transaction.on_commit(invalidar)
+
+
+@receiver(post_save, sender=Voluntario)
+def invalidar_feeds_motorista(sender, instance, created, **kwargs):
+    """O nome do voluntário aparece nos feeds dos veículos que ele dirige"""
+    if created:
+        return
+    veiculos = list(EventoVeiculo.ativos.filter(motorista=instance).values_list('veiculo_id', flat=True))
+    transaction.on_commit(lambda: invalidar_feeds('veiculo', veiculos))
@@ -0,0 +1,250 @@
+"""
+Fila de tarefas em segundo plano persistida no banco (modelo Tarefa).
+
+Views enfileiram com enfileirar('nome', **parametros) e o comando
+``manage.py processar_tarefas`` executa as tarefas pendentes em lotes.
+"""
+import csv
+import logging
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Evento, Tarefa, Voluntario, VoluntarioEvento
+
+
+logger = logging.getLogger(__name__)
+
+# Espera antes de cada nova tentativa: 30s, 1min, 2min, 4min...
+ATRASO_BASE_RETENTATIVA = 30
+
+# Tarefa "executando" há mais que isso tem o worker dado como morto e volta à fila;
+# a nova reserva conta como mais uma tentativa
+PRAZO_EXECUCAO = timedelta(minutes=15)
+
+_registro = {}
+
+
+def tarefa(nome, lote=False):
+    """
+    Registra uma função como tarefa.
+
+    Com lote=True a função recebe a lista de parâmetros de todas as tarefas
+    pendentes com o mesmo nome, permitindo agrupar o trabalho (ex.: uma única
+    conexão SMTP para vários envios).
+    """
+    def decorator(funcao):
+        _registro[nome] = (funcao, lote)
+        return funcao
+    return decorator
+
+
+def enfileirar(nome, executar_apos=None, max_tentativas=5, **parametros):
+    """Cria a tarefa; dentro de uma transação ela só fica visível após o commit"""
+    if nome not in _registro:
+        raise ValueError(f'Tarefa desconhecida: {nome}')
+
+    return Tarefa.objects.create(
+        nome=nome,
+        parametros=parametros,
+        executar_apos=executar_apos or timezone.now(),
+        max_tentativas=max_tentativas,
+    )
+
+
+def _reservar(limite):
+    """
+    Marca até `limite` tarefas como em execução (seguro entre workers): as
+    pendentes e as abandonadas por um worker que parou no meio
+    """
+    agora = timezone.now()
+    abandonadas = Q(status='executando', data_inicio__lt=agora - PRAZO_EXECUCAO)
+    with transaction.atomic():
+        Tarefa.objects.filter(abandonadas, tentativas__gte=F('max_tentativas')).update(
+            status='falhou',
+            erro='Execução interrompida: o worker parou antes de concluir a tarefa.',
+            data_conclusao=agora,
+        )
+        ids = list(
+            Tarefa.objects.filter(Q(status='pendente', executar_apos__lte=agora) | abandonadas)
+            .order_by('executar_apos', 'id')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:limite]
+        )
+        Tarefa.objects.filter(id__in=ids).update(
+            status='executando',
+            data_inicio=agora,
+            tentativas=F('tentativas') + 1,
+        )
+    return list(Tarefa.objects.filter(id__in=ids).order_by('executar_apos', 'id'))
+
+
+def _concluir(tarefas, resultado=None):
+    Tarefa.objects.filter(id__in=[t.id for t in tarefas]).update(
+        status='concluida',
+        resultado=resultado,
+        erro='',
+        data_conclusao=timezone.now(),
+    )
+
+
+def _falhar(tarefas, erro):
+    agora = timezone.now()
+    for t in tarefas:
+        if t.tentativas < t.max_tentativas:
+            t.status = 'pendente'
+            t.executar_apos = agora + timedelta(seconds=ATRASO_BASE_RETENTATIVA * 2 ** (t.tentativas - 1))
+        else:
+            t.status = 'falhou'
+            t.data_conclusao = agora
+        t.erro = erro
+    Tarefa.objects.bulk_update(tarefas, ['status', 'executar_apos', 'erro', 'data_conclusao'])
+
+
+def processar_lote(limite=50):
+    """Executa um lote de tarefas pendentes e retorna quantas foram processadas"""
+    tarefas = _reservar(limite)
+
+    grupos = {}
+    for t in tarefas:
+        grupos.setdefault(t.nome, []).append(t)
+
+    for nome, grupo in grupos.items():
+        if nome not in _registro:
+            _falhar(grupo, f'Tarefa desconhecida: {nome}')
+            continue
+
+        funcao, em_lote = _registro[nome]
+        execucoes = [grupo] if em_lote else [[t] for t in grupo]
+
+        for execucao in execucoes:
+            try:
+                if em_lote:
+                    resultado = funcao([t.parametros for t in execucao])
+                else:
+                    resultado = funcao(**execucao[0].parametros)
+            except Exception:
+                logger.exception('Falha ao executar tarefa %s', nome)
+                _falhar(execucao, traceback.format_exc())
+            else:
+                _concluir(execucao, resultado)
+
+    return len(tarefas)
+
+
+# ==================== TAREFAS ====================
+
+@tarefa('notificar_evento', lote=True)
+def notificar_evento(lista_parametros):
+    """Avisos de cancelamento, reagendamento ou exclusão, agrupados por tipo"""
+    from .notificacoes import notificar_voluntarios
+
+    por_tipo = {}
+    for parametros in lista_parametros:
+        evento_ids, anteriores = por_tipo.setdefault(parametros['tipo'], (set(), {}))
+        evento_ids.add(parametros['evento_id'])
+        if parametros.get('anterior'):
+            anteriores[str(parametros['evento_id'])] = parametros['anterior']
+
+    return {
+        tipo: notificar_voluntarios(tipo, evento_ids, anteriores)
+        for tipo, (evento_ids, anteriores) in por_tipo.items()
+    }
+
+
+@tarefa('exportar_escala_evento')
+def exportar_escala_evento(evento_id):
+    """Gera o CSV da escala do evento em EXPORTACOES_DIR"""
+    evento = Evento.objects.get(id=evento_id)
+    diretorio = Path(settings.EXPORTACOES_DIR)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    caminho = diretorio / f'escala_evento_{evento.id}_{timezone.now():%Y%m%d%H%M%S}.csv'
+
+    alocacoes = VoluntarioEvento.ativos.filter(evento=evento).select_related(
+        'voluntario', 'evento_veiculo__veiculo'
+    ).order_by('funcao', 'voluntario__nome_completo')
+
+    with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+        escritor = csv.writer(arquivo, delimiter=';')
+        escritor.writerow(['Nome', 'Email', 'Telefone', 'Agência', 'Setor', 'Função', 'Veículo', 'Presença'])
+        for ve in alocacoes.iterator(chunk_size=500):
+            escritor.writerow([
+                ve.voluntario.nome_completo,
+                ve.voluntario.email_corporativo,
+                ve.voluntario.telefone,
+                ve.voluntario.get_agencia_display(),
+                ve.voluntario.setor,
+                ve.funcao_customizada if ve.funcao == 'outro' else ve.get_funcao_display(),
+                ve.evento_veiculo.veiculo.nome if ve.evento_veiculo else '',
+                ve.get_presenca_display(),
+            ])
+
+    return {'arquivo': str(caminho)}
+
+
+@tarefa('recalcular_resumo_horas')
+def recalcular_resumo_horas(ano):
+    """Descarta e recalcula o cache de horas dos meses fechados de um ano"""
+    from .estatisticas import AGRUPAMENTOS, _chave_cache, resumo_horas
+
+    cache.delete_many([
+        _chave_cache(agrupamento, ano, mes)
+        for agrupamento in AGRUPAMENTOS
+        for mes in range(1, 13)
+    ])
+
+    inicio = timezone.localdate().replace(year=ano, month=1, day=1)
+    fim = inicio.replace(month=12, day=31)
+    totais = {agrupamento: len(resumo_horas(agrupamento, inicio, fim)) for agrupamento in AGRUPAMENTOS}
+    return {'ano': ano, 'grupos': totais}
+
+
+@tarefa('importar_voluntarios')
+def importar_voluntarios(arquivo):
+    """
+    Importa voluntários de um CSV (separado por ';') com as colunas
+    nome_completo, email_corporativo, cpf, telefone, agencia, setor, tamanho_camiseta.
+    Linhas inválidas ou com email/CPF já cadastrados são ignoradas.
+    """
+    from .views import validar_cpf
+
+    agencias = {codigo for codigo, nome in Voluntario.AGENCIAS_CHOICES}
+    tamanhos = {codigo for codigo, nome in Voluntario.TAMANHOS_CAMISETA}
+    novos, ignorados = [], []
+
+    with open(arquivo, newline='', encoding='utf-8') as origem:
+        for numero, linha in enumerate(csv.DictReader(origem, delimiter=';'), start=2):
+            cpf = ''.join(filter(str.isdigit, linha.get('cpf', '')))
+            email = linha.get('email_corporativo', '').strip().lower()
+
+            if (not validar_cpf(cpf) or not email.endswith('@sicoob.com.br')
+                    or linha.get('agencia') not in agencias
+                    or linha.get('tamanho_camiseta') not in tamanhos):
+                ignorados.append(numero)
+                continue
+
+            novos.append(Voluntario(
+                nome_completo=linha.get('nome_completo', '').strip(),
+                email_corporativo=email,
+                cpf=cpf,
+                telefone=linha.get('telefone', '').strip(),
+                agencia=linha['agencia'],
+                setor=linha.get('setor', '').strip(),
+                tamanho_camiseta=linha['tamanho_camiseta'],
+            ))
+
+    antes = Voluntario.objects.count()
+    Voluntario.objects.bulk_create(novos, batch_size=500, ignore_conflicts=True)
+    importados = Voluntario.objects.count() - antes
+
+    return {
+        'importados': importados,
+        'duplicados': len(novos) - importados,
+        'linhas_invalidas': ignorados,
+    }
@@ -0,0 +1,14 @@
+import uuid
+
+from django import template
+from django.utils.html import format_html
+
+from vmm.idempotencia import CAMPO_CHAVE
+
+register = template.Library()
+
+
+@register.simple_tag
+def chave_idempotencia():
+    """Campo oculto com uma chave nova a cada formulário renderizado"""
+    return format_html('<input type="hidden" name="{}" value="{}">', CAMPO_CHAVE, uuid.uuid4().hex)
@@ -0,0 +1,138 @@
+"""
+Pub/sub para o feed ao vivo (SSE) de cada evento.
+
+Por padrão as mensagens circulam apenas dentro do processo, o que basta para
+um único worker ASGI. Com PUBSUB_REDIS_URL configurado, um Redis (local ou
+remoto) distribui as mensagens entre vários workers.
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+
+
+TAMANHO_MAXIMO_FILA = 100
+
+logger = logging.getLogger(__name__)
+
+
+def canal_evento(evento_id):
+    return f'vmm:evento:{evento_id}'
+
+
+class AssinaturaLocal:
+    def __init__(self, broker, evento_id):
+        self.broker = broker
+        self.evento_id = evento_id
+        self.loop = asyncio.get_running_loop()
+        self.fila = asyncio.Queue(maxsize=TAMANHO_MAXIMO_FILA)
+
+    def entregar(self, mensagem):
+        # Executado no loop do assinante; descarta a mais antiga se o cliente estiver lento
+        if self.fila.full():
+            self.fila.get_nowait()
+        self.fila.put_nowait(mensagem)
+
+    async def receber(self, timeout):
+        """Próxima mensagem ou None se nada chegar dentro do timeout"""
+        try:
+            return await asyncio.wait_for(self.fila.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def fechar(self):
+        self.broker.remover(self)
+
+
+class BrokerLocal:
+    """Pub/sub em memória: publica de qualquer thread, entrega nos loops assíncronos"""
+
+    def __init__(self):
+        self._assinantes = {}
+        self._trava = threading.Lock()
+
+    def publicar(self, evento_id, mensagem):
+        with self._trava:
+            assinaturas = list(self._assinantes.get(evento_id, ()))
+
+        for assinatura in assinaturas:
+            try:
+                assinatura.loop.call_soon_threadsafe(assinatura.entregar, mensagem)
+            except RuntimeError:
+                # Loop já encerrado; a assinatura será removida ao fechar
+                pass
+
+    async def assinar(self, evento_id):
+        assinatura = AssinaturaLocal(self, evento_id)
+        with self._trava:
+            self._assinantes.setdefault(evento_id, set()).add(assinatura)
+        return assinatura
+
+    def remover(self, assinatura):
+        with self._trava:
+            assinaturas = self._assinantes.get(assinatura.evento_id)
+            if assinaturas:
+                assinaturas.discard(assinatura)
+                if not assinaturas:
+                    del self._assinantes[assinatura.evento_id]
+
+
+class AssinaturaRedis:
+    def __init__(self, cliente, pubsub):
+        self.cliente = cliente
+        self.pubsub = pubsub
+
+    async def receber(self, timeout):
+        mensagem = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if mensagem is None:
+            return None
+        return json.loads(mensagem['data'])
+
+    async def fechar(self):
+        await self.pubsub.aclose()
+        await self.cliente.aclose()
+
+
+class BrokerRedis:
+    """Pub/sub via Redis, para quando houver mais de um worker ASGI"""
+
+    def __init__(self, url):
+        import redis  # dependência opcional
+
+        self.url = url
+        self._cliente = redis.Redis.from_url(url)
+        self._erro = redis.RedisError
+
+    def publicar(self, evento_id, mensagem):
+        # Roda no on_commit, com a gravação já confirmada: Redis fora do ar só atrasa o feed
+        try:
+            self._cliente.publish(canal_evento(evento_id), json.dumps(mensagem))
+        except self._erro:
+            logger.exception('Falha ao publicar no feed ao vivo do evento %s', evento_id)
+
+    async def assinar(self, evento_id):
+        from redis import asyncio as aioredis
+
+        cliente = aioredis.from_url(self.url)
+        pubsub = cliente.pubsub()
+        await pubsub.subscribe(canal_evento(evento_id))
+        return AssinaturaRedis(cliente, pubsub)
+
+
+_broker = None
+_trava_broker = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _trava_broker:
+        if _broker is None:
+            url = getattr(settings, 'PUBSUB_REDIS_URL', None)
+            _broker = BrokerRedis(url) if url else BrokerLocal()
+    return _broker
+
+
+def publicar_alteracao(evento_id, mensagem):
+    get_broker().publicar(evento_id, mensagem)
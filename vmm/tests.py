@@ -1,3 +1,577 @@
-from django.test import TestCase
+from datetime import date, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import checkin
+from .arquivo import arquivar
+from .auditoria import JANELA_PAINEL, auditar_conflitos, conflitos_proximos
+from .estatisticas import resumo_horas
+from .frota import relatorio_frota, segunda_feira
+from .ical import versao_feed
+from .management.commands.verificar_indices import consultas_criticas, explicar, indices_esperados
+from .models import (
+    Evento, EventoArquivado, EventoVeiculo, Tarefa, Veiculo, Voluntario,
+    VoluntarioEvento, VoluntarioEventoArquivado,
+)
+from .retencao import DOMINIO_ANONIMO, etapas, executar
+from .tarefas import PRAZO_EXECUCAO, _reservar, enfileirar
+
+
+# Páginas renderizadas nos testes não dependem do manifesto do collectstatic
+SEM_MANIFESTO = {
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def criar_voluntario(numero, **campos):
+    return Voluntario.objects.create(**{
+        'nome_completo': f'Voluntário {numero}',
+        'email_corporativo': f'voluntario{numero}@sicoob.com.br',
+        'cpf': f'{numero:011d}',
+        'telefone': '(34) 99999-9999',
+        'agencia': '001',
+        'setor': 'TI',
+        'tamanho_camiseta': 'M',
+        **campos,
+    })
+
+
+def criar_evento(data_evento, inicio=time(8), fim=time(12), **campos):
+    return Evento.objects.create(**{
+        'nome_escola': f'Escola {data_evento:%d/%m} {inicio:%H}h',
+        'responsavel_escola': 'Responsável',
+        'telefone_responsavel': '(34) 3333-3333',
+        'cidade': 'Uberlândia',
+        'endereco': 'Rua A, 1',
+        'data_evento': data_evento,
+        'hora_inicio': inicio,
+        'hora_fim': fim,
+        **campos,
+    })
+
+
+def criar_veiculo(numero, capacidade=2):
+    return Veiculo.objects.create(nome=f'Van {numero}', placa=f'ABC{numero:04d}', tipo='van', capacidade=capacidade)
+
+
+class IntervaloEventoTests(TestCase):
+    def test_evento_que_passa_da_meia_noite_termina_no_dia_seguinte(self):
+        evento = criar_evento(date(2026, 5, 1), time(22), time(2))
+        evento.full_clean()
+        self.assertEqual(evento.fim - evento.inicio, timedelta(hours=4))
+        self.assertEqual(timezone.localtime(evento.fim).date(), date(2026, 5, 2))
+
+    def test_inicio_igual_ao_termino_e_recusado(self):
+        evento = criar_evento(date(2026, 5, 1), time(8), time(8))
+        with self.assertRaises(ValidationError):
+            evento.full_clean()
+
+    def test_sobrepostos_considera_so_intervalos_que_se_cruzam(self):
+        cedo = criar_evento(date(2026, 5, 1), time(8), time(10))
+        tarde = criar_evento(date(2026, 5, 1), time(10), time(12))
+        noite = criar_evento(date(2026, 4, 30), time(22), time(9))
+        inicio, fim = cedo.inicio, cedo.fim
+
+        self.assertEqual(
+            set(Evento.objects.sobrepostos(inicio, fim)),
+            {cedo, noite},
+        )
+        self.assertNotIn(tarde, Evento.objects.sobrepostos(inicio, fim))
+
+    def test_vinculo_acompanha_mudanca_de_horario_do_evento(self):
+        evento = criar_evento(date(2026, 5, 1))
+        vinculo = VoluntarioEvento.objects.create(evento=evento, voluntario=criar_voluntario(1), funcao='monitor')
+
+        evento.hora_fim = time(15)
+        evento.save()
+
+        vinculo.refresh_from_db()
+        self.assertEqual(vinculo.fim, evento.fim)
+
+    def test_vinculo_movido_para_outro_evento_copia_o_novo_intervalo(self):
+        origem = criar_evento(date(2026, 5, 1))
+        destino = criar_evento(date(2026, 6, 1), time(13), time(17))
+        criado = VoluntarioEvento.objects.create(evento=origem, voluntario=criar_voluntario(1), funcao='monitor')
+
+        vinculo = VoluntarioEvento.objects.get(id=criado.id)
+        vinculo.evento = destino
+        vinculo.save()
+
+        vinculo.refresh_from_db()
+        self.assertEqual((vinculo.inicio, vinculo.fim), (destino.inicio, destino.fim))
+
+
+class AlocacaoTests(TestCase):
+    def setUp(self):
+        self.evento = criar_evento(date(2026, 5, 1))
+        self.voluntario = criar_voluntario(1)
+
+    def test_voluntario_nao_fica_em_eventos_simultaneos(self):
+        VoluntarioEvento(evento=self.evento, voluntario=self.voluntario, funcao='monitor').alocar()
+        simultaneo = criar_evento(date(2026, 5, 1), time(11), time(13))
+
+        with self.assertRaises(ValidationError):
+            VoluntarioEvento(evento=simultaneo, voluntario=self.voluntario, funcao='monitor').alocar()
+
+    def test_voluntario_em_eventos_consecutivos(self):
+        VoluntarioEvento(evento=self.evento, voluntario=self.voluntario, funcao='monitor').alocar()
+        seguinte = criar_evento(date(2026, 5, 1), time(12), time(14))
+
+        VoluntarioEvento(evento=seguinte, voluntario=self.voluntario, funcao='monitor').alocar()
+        self.assertEqual(VoluntarioEvento.ativos.filter(voluntario=self.voluntario).count(), 2)
+
+    def test_capacidade_do_veiculo(self):
+        evento_veiculo = EventoVeiculo.objects.create(evento=self.evento, veiculo=criar_veiculo(1, capacidade=1))
+        VoluntarioEvento(
+            evento=self.evento, voluntario=self.voluntario, funcao='monitor',
+            vai_no_veiculo=True, evento_veiculo=evento_veiculo,
+        ).alocar()
+
+        with self.assertRaises(ValidationError) as erro:
+            VoluntarioEvento(
+                evento=self.evento, voluntario=criar_voluntario(2), funcao='monitor',
+                vai_no_veiculo=True, evento_veiculo=evento_veiculo,
+            ).alocar()
+        self.assertIn('vai_no_veiculo', erro.exception.message_dict)
+
+
+class VeiculoRemovidoTests(TestCase):
+    def setUp(self):
+        self.evento = criar_evento(timezone.localdate() + timedelta(days=7))
+        self.removido = EventoVeiculo.objects.create(evento=self.evento, veiculo=criar_veiculo(1))
+        self.removido.delete()
+
+    def test_editar_nao_coloca_voluntario_em_veiculo_removido(self):
+        vinculo = VoluntarioEvento.objects.create(evento=self.evento, voluntario=criar_voluntario(1), funcao='monitor')
+        self.client.post(reverse('vmm:editar_voluntario_evento', args=[vinculo.id]), {
+            'funcao': 'monitor', 'evento_veiculo': self.removido.id,
+        })
+
+        vinculo.refresh_from_db()
+        self.assertIsNone(vinculo.evento_veiculo_id)
+        self.assertFalse(vinculo.vai_no_veiculo)
+
+    def test_adicionar_nao_coloca_voluntario_em_veiculo_removido(self):
+        voluntario = criar_voluntario(2)
+        self.client.post(reverse('vmm:adicionar_voluntario_evento', args=[self.evento.id]), {
+            'voluntario_id': voluntario.id, 'funcao': 'monitor', 'evento_veiculo': self.removido.id,
+        })
+
+        self.assertFalse(VoluntarioEvento.objects.filter(evento_veiculo=self.removido).exists())
+
+
+class FrotaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.semana = segunda_feira(timezone.localdate()) + timedelta(weeks=1)
+        self.evento = criar_evento(self.semana + timedelta(days=2))
+
+    def _passageiro(self, numero, evento_veiculo=None):
+        VoluntarioEvento.objects.create(
+            evento=self.evento, voluntario=criar_voluntario(numero), funcao='monitor',
+            vai_no_veiculo=True, evento_veiculo=evento_veiculo,
+        )
+
+    def _previsao(self):
+        relatorio = relatorio_frota(semanas_passadas=1, semanas_futuras=2)
+        return next(semana for semana in relatorio['previsao'] if semana['semana'] == self.semana)
+
+    def test_demanda_supera_a_oferta_com_veiculo_em_manutencao_e_voluntario_sem_lugar(self):
+        disponivel = EventoVeiculo.objects.create(evento=self.evento, veiculo=criar_veiculo(1, capacidade=2))
+        manutencao = criar_veiculo(2, capacidade=4)
+        manutencao.status = 'manutencao'
+        manutencao.save()
+        parado = EventoVeiculo.objects.create(evento=self.evento, veiculo=manutencao)
+
+        self._passageiro(1, disponivel)
+        self._passageiro(2, disponivel)
+        self._passageiro(3, parado)
+        self._passageiro(4)
+
+        semana = self._previsao()
+        self.assertEqual((semana['demanda'], semana['oferta'], semana['deficit']), (4, 2, 2))
+
+    def test_sem_deficit_quando_os_lugares_bastam(self):
+        vinculo = EventoVeiculo.objects.create(evento=self.evento, veiculo=criar_veiculo(1, capacidade=4))
+        self._passageiro(1, vinculo)
+
+        semana = self._previsao()
+        self.assertEqual((semana['demanda'], semana['oferta'], semana['deficit']), (1, 4, 0))
+
+
+class FeedsIcalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.evento = criar_evento(timezone.localdate() + timedelta(days=7))
+        self.motorista = criar_voluntario(1)
+        self.passageiro = criar_voluntario(2)
+        self.veiculo = criar_veiculo(1)
+        self.evento_veiculo = EventoVeiculo.objects.create(
+            evento=self.evento, veiculo=self.veiculo, motorista=self.motorista
+        )
+        VoluntarioEvento.objects.create(
+            evento=self.evento, voluntario=self.passageiro, funcao='monitor',
+            vai_no_veiculo=True, evento_veiculo=self.evento_veiculo,
+        )
+
+    def _depois(self, recurso, objeto_id, acao):
+        antes = versao_feed(recurso, objeto_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            acao()
+        self.assertNotEqual(versao_feed(recurso, objeto_id), antes)
+
+    def test_remover_veiculo_do_evento_invalida_feed_do_passageiro(self):
+        self._depois('voluntario', self.passageiro.id, lambda: self.client.post(
+            reverse('vmm:remover_veiculo_evento', args=[self.evento_veiculo.id])
+        ))
+
+    def test_excluir_evento_invalida_feeds_dos_vinculos(self):
+        url = reverse('vmm:excluir_evento', args=[self.evento.id])
+        self._depois('veiculo', self.veiculo.id, lambda: self.client.post(url))
+
+    def test_renomear_veiculo_invalida_feed_do_passageiro(self):
+        self.veiculo.nome = 'Van Nova'
+        self._depois('voluntario', self.passageiro.id, self.veiculo.save)
+
+    def test_renomear_motorista_invalida_feed_do_veiculo(self):
+        self.motorista.nome_completo = 'Outro Nome'
+        self._depois('veiculo', self.veiculo.id, self.motorista.save)
+
+
+class AuditoriaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hoje = timezone.localdate()
+        self.voluntario = criar_voluntario(1)
+
+    def _conflito_em(self, data_evento):
+        for inicio, fim in ((time(8), time(12)), (time(10), time(14))):
+            VoluntarioEvento.objects.create(
+                evento=criar_evento(data_evento, inicio, fim), voluntario=self.voluntario, funcao='monitor'
+            )
+
+    def test_painel_olha_so_a_janela_e_usa_o_cache(self):
+        self._conflito_em(self.hoje + timedelta(days=3))
+        self._conflito_em(self.hoje + JANELA_PAINEL + timedelta(days=10))
+
+        self.assertEqual(len(auditar_conflitos(desde=self.hoje)), 2)
+        self.assertEqual(len(conflitos_proximos(self.hoje)), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(conflitos_proximos(self.hoje)), 1)
+
+
+@override_settings(STORAGES=SEM_MANIFESTO)
+class IdempotenciaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('vmm:cadastro_veiculo')
+        self.dados = {
+            'nome': 'Van Azul', 'placa': 'QWE1234', 'tipo': 'van', 'capacidade': '8',
+            'status': 'disponivel', 'chave_idempotencia': 'a' * 32,
+        }
+        # O formulário entrega o cookie CSRF que identifica o navegador
+        self.client.get(self.url)
+
+    def test_reenvio_recebe_a_resposta_guardada(self):
+        primeira = self.client.post(self.url, self.dados)
+        segunda = self.client.post(self.url, self.dados)
+
+        self.assertEqual(primeira.status_code, 302)
+        self.assertEqual(segunda.status_code, 302)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(Veiculo.objects.filter(placa='QWE1234').count(), 1)
+
+    def test_mesma_chave_com_outro_conteudo_executa_de_novo(self):
+        self.client.post(self.url, self.dados)
+        resposta = self.client.post(self.url, {**self.dados, 'placa': 'QWE9999'})
+
+        self.assertFalse(resposta.has_header('Idempotent-Replayed'))
+        self.assertTrue(Veiculo.objects.filter(placa='QWE9999').exists())
+
+    def test_mesma_chave_em_outra_sessao_nao_reaproveita_a_resposta(self):
+        self.client.post(self.url, self.dados)
+        self.client.cookies.clear()
+        self.client.get(self.url)
+        resposta = self.client.post(self.url, self.dados)
+
+        self.assertFalse(resposta.has_header('Idempotent-Replayed'))
+
+    def test_envio_sem_sessao_nem_cookie_nao_usa_a_chave(self):
+        self.client.cookies.clear()
+        self.client.post(self.url, self.dados)
+        resposta = self.client.post(self.url, self.dados)
+
+        self.assertFalse(resposta.has_header('Idempotent-Replayed'))
+
+    def test_formulario_com_erro_nao_e_guardado(self):
+        dados = {**self.dados, 'placa': ''}
+        self.client.post(self.url, dados)
+        resposta = self.client.post(self.url, dados)
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertFalse(resposta.has_header('Idempotent-Replayed'))
+
+    def test_reenvio_da_inscricao_recebe_o_sucesso_guardado(self):
+        url = reverse('vmm:cadastro_voluntario')
+        dados = {
+            'nome_completo': 'Maria Souza', 'email_corporativo': 'maria.souza@sicoob.com.br',
+            'cpf': '529.982.247-25', 'telefone': '(34) 99999-9999', 'agencia': '001',
+            'setor': 'TI', 'tamanho_camiseta': 'M', 'chave_idempotencia': 'b' * 32,
+        }
+        self.client.get(url)
+
+        primeira = self.client.post(url, dados)
+        self.client.get(url)
+        segunda = self.client.post(url, dados)
+        pagina = self.client.get(segunda['Location'])
+
+        self.assertEqual(primeira.status_code, 302)
+        self.assertEqual((segunda.status_code, segunda['Location']), (302, primeira['Location']))
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertContains(pagina, 'Inscrição realizada com sucesso!')
+        self.assertNotContains(pagina, 'já está cadastrado')
+        self.assertEqual(Voluntario.objects.filter(cpf='52998224725').count(), 1)
+
+    def test_reenvio_durante_o_original_recebe_pagina_de_espera(self):
+        # cache.add falso: outro processo está executando o mesmo envio
+        with mock.patch('vmm.idempotencia.cache.add', return_value=False), \
+                mock.patch('vmm.idempotencia.ESPERA_MAXIMA', 0):
+            resposta = self.client.post(self.url, self.dados)
+            fetch = self.client.post(self.url, self.dados, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+        self.assertEqual(resposta.status_code, 409)
+        self.assertContains(resposta, 'Envio em processamento', status_code=409)
+        self.assertEqual(fetch.status_code, 409)
+        self.assertIn('erro', fetch.json())
+        self.assertFalse(Veiculo.objects.filter(placa='QWE1234').exists())
+
+
+class CheckinTests(TestCase):
+    def setUp(self):
+        self.evento = criar_evento(timezone.localdate(), time(0), time(23, 59))
+        self.vinculo = VoluntarioEvento.objects.create(
+            evento=self.evento, voluntario=criar_voluntario(1), funcao='monitor'
+        )
+
+    def test_primeira_leitura_marca_presenca(self):
+        self.assertEqual(checkin.registrar_checkin(self.evento.id, self.vinculo.id), checkin.PRESENTE)
+        self.vinculo.refresh_from_db()
+        self.assertEqual(self.vinculo.presenca, 'presente')
+
+    def test_leitura_repetida(self):
+        checkin.registrar_checkin(self.evento.id, self.vinculo.id)
+        self.assertEqual(checkin.registrar_checkin(self.evento.id, self.vinculo.id), checkin.JA_PRESENTE)
+
+    def test_fora_do_horario(self):
+        futuro = criar_evento(timezone.localdate() + timedelta(days=3))
+        vinculo = VoluntarioEvento.objects.create(evento=futuro, voluntario=criar_voluntario(2), funcao='monitor')
+        self.assertEqual(checkin.registrar_checkin(futuro.id, vinculo.id), checkin.FORA_DO_HORARIO)
+
+    def test_evento_cancelado(self):
+        self.evento.status = 'cancelado'
+        self.evento.save()
+        self.assertEqual(checkin.registrar_checkin(self.evento.id, self.vinculo.id), checkin.CANCELADO)
+
+    def test_token_adulterado(self):
+        token = checkin.gerar_token(self.vinculo)
+        self.assertEqual(checkin.ler_token(token), (self.evento.id, self.vinculo.id))
+        resposta = self.client.post(reverse('vmm:checkin', args=[token + 'x']))
+        self.assertEqual(resposta.status_code, 400)
+
+
+class RetencaoTests(TestCase):
+    def setUp(self):
+        self.limite = timezone.now() - timedelta(days=30)
+        self.expirado = self.limite - timedelta(days=1)
+
+    def _aplicar(self, excluir_voluntarios=False):
+        for nome, consulta, anonimizar in etapas(self.limite, excluir_voluntarios):
+            executar(consulta, anonimizar)
+
+    def test_apaga_evento_expirado_e_anonimiza_voluntario(self):
+        evento = criar_evento(date(2024, 5, 1), ativo=False, data_inativacao=self.expirado)
+        voluntario = criar_voluntario(1, ativo=False, data_inativacao=self.expirado)
+        recente = criar_voluntario(2, ativo=False, data_inativacao=timezone.now())
+
+        self._aplicar()
+
+        self.assertFalse(Evento.objects.filter(id=evento.id).exists())
+        voluntario.refresh_from_db()
+        self.assertTrue(voluntario.email_corporativo.endswith(f'@{DOMINIO_ANONIMO}'))
+        recente.refresh_from_db()
+        self.assertEqual(recente.email_corporativo, 'voluntario2@sicoob.com.br')
+
+    def test_excluir_voluntarios_preserva_historico_arquivado(self):
+        evento = criar_evento(date(2024, 5, 1), status='concluido')
+        com_historico = criar_voluntario(1)
+        VoluntarioEvento.objects.create(evento=evento, voluntario=com_historico, funcao='monitor')
+        arquivar(2025)
+        sem_historico = criar_voluntario(2)
+        Voluntario.objects.update(ativo=False, data_inativacao=self.expirado)
+
+        self._aplicar(excluir_voluntarios=True)
+
+        self.assertFalse(Voluntario.objects.filter(id=sem_historico.id).exists())
+        com_historico.refresh_from_db()
+        self.assertTrue(com_historico.email_corporativo.endswith(f'@{DOMINIO_ANONIMO}'))
+        self.assertEqual(VoluntarioEventoArquivado.objects.filter(voluntario=com_historico).count(), 1)
+
+
+class ArquivoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.voluntarios = [criar_voluntario(i) for i in range(3)]
+        for mes, status in ((3, 'concluido'), (6, 'concluido'), (9, 'cancelado')):
+            evento = criar_evento(date(2024, mes, 10), status=status)
+            EventoVeiculo.objects.create(evento=evento, veiculo=criar_veiculo(mes))
+            for voluntario, presenca in zip(self.voluntarios, ('presente', 'ausente', 'presente')):
+                VoluntarioEvento.objects.create(
+                    evento=evento, voluntario=voluntario, funcao='monitor', presenca=presenca
+                )
+
+    def test_move_so_eventos_concluidos_de_anos_encerrados(self):
+        resultado = arquivar(2025, lote=1)
+
+        self.assertEqual((resultado['eventos'], resultado['vinculos'], resultado['veiculos']), (2, 6, 2))
+        self.assertEqual(EventoArquivado.objects.count(), 2)
+        self.assertEqual(list(Evento.objects.values_list('status', flat=True)), ['cancelado'])
+        self.assertEqual(VoluntarioEvento.objects.count(), 3)
+
+    def test_resumo_de_horas_soma_as_duas_origens(self):
+        antes = resumo_horas('voluntario', date(2024, 1, 1), date(2024, 12, 31))
+        arquivar(2025)
+        cache.clear()
+        depois = resumo_horas('voluntario', date(2024, 1, 1), date(2024, 12, 31))
+
+        self.assertEqual(sorted(antes, key=str), sorted(depois, key=str))
+        self.assertEqual(sum(linha['total_alocacoes'] for linha in depois), 6)
+
+
+class TarefasTests(TestCase):
+    def test_tarefa_abandonada_volta_para_a_fila(self):
+        tarefa = enfileirar('recalcular_resumo_horas', ano=2025)
+        _reservar(10)
+        self.assertEqual(_reservar(10), [])
+
+        Tarefa.objects.filter(id=tarefa.id).update(data_inicio=timezone.now() - PRAZO_EXECUCAO * 2)
+        reservadas = _reservar(10)
+
+        self.assertEqual([t.id for t in reservadas], [tarefa.id])
+        self.assertEqual(reservadas[0].tentativas, 2)
+
+    def test_tarefa_abandonada_sem_tentativas_falha(self):
+        tarefa = enfileirar('recalcular_resumo_horas', ano=2025, max_tentativas=1)
+        _reservar(10)
+        Tarefa.objects.filter(id=tarefa.id).update(data_inicio=timezone.now() - PRAZO_EXECUCAO * 2)
+
+        self.assertEqual(_reservar(10), [])
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, 'falhou')
+
+
+class NotificacaoEventoTests(TestCase):
+    def setUp(self):
+        self.evento = criar_evento(timezone.localdate() + timedelta(days=7))
+        VoluntarioEvento.objects.create(evento=self.evento, voluntario=criar_voluntario(1), funcao='monitor')
+
+    def _avisos(self, tipo):
+        return Tarefa.objects.filter(nome='notificar_evento', parametros__tipo=tipo).count()
+
+    def test_cancelar_pelo_formulario_de_edicao_avisa_os_voluntarios(self):
+        self.client.post(reverse('vmm:editar_evento', args=[self.evento.id]), {
+            'nome_escola': self.evento.nome_escola, 'responsavel_escola': 'Responsável',
+            'telefone_responsavel': '(34) 3333-3333', 'cidade': 'Uberlândia', 'endereco': 'Rua A, 1',
+            'data_evento': f'{self.evento.data_evento:%Y-%m-%d}', 'hora_inicio': '08:00', 'hora_fim': '12:00',
+            'qtd_tv': '0', 'qtd_computador': '0', 'status': 'cancelado',
+        })
+
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.status, 'cancelado')
+        self.assertEqual(self._avisos('cancelamento'), 1)
+
+    def test_cancelar_pela_acao_de_cancelamento_avisa_os_voluntarios(self):
+        self.client.post(reverse('vmm:cancelar_evento', args=[self.evento.id]))
+        self.assertEqual(self._avisos('cancelamento'), 1)
+
+
+class FeedAoVivoTests(TestCase):
+    def test_feed_ao_vivo_fora_do_asgi(self):
+        evento = criar_evento(date(2026, 5, 1))
+        resposta = self.client.get(reverse('vmm:stream_evento', args=[evento.id]))
+        self.assertEqual(resposta.status_code, 204)
+
+
+class DisponibilidadeAsyncTests(TestCase):
+    async def test_disponibilidade_valida_parametros(self):
+        url = reverse('vmm:api_disponibilidade_async')
+        horario = {'data_evento': '2026-05-01', 'hora_inicio': '08:00', 'hora_fim': '10:00'}
+
+        resposta = await self.async_client.get(url, {**horario, 'evento_id': 'abc'})
+        self.assertEqual(resposta.status_code, 400)
+
+        resposta = await self.async_client.get(url, {**horario, 'voluntario_id': list(range(1, 102))})
+        self.assertEqual(resposta.status_code, 400)
+
+        resposta = await self.async_client.get(
+            reverse('vmm:api_voluntarios_disponiveis_async'), {**horario, 'evento_id': 'abc'}
+        )
+        self.assertEqual(resposta.status_code, 400)
+
+    async def test_disponibilidade_em_lote(self):
+        evento = await Evento.objects.acreate(
+            nome_escola='Escola', responsavel_escola='-', telefone_responsavel='-', cidade='-',
+            endereco='-', data_evento=date(2026, 5, 1), hora_inicio=time(8), hora_fim=time(12),
+        )
+        ocupado = await Voluntario.objects.acreate(
+            nome_completo='Ocupado', email_corporativo='ocupado@sicoob.com.br', cpf='1',
+            telefone='-', agencia='001', setor='TI', tamanho_camiseta='M',
+        )
+        livre = await Voluntario.objects.acreate(
+            nome_completo='Livre', email_corporativo='livre@sicoob.com.br', cpf='2',
+            telefone='-', agencia='001', setor='TI', tamanho_camiseta='M',
+        )
+        await VoluntarioEvento.objects.acreate(evento=evento, voluntario=ocupado, funcao='monitor')
+
+        resposta = await self.async_client.get(reverse('vmm:api_disponibilidade_async'), {
+            'data_evento': '2026-05-01', 'hora_inicio': '09:00', 'hora_fim': '10:00',
+            'voluntario_id': [ocupado.id, livre.id, 999],
+        })
+        disponivel = {item['id']: item['disponivel'] for item in resposta.json()['voluntarios']}
+        self.assertEqual(disponivel, {ocupado.id: False, livre.id: True, 999: False})
+
+
+def nome_do_indice(modelo, campos):
+    return next(indice.name for indice in modelo._meta.indexes if indice.fields == campos)
+
+
+class IndicesTests(TestCase):
+    """Planos do EXPLAIN das consultas críticas no banco dos testes, recém-migrado"""
+
+    def test_consultas_criticas_usam_o_indice_previsto(self):
+        for descricao, queryset, esperados in consultas_criticas():
+            plano, usados = explicar(queryset, esperados)
+            for tabela, colunas in esperados.items():
+                with self.subTest(descricao, tabela=tabela):
+                    self.assertIn(usados.get(tabela), indices_esperados(tabela, colunas), plano)
+
+    def test_listas_sao_lidas_na_ordem_do_indice(self):
+        casos = [
+            (Evento.ativos.order_by('-data_evento', '-hora_inicio')[:10],
+             nome_do_indice(Evento, ['-data_evento', '-hora_inicio'])),
+            (Voluntario.ativos.order_by('-data_cadastro')[:10],
+             nome_do_indice(Voluntario, ['-data_cadastro'])),
+            (Voluntario.ativos.filter(status='ativo').order_by('-data_cadastro')[:10],
+             nome_do_indice(Voluntario, ['status', '-data_cadastro'])),
+        ]
+        for queryset, indice in casos:
+            tabela = queryset.model._meta.db_table
+            plano, usados = explicar(queryset, [tabela])
+            with self.subTest(indice):
+                self.assertEqual(usados[tabela], indice, plano)
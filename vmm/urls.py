@@ -14,6 +14,8 @@ urlpatterns = [
     # Veículos
     path('veiculos/', views.lista_veiculos, name='lista_veiculos'),
     path('veiculos/cadastro/', views.cadastro_veiculo, name='cadastro_veiculo'),
+    path('veiculos/relatorio/', views.relatorio_veiculos, name='relatorio_veiculos'),
+    path('veiculos/relatorio/exportar/', views.exportar_relatorio_veiculos, name='exportar_relatorio_veiculos'),
     path('veiculos/<int:veiculo_id>/editar/', views.editar_veiculo, name='editar_veiculo'),
     path('veiculos/<int:veiculo_id>/excluir/', views.excluir_veiculo, name='excluir_veiculo'),
     path('veiculos/<int:veiculo_id>/reativar/', views.reativar_veiculo, name='reativar_veiculo'),
@@ -26,12 +28,16 @@ urlpatterns = [
     path('eventos/<int:evento_id>/excluir/', views.excluir_evento, name='excluir_evento'),
     path('eventos/<int:evento_id>/reativar/', views.reativar_evento, name='reativar_evento'),
     path('eventos/<int:evento_id>/cancelar/', views.cancelar_evento, name='cancelar_evento'),
+    path('eventos/<int:evento_id>/repetir/', views.repetir_evento, name='repetir_evento'),
+    path('eventos/<int:evento_id>/ao-vivo/', views.stream_evento, name='stream_evento'),
+    path('eventos/<int:evento_id>/checkin/qrcodes/', views.qrcodes_checkin, name='qrcodes_checkin'),
     
     # Voluntários em Eventos
     path('eventos/<int:evento_id>/voluntarios/adicionar/', views.adicionar_voluntario_evento, name='adicionar_voluntario_evento'),
     path('eventos/voluntarios/<int:voluntario_evento_id>/remover/', views.remover_voluntario_evento, name='remover_voluntario_evento'),
     path('eventos/voluntarios/<int:voluntario_evento_id>/editar/', views.editar_voluntario_evento, name='editar_voluntario_evento'),
     path('eventos/voluntarios/<int:voluntario_evento_id>/atualizar-presenca/', views.atualizar_presenca_voluntario, name='atualizar_presenca_voluntario'),
+    path('checkin/<str:token>/', views.checkin, name='checkin'),
     
     # Veículos em Eventos
     path('eventos/<int:evento_id>/veiculos/adicionar/', views.adicionar_veiculo_evento, name='adicionar_veiculo_evento'),
@@ -40,4 +46,22 @@ urlpatterns = [
     # Dashboard e Calendário
     path('dashboard/', views.dashboard_admin, name='dashboard_admin'),
     path('calendario/', views.calendario_eventos, name='calendario_eventos'),
+    path('calendario/eventos.ics', views.ical_eventos, name='ical_eventos'),
+    path('voluntarios/<int:voluntario_id>/escala.ics', views.ical_voluntario, name='ical_voluntario'),
+    path('veiculos/<int:veiculo_id>/agenda.ics', views.ical_veiculo, name='ical_veiculo'),
+    
+    # APIs
+    path('api/disponibilidade/voluntario/', views.api_verificar_disponibilidade_voluntario, name='api_verificar_disponibilidade_voluntario'),
+    path('api/disponibilidade/veiculo/', views.api_verificar_disponibilidade_veiculo, name='api_verificar_disponibilidade_veiculo'),
+    path('api/voluntarios/disponiveis/', views.api_voluntarios_disponiveis, name='api_voluntarios_disponiveis'),
+    path('api/eventos/estatisticas/', views.api_estatisticas_eventos, name='api_estatisticas_eventos'),
+    path('api/eventos/<int:evento_id>/candidatos/', views.api_candidatos_evento, name='api_candidatos_evento'),
+    path('api/eventos/<int:evento_id>/impacto-reagendamento/', views.api_impacto_reagendamento, name='api_impacto_reagendamento'),
+    path('api/eventos/<int:evento_id>/estatisticas/', views.api_estatisticas_evento, name='api_estatisticas_evento'),
+    path('api/voluntariado/horas/', views.api_horas_voluntariado, name='api_horas_voluntariado'),
+    
+    # APIs assíncronas (servidas via ASGI)
+    path('api/async/disponibilidade/', views.api_disponibilidade_async, name='api_disponibilidade_async'),
+    path('api/async/voluntarios/disponiveis/', views.api_voluntarios_disponiveis_async, name='api_voluntarios_disponiveis_async'),
+    path('api/async/eventos/<int:evento_id>/estatisticas/', views.api_estatisticas_evento_async, name='api_estatisticas_evento_async'),
 ]
\ No newline at end of file
@@ -1,24 +1,43 @@
 # views.py
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib import messages
 from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
 from django.db import IntegrityError, transaction
-from django.views.decorators.http import require_http_methods
-from django.views.decorators.csrf import csrf_protect
+from django.views.decorators.http import condition, require_http_methods
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.db.models import Count, Q, Prefetch
 from django.core.paginator import Paginator
+from django.urls import reverse
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
 from datetime import datetime, timedelta
+import csv
+import json
 import re
 
-from .models import Voluntario, Evento, Veiculo, VoluntarioEvento, EventoVeiculo
+from . import checkin as checkin_qr
+from .models import Voluntario, Evento, Veiculo, VoluntarioEvento, EventoVeiculo, intervalo_evento
+from .auditoria import JANELA_PAINEL, conflitos_proximos, conflitos_reagendamento, descrever
+from .estatisticas import AGRUPAMENTOS, aestatisticas_eventos, estatisticas_eventos, resumo_horas
+from .frota import HORAS_DISPONIVEIS_SEMANA, MAX_SEMANAS, eventos_sem_veiculo, relatorio_frota
+from .ical import conteudo_feed, etag_feed
+from .idempotencia import idempotente
+from .recorrencia import (
+    FREQUENCIAS, MAX_OCORRENCIAS, conflitos_serie, criar_serie, gerar_datas, modelo_escala
+)
+from .signals import publicar_em_lote
+from .tarefas import enfileirar
+from .tempo_real import get_broker
 
 
 # ==================== VIEWS DE VOLUNTÁRIOS  ====================
 
 @csrf_protect
 @require_http_methods(["GET", "POST"])
+@idempotente
 def cadastro_voluntario(request):
     """View para inscrição de voluntários"""
     if request.method == "POST":
@@ -116,12 +135,8 @@ def cadastro_voluntario(request):
                 "sua candidatura foi registrada e será analisada pela equipe organizadora."
             )
             
-            # Renderizar com contexto limpo ao invés de redirecionar
-            return render(request, 'cadastro_voluntario.html', {
-                'agencias': Voluntario.AGENCIAS_CHOICES,
-                'tamanhos_camiseta': Voluntario.TAMANHOS_CAMISETA,
-                'scroll_to_messages': True,
-            })
+            # Redireciona para o formulário limpo: o reenvio da mesma inscrição recebe este redirect guardado
+            return redirect('vmm:cadastro_voluntario')
 
         except IntegrityError as e:
             error_message = str(e).lower()
@@ -157,6 +172,7 @@ def cadastro_voluntario(request):
     return render(request, 'cadastro_voluntario.html', {
         'agencias': Voluntario.AGENCIAS_CHOICES,
         'tamanhos_camiseta': Voluntario.TAMANHOS_CAMISETA,
+        'scroll_to_messages': bool(messages.get_messages(request)),
     })
 
 
@@ -265,7 +281,7 @@ def lista_voluntarios(request):
     if mostrar_inativos:
         todos_voluntarios = Voluntario.objects.all()
     else:
-        todos_voluntarios = Voluntario.objects.filter(ativo=True)
+        todos_voluntarios = Voluntario.ativos.all()
     
     voluntarios = todos_voluntarios.order_by('-data_cadastro')
     
@@ -293,7 +309,7 @@ def lista_voluntarios(request):
     voluntarios_page = paginator.get_page(page_number)
     
     # Estatísticas (apenas ativos)
-    voluntarios_ativos = Voluntario.objects.filter(ativo=True)
+    voluntarios_ativos = Voluntario.ativos.all()
     
     voluntarios_por_agencia = (
         voluntarios_ativos.values('agencia')
@@ -341,7 +357,7 @@ def lista_voluntarios(request):
         'agencias_stats': agencias_stats,
         'camisetas_stats': camisetas_stats,
         'total_voluntarios': voluntarios_ativos.count(),
-        'total_inativos': Voluntario.objects.filter(ativo=False).count(),
+        'total_inativos': Voluntario.objects.inativos().count(),
         'cadastros_recentes': voluntarios_ativos.filter(
             data_cadastro__gte=timezone.now() - timedelta(days=7)
         ).count(),
@@ -361,11 +377,10 @@ def excluir_voluntario(request, voluntario_id):
     nome = voluntario.nome_completo
     
     # Verificar se voluntário está em eventos futuros ativos
-    eventos_futuros = VoluntarioEvento.objects.filter(
+    eventos_futuros = VoluntarioEvento.ativos.filter(
         voluntario=voluntario,
         evento__data_evento__gte=timezone.now().date(),
-        evento__ativo=True,
-        ativo=True
+        evento__ativo=True
     )
     
     if eventos_futuros.exists():
@@ -402,9 +417,12 @@ def reativar_voluntario(request, voluntario_id):
 
 @csrf_protect
 @require_http_methods(["POST"])
+@idempotente
 def editar_voluntario_evento(request, voluntario_evento_id):
     """Editar função e veículo do voluntário no evento"""
     vol_evento = get_object_or_404(VoluntarioEvento, id=voluntario_evento_id)
+    evento_id = vol_evento.evento_id
+    veiculo_anterior = vol_evento.evento_veiculo_id
     
     try:
         funcao = request.POST.get('funcao')
@@ -413,41 +431,40 @@ def editar_voluntario_evento(request, voluntario_evento_id):
         
         if not funcao:
             messages.error(request, 'Função é obrigatória.')
-            return redirect('vmm:detalhe_evento', evento_id=vol_evento.evento.id)
+            return _responder_detalhe(request, evento_id)
         
         vol_evento.funcao = funcao
         vol_evento.funcao_customizada = funcao_customizada if funcao == 'outro' else ''
         
         # Atualizar veículo
         if evento_veiculo_id:
-            evento_veiculo = get_object_or_404(EventoVeiculo, id=evento_veiculo_id, evento=vol_evento.evento)
-            
-            # Verificar capacidade
-            ocupacao_atual = VoluntarioEvento.objects.filter(
-                evento=vol_evento.evento,
-                evento_veiculo=evento_veiculo
-            ).exclude(pk=vol_evento.pk).count()
-            
-            if ocupacao_atual >= evento_veiculo.veiculo.capacidade:
-                messages.error(
-                    request, 
-                    f'O veículo {evento_veiculo.veiculo.nome} já está na capacidade máxima.'
-                )
-                return redirect('vmm:detalhe_evento', evento_id=vol_evento.evento.id)
-            
+            evento_veiculo = get_object_or_404(EventoVeiculo.ativos, id=evento_veiculo_id, evento=vol_evento.evento)
             vol_evento.vai_no_veiculo = True
             vol_evento.evento_veiculo = evento_veiculo
         else:
             vol_evento.vai_no_veiculo = False
             vol_evento.evento_veiculo = None
         
-        vol_evento.save()
+        # A capacidade do novo veículo é conferida com a linha dele travada
+        vol_evento.alocar()
         messages.success(request, f'Dados de {vol_evento.voluntario.nome_completo} atualizados!')
         
+    except ValidationError as e:
+        for error in e.messages:
+            messages.error(request, error)
+        return _responder_detalhe(request, evento_id)
     except Exception as e:
         messages.error(request, f'Erro ao atualizar: {str(e)}')
-    
-    return redirect('vmm:detalhe_evento', evento_id=vol_evento.evento.id)
+        return _responder_detalhe(request, evento_id)
+    
+    # A linha do voluntário muda sempre; os cartões e a ocupação só se trocou de veículo
+    veiculos = {veiculo_anterior, vol_evento.evento_veiculo_id} - {None}
+    return _responder_detalhe(
+        request, evento_id,
+        fragmentos=FRAGMENTOS_OCUPACAO if veiculo_anterior != vol_evento.evento_veiculo_id else (),
+        voluntarios=[vol_evento.id],
+        veiculos=veiculos,
+    )
 
 
 # ==================== VIEWS DE VEÍCULOS ====================
@@ -459,7 +476,7 @@ def lista_veiculos(request):
     if mostrar_inativos:
         veiculos = Veiculo.objects.all()
     else:
-        veiculos = Veiculo.objects.filter(ativo=True)
+        veiculos = Veiculo.ativos.all()
     
     veiculos = veiculos.order_by('nome')
     
@@ -486,7 +503,7 @@ def lista_veiculos(request):
     veiculos_page = paginator.get_page(page_number)
     
     # Estatísticas (apenas ativos)
-    veiculos_ativos = Veiculo.objects.filter(ativo=True)
+    veiculos_ativos = Veiculo.ativos.all()
     
     context = {
         'veiculos': veiculos_page,
@@ -497,7 +514,7 @@ def lista_veiculos(request):
         'busca': busca,
         'mostrar_inativos': mostrar_inativos,
         'total_veiculos': veiculos_ativos.count(),
-        'total_inativos': Veiculo.objects.filter(ativo=False).count(),
+        'total_inativos': Veiculo.objects.inativos().count(),
         'disponiveis': veiculos_ativos.filter(status='disponivel').count(),
         'em_manutencao': veiculos_ativos.filter(status='manutencao').count(),
         'has_filters': bool(status_filtro or tipo_filtro or busca),
@@ -515,11 +532,10 @@ def excluir_veiculo(request, veiculo_id):
     
     # Verificar se há eventos futuros com este veículo
     hoje = timezone.now().date()
-    eventos_futuros = EventoVeiculo.objects.filter(
+    eventos_futuros = EventoVeiculo.ativos.filter(
         veiculo=veiculo,
         evento__data_evento__gte=hoje,
-        evento__ativo=True,
-        ativo=True
+        evento__ativo=True
     ).exists()
     
     if eventos_futuros:
@@ -553,6 +569,7 @@ def reativar_veiculo(request, veiculo_id):
 
 @csrf_protect
 @require_http_methods(["GET", "POST"])
+@idempotente
 def cadastro_veiculo(request):
     """Cadastrar novo veículo"""
     if request.method == "POST":
@@ -632,6 +649,7 @@ def cadastro_veiculo(request):
 def editar_veiculo(request, veiculo_id):
     """Editar veículo existente"""
     veiculo = get_object_or_404(Veiculo, id=veiculo_id)
+    status_anterior = veiculo.status
     
     if request.method == "POST":
         try:
@@ -668,6 +686,16 @@ def editar_veiculo(request, veiculo_id):
             
             veiculo.save()
             messages.success(request, f'Veículo {veiculo.nome} atualizado com sucesso!')
+            
+            # Eventos futuros que perdem o veículo ao sair de operação
+            if status_anterior == 'disponivel' and veiculo.status != 'disponivel':
+                afetados = eventos_sem_veiculo([veiculo.id]).count()
+                if afetados:
+                    messages.warning(
+                        request,
+                        f'{veiculo.nome} está alocado em {afetados} evento(s) futuro(s). '
+                        'Substitua o veículo nesses eventos (veja o relatório da frota).'
+                    )
             return redirect('vmm:lista_veiculos')
             
         except IntegrityError:
@@ -684,6 +712,7 @@ def editar_veiculo(request, veiculo_id):
 
 @csrf_protect
 @require_http_methods(["POST"])
+@idempotente
 def adicionar_veiculo_evento(request, evento_id):
     """Adicionar veículo a um evento"""
     evento = get_object_or_404(Evento, id=evento_id)
@@ -696,24 +725,23 @@ def adicionar_veiculo_evento(request, evento_id):
             
             if not veiculo_id:
                 messages.error(request, 'Veículo é obrigatório.')
-                return redirect('vmm:detalhe_evento', evento_id=evento.id)
+                return _responder_detalhe(request, evento.id)
             
-            veiculo = get_object_or_404(Veiculo, id=veiculo_id, ativo=True)
+            # Trava o veículo até o commit: outra alocação dele no mesmo horário espera esta
+            veiculo = get_object_or_404(Veiculo.ativos.select_for_update(), id=veiculo_id)
             
             if EventoVeiculo.objects.filter(evento=evento, veiculo=veiculo).exists():
                 messages.warning(request, f'{veiculo.nome} já está neste evento.')
-                return redirect('vmm:detalhe_evento', evento_id=evento.id)
+                return _responder_detalhe(request, evento.id)
             
-            conflito = EventoVeiculo.objects.filter(
+            conflito = EventoVeiculo.ativos.filter(
                 veiculo=veiculo,
-                evento__data_evento=evento.data_evento,
-                evento__hora_inicio__lt=evento.hora_fim,
-                evento__hora_fim__gt=evento.hora_inicio
-            ).exclude(evento=evento)
+                evento__ativo=True
+            ).sobrepostos(evento.inicio, evento.fim).exclude(evento=evento)
             
             if conflito.exists():
                 messages.error(request, f'O veículo {veiculo.nome} já está alocado em outro evento neste horário.')
-                return redirect('vmm:detalhe_evento', evento_id=evento.id)
+                return _responder_detalhe(request, evento.id)
             
             motorista = None
             if motorista_id:
@@ -725,7 +753,7 @@ def adicionar_veiculo_evento(request, evento_id):
                 
                 if not vol_evento:
                     messages.error(request, 'O motorista deve ser um voluntário alocado neste evento.')
-                    return redirect('vmm:detalhe_evento', evento_id=evento.id)
+                    return _responder_detalhe(request, evento.id)
             
             evento_veiculo = EventoVeiculo.objects.create(
                 evento=evento,
@@ -744,11 +772,18 @@ def adicionar_veiculo_evento(request, evento_id):
         
     except Exception as e:
         messages.error(request, f'Erro ao adicionar veículo: {str(e)}')
+        return _responder_detalhe(request, evento.id)
     
-    return redirect('vmm:detalhe_evento', evento_id=evento.id)
+    # O motorista passa a aparecer como passageiro: sua linha muda junto
+    return _responder_detalhe(
+        request, evento.id,
+        fragmentos=FRAGMENTOS_VEICULOS,
+        voluntarios=[vol_evento.id] if motorista else (),
+    )
 
 @csrf_protect
 @require_http_methods(["POST"])
+@idempotente
 def remover_veiculo_evento(request, evento_veiculo_id):
     """Soft delete - remover veículo de um evento"""
     evento_veiculo = get_object_or_404(EventoVeiculo, id=evento_veiculo_id)
@@ -756,11 +791,11 @@ def remover_veiculo_evento(request, evento_veiculo_id):
     nome_veiculo = evento_veiculo.veiculo.nome
     
     # Verificar se há voluntários alocados neste veículo
-    voluntarios_no_veiculo = VoluntarioEvento.objects.filter(
+    passageiros = list(VoluntarioEvento.ativos.filter(
         evento=evento_veiculo.evento,
-        evento_veiculo=evento_veiculo,
-        ativo=True
-    ).count()
+        evento_veiculo=evento_veiculo
+    ).values_list('id', flat=True))
+    voluntarios_no_veiculo = len(passageiros)
     
     if voluntarios_no_veiculo > 0:
         messages.warning(
@@ -769,17 +804,94 @@ def remover_veiculo_evento(request, evento_veiculo_id):
             'Eles foram desvinculados do veículo.'
         )
         # Desvincular voluntários
-        VoluntarioEvento.objects.filter(
+        VoluntarioEvento.ativos.filter(
             evento=evento_veiculo.evento,
-            evento_veiculo=evento_veiculo,
-            ativo=True
+            evento_veiculo=evento_veiculo
         ).update(evento_veiculo=None, vai_no_veiculo=False)
+        publicar_em_lote(VoluntarioEvento, passageiros)
     
     # Soft delete usando o método customizado do model
     evento_veiculo.delete()
     
     messages.success(request, f'Veículo {nome_veiculo} removido do evento.')
-    return redirect('vmm:detalhe_evento', evento_id=evento_id)
+    return _responder_detalhe(request, evento_id, fragmentos=FRAGMENTOS_VEICULOS, voluntarios=passageiros)
+
+
+def _semanas_relatorio(params):
+    """Lê semanas_passadas e semanas_futuras da query string (ValueError se inválidos)"""
+    return int(params.get('semanas_passadas', 4)), int(params.get('semanas_futuras', 8))
+
+
+def relatorio_veiculos(request):
+    """Utilização da frota, previsão de demanda de assentos e eventos sem veículo"""
+    try:
+        semanas_passadas, semanas_futuras = _semanas_relatorio(request.GET)
+        relatorio = relatorio_frota(semanas_passadas, semanas_futuras)
+    except ValueError:
+        messages.error(request, f'Informe entre 1 e {MAX_SEMANAS} semanas.')
+        semanas_passadas, semanas_futuras = 4, 8
+        relatorio = relatorio_frota(semanas_passadas, semanas_futuras)
+    
+    context = {
+        **relatorio,
+        'semanas_passadas': semanas_passadas,
+        'semanas_futuras': semanas_futuras,
+        'max_semanas': MAX_SEMANAS,
+        'horas_semana': HORAS_DISPONIVEIS_SEMANA,
+    }
+    return render(request, 'relatorio_frota.html', context)
+
+
+def exportar_relatorio_veiculos(request):
+    """CSV (separado por ';') com a utilização por veículo e a previsão semanal"""
+    try:
+        relatorio = relatorio_frota(*_semanas_relatorio(request.GET))
+    except ValueError:
+        return JsonResponse({'erro': f'Informe entre 1 e {MAX_SEMANAS} semanas.'}, status=400)
+    
+    response = HttpResponse(content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = (
+        f'attachment; filename="relatorio_frota_{timezone.localdate():%Y%m%d}.csv"'
+    )
+    escritor = csv.writer(response, delimiter=';')
+    
+    escritor.writerow([
+        f'Utilização de {relatorio["periodo_inicio"]:%d/%m/%Y} a {relatorio["periodo_fim"]:%d/%m/%Y}'
+    ])
+    escritor.writerow([
+        'Veículo', 'Placa', 'Status', 'Capacidade', 'Eventos', 'Passageiros',
+        'Horas reservadas', 'Horas disponíveis', 'Utilização (%)',
+        'Eventos previstos', 'Horas previstas',
+    ])
+    for linha in relatorio['utilizacao']:
+        veiculo = linha['veiculo']
+        escritor.writerow([
+            veiculo.nome, veiculo.placa, veiculo.get_status_display(), veiculo.capacidade,
+            linha['eventos'], linha['passageiros'], linha['horas_reservadas'],
+            linha['horas_disponiveis'], linha['taxa_utilizacao'],
+            linha['eventos_previstos'], linha['horas_previstas'],
+        ])
+    
+    escritor.writerow([])
+    escritor.writerow(['Semana', 'Demanda (passageiros)', 'Oferta (assentos)', 'Déficit'])
+    for semana in relatorio['previsao']:
+        escritor.writerow([
+            f'{semana["semana"]:%d/%m/%Y} a {semana["fim_semana"]:%d/%m/%Y}',
+            semana['demanda'], semana['oferta'], semana['deficit'],
+        ])
+    
+    escritor.writerow([])
+    escritor.writerow(['Eventos com veículo fora de operação', 'Data', 'Horário', 'Veículo', 'Status do veículo'])
+    for ev in relatorio['sem_veiculo']:
+        escritor.writerow([
+            ev.evento.nome_escola,
+            f'{ev.evento.data_evento:%d/%m/%Y}',
+            f'{ev.evento.hora_inicio:%H:%M}-{ev.evento.hora_fim:%H:%M}',
+            ev.veiculo.nome,
+            ev.veiculo.get_status_display(),
+        ])
+    
+    return response
 
 
 
@@ -792,18 +904,9 @@ def lista_eventos(request):
     if mostrar_inativos:
         eventos = Evento.objects.all()
     else:
-        eventos = Evento.objects.filter(ativo=True)
+        eventos = Evento.ativos.all()
     
-    eventos = eventos.prefetch_related(
-        Prefetch(
-            'voluntarioevento_set',
-            queryset=VoluntarioEvento.objects.filter(ativo=True).select_related('voluntario')
-        ),
-        Prefetch(
-            'eventoveiculo_set',
-            queryset=EventoVeiculo.objects.filter(ativo=True).select_related('veiculo')
-        )
-    ).order_by('-data_evento', '-hora_inicio')
+    eventos = eventos.with_counts().order_by('-data_evento', '-hora_inicio')
     
     # Filtros
     status_filtro = request.GET.get('status')
@@ -845,7 +948,7 @@ def lista_eventos(request):
     eventos_page = paginator.get_page(page_number)
     
     # Estatísticas (apenas ativos)
-    eventos_ativos = Evento.objects.filter(ativo=True)
+    eventos_ativos = Evento.ativos.all()
     total_eventos = eventos_ativos.count()
     eventos_futuros = eventos_ativos.filter(data_evento__gte=timezone.now().date()).count()
     eventos_mes = eventos_ativos.filter(
@@ -867,7 +970,7 @@ def lista_eventos(request):
         'cidades': cidades,
         'mostrar_inativos': mostrar_inativos,
         'total_eventos': total_eventos,
-        'total_inativos': Evento.objects.filter(ativo=False).count(),
+        'total_inativos': Evento.objects.inativos().count(),
         'eventos_futuros': eventos_futuros,
         'eventos_mes': eventos_mes,
         'has_filters': bool(status_filtro or cidade_filtro or data_inicio or data_fim or busca),
@@ -878,6 +981,7 @@ def lista_eventos(request):
 
 @csrf_protect
 @require_http_methods(["GET", "POST"])
+@idempotente
 def cadastro_evento(request):
     """Cadastrar novo evento"""
     if request.method == "POST":
@@ -937,9 +1041,23 @@ def cadastro_evento(request):
                     hora_fim = None
                 
                 # Validar horários
+                # Término antes do início: o evento passa da meia-noite
                 if hora_inicio and hora_fim:
-                    if hora_inicio >= hora_fim:
-                        errors.append("A hora de término deve ser posterior à hora de início.")
+                    if hora_inicio == hora_fim:
+                        errors.append("A hora de término deve ser diferente da hora de início.")
+                
+                # Repetição opcional (série semanal, quinzenal ou mensal)
+                frequencia = request.POST.get('frequencia', 'unica')
+                datas_serie = []
+                if data_evento:
+                    try:
+                        ocorrencias = int(request.POST.get('ocorrencias') or 1)
+                    except ValueError:
+                        ocorrencias = 0
+                    try:
+                        datas_serie = gerar_datas(data_evento, frequencia, ocorrencias)
+                    except ValueError as e:
+                        errors.append(str(e))
                 
                 # Validar quantidades
                 try:
@@ -961,8 +1079,10 @@ def cadastro_evento(request):
                         messages.error(request, error)
                     return render(request, 'evento_cadastro.html', {
                         'form_data': request.POST,
-                        'veiculos': Veiculo.objects.filter(status='disponivel', ativo=True),
+                        'veiculos': Veiculo.ativos.filter(status='disponivel'),
                         'status_choices': Evento.STATUS_EVENTO,
+                        'frequencias': FREQUENCIAS,
+                        'max_ocorrencias': MAX_OCORRENCIAS,
                     })
                 
                 # Criar evento
@@ -982,7 +1102,16 @@ def cadastro_evento(request):
                     criado_por=request.user.username if request.user.is_authenticated else 'Sistema'
                 )
                 
-                messages.success(request, f'Evento "{evento.nome_escola}" cadastrado com sucesso!')
+                # Demais ocorrências da série em um único INSERT
+                repeticoes = criar_serie(
+                    evento, datas_serie[1:], criado_por=evento.criado_por, status=evento.status
+                )
+                
+                messages.success(
+                    request,
+                    f'Evento "{evento.nome_escola}" cadastrado com sucesso!'
+                    + (f' {len(repeticoes)} repetição(ões) criada(s).' if repeticoes else '')
+                )
                 return redirect('vmm:detalhe_evento', evento_id=evento.id)
                 
         except Exception as e:
@@ -990,81 +1119,169 @@ def cadastro_evento(request):
             return render(request, 'evento_cadastro.html', {
                 'form_data': request.POST,
                 'status_choices': Evento.STATUS_EVENTO,
+                'frequencias': FREQUENCIAS,
+                'max_ocorrencias': MAX_OCORRENCIAS,
             })
     
     return render(request, 'evento_cadastro.html', {
-        'veiculos': Veiculo.objects.filter(status='disponivel', ativo=True),
+        'veiculos': Veiculo.ativos.filter(status='disponivel'),
         'status_choices': Evento.STATUS_EVENTO,
+        'frequencias': FREQUENCIAS,
+        'max_ocorrencias': MAX_OCORRENCIAS,
     })
 
 
-def detalhe_evento(request, evento_id):
-    """Visualizar detalhes completos do evento"""
+def _veiculos_livres(evento):
+    """Veículos disponíveis que não estão no evento nem em outro no mesmo horário, em uma consulta"""
+    ocupados = _conflitos_veiculo(evento.data_evento, evento.hora_inicio, evento.hora_fim, evento.id)
+    return Veiculo.ativos.filter(status='disponivel').exclude(
+        id__in=EventoVeiculo.ativos.filter(evento=evento).values('veiculo_id')
+    ).exclude(
+        id__in=ocupados.values('veiculo_id')
+    )
+
+
+def _contexto_detalhe(evento_id):
+    """Contexto da página do evento, compartilhado pela página inteira e pelos fragmentos"""
     evento = get_object_or_404(
         Evento.objects.prefetch_related(
             Prefetch(
                 'voluntarioevento_set',
-                queryset=VoluntarioEvento.objects.select_related(
+                queryset=VoluntarioEvento.ativos.select_related(
                     'voluntario', 
                     'evento_veiculo__veiculo'
                 ).order_by('funcao')
             ),
             Prefetch(
                 'eventoveiculo_set',
-                queryset=EventoVeiculo.objects.select_related('veiculo', 'motorista')
+                # "passageiros" alimenta EventoVeiculo.voluntarios_count sem uma consulta por cartão
+                queryset=EventoVeiculo.ativos.select_related('veiculo', 'motorista').annotate(
+                    passageiros=Count('voluntarioevento', filter=Q(voluntarioevento__ativo=True))
+                )
             )
         ),
         id=evento_id
     )
     
     # Voluntários do evento
+    # (os candidatos a adicionar são buscados pelo modal em api_candidatos_evento)
     voluntarios_evento = evento.voluntarioevento_set.all()
     
-    # Voluntários disponíveis (não alocados neste horário)
-    voluntarios_disponiveis = Voluntario.objects.filter(
-        status='ativo'
-    ).exclude(
-        id__in=voluntarios_evento.values_list('voluntario_id', flat=True)
-    )
-    
-    # Filtrar disponíveis no horário
-    voluntarios_disponiveis_filtrados = []
-    for vol in voluntarios_disponiveis:
-        if vol.verificar_disponibilidade(evento.data_evento, evento.hora_inicio, evento.hora_fim):
-            voluntarios_disponiveis_filtrados.append(vol)
-    
-    # Veículos disponíveis (não alocados neste evento e horário)
-    veiculos_disponiveis = Veiculo.objects.filter(
-        status='disponivel',
-        ativo=True
-    ).exclude(
-        id__in=evento.eventoveiculo_set.values_list('veiculo_id', flat=True)
-    )
-    
-    # Filtrar disponíveis no horário
-    veiculos_disponiveis_filtrados = []
-    for veiculo in veiculos_disponiveis:
-        if veiculo.verificar_disponibilidade(evento.data_evento, evento.hora_inicio, evento.hora_fim):
-            veiculos_disponiveis_filtrados.append(veiculo)
-    
     # Estatísticas
-    total_voluntarios = voluntarios_evento.count()
-    confirmados = voluntarios_evento.filter(presenca='confirmado').count()
-    presentes = voluntarios_evento.filter(presenca='presente').count()
+    # Calculadas sobre a lista já carregada (apenas vínculos ativos)
+    total_voluntarios = len(voluntarios_evento)
+    confirmados = sum(1 for ve in voluntarios_evento if ve.presenca == 'confirmado')
+    presentes = sum(1 for ve in voluntarios_evento if ve.presenca == 'presente')
     
-    context = {
+    return {
         'evento': evento,
         'voluntarios_evento': voluntarios_evento,
-        'voluntarios_disponiveis': voluntarios_disponiveis_filtrados,
-        'veiculos_disponiveis': veiculos_disponiveis_filtrados,
+        # Consulta preguiçosa: só roda quando o modal de veículo é renderizado
+        'veiculos_disponiveis': _veiculos_livres(evento),
         'funcoes': VoluntarioEvento.FUNCOES,
         'total_voluntarios': total_voluntarios,
         'confirmados': confirmados,
         'presentes': presentes,
         'pode_editar': evento.status in ['planejamento', 'confirmado'],
     }
+
+
+def detalhe_evento(request, evento_id):
+    """Visualizar detalhes completos do evento"""
+    contexto = _contexto_detalhe(evento_id)
+    contexto['feed_ao_vivo'] = _feed_ao_vivo(request)
+    return render(request, 'evento_detalhe.html', contexto)
+
+
+# Trechos de evento_detalhe.html que podem ser renderizados sozinhos, pelo id do elemento
+FRAGMENTOS_DETALHE = {
+    'secao-veiculos': ('partials/evento_veiculos.html', {}),
+    'secao-voluntarios': ('partials/evento_voluntarios.html', {}),
+    'secao-estatisticas': ('partials/evento_estatisticas.html', {}),
+    'opcoes-veiculo-adicionar': ('partials/evento_opcoes_veiculo.html', {'modo': 'adicionar'}),
+    'opcoes-veiculo-editar': ('partials/evento_opcoes_veiculo.html', {'modo': 'editar'}),
+    'opcoes-novo-veiculo': ('partials/evento_opcoes_novo_veiculo.html', {}),
+}
+
+# Afetados quando muda a lista de veículos, a de voluntários ou só a ocupação dos veículos
+FRAGMENTOS_VEICULOS = (
+    'secao-veiculos', 'opcoes-veiculo-adicionar', 'opcoes-veiculo-editar', 'opcoes-novo-veiculo',
+)
+FRAGMENTOS_VOLUNTARIOS = ('secao-voluntarios', 'secao-estatisticas', 'opcoes-novo-veiculo')
+FRAGMENTOS_OCUPACAO = ('opcoes-veiculo-adicionar', 'opcoes-veiculo-editar')
+
+
+def _pedido_fetch(request):
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+
+def _responder_detalhe(request, evento_id, fragmentos=(), voluntarios=(), veiculos=()):
+    """
+    Resposta das alterações feitas na página do evento. Um POST comum volta
+    para detalhe_evento; um pedido via fetch recebe só o HTML que mudou:
+    os fragmentos pedidos, as linhas dos voluntários e os cartões dos
+    veículos informados (por id) e as mensagens. Linhas e cartões que
+    deixaram de existir são listados em "remover".
+    """
+    if not _pedido_fetch(request):
+        return redirect('vmm:detalhe_evento', evento_id=evento_id)
+    
+    contexto = _contexto_detalhe(evento_id) if (fragmentos or voluntarios or veiculos) else {}
+    html = {}
+    remover = []
+    
+    for fragmento in dict.fromkeys(fragmentos):
+        template, extra = FRAGMENTOS_DETALHE[fragmento]
+        html[fragmento] = render_to_string(template, {**contexto, **extra}, request=request)
+    
+    if voluntarios:
+        linhas = {ve.id: ve for ve in contexto['voluntarios_evento']}
+        for vol_evento_id in dict.fromkeys(voluntarios):
+            elemento = f'voluntario-{vol_evento_id}'
+            if vol_evento_id in linhas:
+                html[elemento] = render_to_string(
+                    'partials/evento_voluntario_item.html',
+                    {**contexto, 'vol_evento': linhas[vol_evento_id]},
+                    request=request,
+                )
+            else:
+                remover.append(elemento)
+    
+    if veiculos:
+        cartoes = {ev.id: ev for ev in contexto['evento'].eventoveiculo_set.all()}
+        for evento_veiculo_id in dict.fromkeys(veiculos):
+            elemento = f'veiculo-card-{evento_veiculo_id}'
+            if evento_veiculo_id in cartoes:
+                html[elemento] = render_to_string(
+                    'partials/evento_veiculo_card.html',
+                    {**contexto, 'evento_veiculo': cartoes[evento_veiculo_id]},
+                    request=request,
+                )
+            else:
+                remover.append(elemento)
     
-    return render(request, 'evento_detalhe.html', context)
+    # Renderizado por último: consome as mensagens da sessão
+    html['mensagens-evento'] = render_to_string('partials/evento_mensagens.html', request=request)
+    return JsonResponse({'fragmentos': html, 'remover': remover})
+
+
+def _horario_evento(evento):
+    """Data e horário formatados, usados para detectar e anunciar reagendamentos"""
+    return {
+        'data_evento': evento.data_evento.strftime('%d/%m/%Y'),
+        'hora_inicio': evento.hora_inicio.strftime('%H:%M'),
+        'hora_fim': evento.hora_fim.strftime('%H:%M'),
+    }
+
+
+def _enfileirar_cancelamento(evento):
+    """Enfileira o aviso de cancelamento aos voluntários do evento; retorna quantos serão avisados"""
+    voluntarios_count = evento.voluntarioevento_set.ativos().count()
+    if voluntarios_count > 0:
+        # Envio de emails fica com o worker (manage.py processar_tarefas)
+        enfileirar('notificar_evento', tipo='cancelamento', evento_id=evento.id)
+    return voluntarios_count
+
 
 @csrf_protect
 def editar_evento(request, evento_id):
@@ -1072,6 +1289,9 @@ def editar_evento(request, evento_id):
     evento = get_object_or_404(Evento, id=evento_id)
     
     if request.method == "POST":
+        # Horário e status originais, para avisar os voluntários em caso de reagendamento ou cancelamento
+        anterior = _horario_evento(evento)
+        status_anterior = evento.status
         try:
             with transaction.atomic():
                 evento.nome_escola = request.POST.get('nome_escola', '').strip()
@@ -1108,16 +1328,42 @@ def editar_evento(request, evento_id):
                 except ValueError:
                     errors.append("Hora de término inválida.")
                 
+                # Horário novo: verifica a escala inteira do evento antes de salvar
+                if not errors and evento.status != 'cancelado' and anterior != _horario_evento(evento):
+                    if evento.hora_inicio == evento.hora_fim:
+                        errors.append("A hora de término deve ser diferente da hora de início.")
+                    else:
+                        for conflito in conflitos_reagendamento(
+                            evento, evento.data_evento, evento.hora_inicio, evento.hora_fim
+                        ):
+                            errors.append(f'Conflito no novo horário: {descrever(conflito)}')
+                
                 if errors:
                     for error in errors:
                         messages.error(request, error)
                     return render(request, 'evento_editar.html', {
                         'evento': evento,
-                        'veiculos': Veiculo.objects.filter(status='disponivel', ativo=True),
+                        'data_evento_formatted': data_evento_str,
+                        'hora_inicio_formatted': hora_inicio_str,
+                        'hora_fim_formatted': hora_fim_str,
+                        'veiculos': Veiculo.ativos.filter(status='disponivel'),
                         'status_choices': Evento.STATUS_EVENTO,
                     })
                 
                 evento.save()
+
+                if evento.status == 'cancelado' and status_anterior != 'cancelado':
+                    voluntarios_count = _enfileirar_cancelamento(evento)
+                    if voluntarios_count > 0:
+                        messages.warning(
+                            request,
+                            f'Evento cancelado. {voluntarios_count} voluntário(s) serão notificados.'
+                        )
+                        return redirect('vmm:detalhe_evento', evento_id=evento.id)
+                elif anterior != _horario_evento(evento) and evento.voluntarioevento_set.ativos().exists():
+                    enfileirar('notificar_evento', tipo='reagendamento',
+                               evento_id=evento.id, anterior=anterior)
+
                 messages.success(request, f'Evento "{evento.nome_escola}" atualizado com sucesso!')
                 return redirect('vmm:detalhe_evento', evento_id=evento.id)
                 
@@ -1149,15 +1395,16 @@ def excluir_evento(request, evento_id):
     # Soft delete usando o método customizado do model
     evento.delete()
     
-    # Inativar relacionamentos em cascata
-    VoluntarioEvento.objects.filter(evento=evento, ativo=True).update(
-        ativo=False,
-        data_inativacao=timezone.now()
-    )
-    EventoVeiculo.objects.filter(evento=evento, ativo=True).update(
-        ativo=False,
-        data_inativacao=timezone.now()
-    )
+    # Inativar relacionamentos em cascata (um UPDATE por tabela)
+    vinculos = list(evento.voluntarioevento_set.ativos().values_list('id', flat=True))
+    veiculos = list(evento.eventoveiculo_set.ativos().values_list('id', flat=True))
+    afetados = evento.voluntarioevento_set.soft_delete()
+    evento.eventoveiculo_set.soft_delete()
+    publicar_em_lote(VoluntarioEvento, vinculos)
+    publicar_em_lote(EventoVeiculo, veiculos)
+    
+    if afetados:
+        enfileirar('notificar_evento', tipo='exclusao', evento_id=evento.id)
     
     messages.success(request, f'Evento "{nome_escola}" foi inativado com sucesso!')
     return redirect('vmm:lista_eventos')
@@ -1178,17 +1425,104 @@ def reativar_evento(request, evento_id):
 
 @csrf_protect
 @require_http_methods(["POST"])
+@idempotente
 def remover_voluntario_evento(request, voluntario_evento_id):
     """Soft delete - inativar voluntário de um evento"""
     vol_evento = get_object_or_404(VoluntarioEvento, id=voluntario_evento_id)
     evento_id = vol_evento.evento.id
     nome_voluntario = vol_evento.voluntario.nome_completo
+    evento_veiculo_id = vol_evento.evento_veiculo_id
     
     # Soft delete usando o método customizado do model
     vol_evento.delete()
     
     messages.success(request, f'{nome_voluntario} removido do evento.')
-    return redirect('vmm:detalhe_evento', evento_id=evento_id)
+    if evento_veiculo_id is None:
+        return _responder_detalhe(request, evento_id, fragmentos=FRAGMENTOS_VOLUNTARIOS)
+    return _responder_detalhe(
+        request, evento_id,
+        fragmentos=FRAGMENTOS_VOLUNTARIOS + FRAGMENTOS_OCUPACAO,
+        veiculos=[evento_veiculo_id],
+    )
+
+@csrf_protect
+@require_http_methods(["GET", "POST"])
+@idempotente
+def repetir_evento(request, evento_id):
+    """Duplicar o evento ou criar uma série recorrente a partir dele"""
+    evento = get_object_or_404(Evento.ativos, id=evento_id)
+    veiculos, voluntarios = modelo_escala(evento, copiar_veiculos=True, copiar_voluntarios=True)
+    
+    form_data = {
+        'frequencia': 'semanal',
+        'data_inicio': (evento.data_evento + timedelta(weeks=1)).strftime('%Y-%m-%d'),
+        'ocorrencias': 4,
+        'copiar_veiculos': True,
+        'copiar_voluntarios': False,
+        'pular_conflitos': False,
+    }
+    conflitos = {}
+    
+    if request.method == "POST":
+        form_data = {
+            'frequencia': request.POST.get('frequencia', 'unica'),
+            'data_inicio': request.POST.get('data_inicio', ''),
+            'ocorrencias': request.POST.get('ocorrencias', '1'),
+            'copiar_veiculos': 'copiar_veiculos' in request.POST,
+            'copiar_voluntarios': 'copiar_voluntarios' in request.POST,
+            'pular_conflitos': 'pular_conflitos' in request.POST,
+        }
+        
+        datas = None
+        try:
+            data_inicio = datetime.strptime(form_data['data_inicio'], '%Y-%m-%d').date()
+            ocorrencias = int(form_data['ocorrencias'] or 1)
+        except ValueError:
+            messages.error(request, 'Data ou número de ocorrências inválido.')
+        else:
+            try:
+                datas = gerar_datas(data_inicio, form_data['frequencia'], ocorrencias)
+            except ValueError as e:
+                messages.error(request, str(e))
+        
+        if datas:
+            veiculos_copiados = veiculos if form_data['copiar_veiculos'] else []
+            voluntarios_copiados = voluntarios if form_data['copiar_voluntarios'] else []
+            
+            # Conflitos de toda a série antes de criar qualquer evento
+            conflitos = conflitos_serie(
+                datas, evento.hora_inicio, evento.hora_fim,
+                veiculo_ids=[v['veiculo_id'] for v in veiculos_copiados],
+                voluntario_ids=[v['voluntario_id'] for v in voluntarios_copiados],
+            )
+            
+            if conflitos and not form_data['pular_conflitos']:
+                messages.warning(request, 'Nenhum evento foi criado: há datas com conflito.')
+            else:
+                livres = [data for data in datas if data not in conflitos]
+                criados = criar_serie(
+                    evento, livres, veiculos_copiados, voluntarios_copiados,
+                    criado_por=request.user.username if request.user.is_authenticated else 'Sistema'
+                )
+                if criados:
+                    messages.success(
+                        request,
+                        f'{len(criados)} evento(s) criado(s) para "{evento.nome_escola}".'
+                        + (f' {len(conflitos)} data(s) com conflito ignorada(s).' if conflitos else '')
+                    )
+                else:
+                    messages.warning(request, 'Todas as datas têm conflito; nenhum evento foi criado.')
+                return redirect('vmm:lista_eventos')
+    
+    return render(request, 'evento_repetir.html', {
+        'evento': evento,
+        'form_data': form_data,
+        'frequencias': FREQUENCIAS,
+        'max_ocorrencias': MAX_OCORRENCIAS,
+        'conflitos': conflitos,
+        'total_veiculos': len(veiculos),
+        'total_voluntarios': len(voluntarios),
+    })
 
 @csrf_protect
 @require_http_methods(["POST"])
@@ -1203,14 +1537,15 @@ def cancelar_evento(request, evento_id):
         elif evento.status == 'cancelado':
             messages.info(request, 'Este evento já está cancelado.')
         else:
-            evento.status = 'cancelado'
-            evento.save()
+            with transaction.atomic():
+                evento.status = 'cancelado'
+                evento.save()
+                voluntarios_count = _enfileirar_cancelamento(evento)
             
-            voluntarios_count = evento.voluntarioevento_set.count()
             if voluntarios_count > 0:
                 messages.warning(
                     request,
-                    f'Evento cancelado. {voluntarios_count} voluntário(s) foram notificados.'
+                    f'Evento cancelado. {voluntarios_count} voluntário(s) serão notificados.'
                 )
             else:
                 messages.success(request, f'Evento "{nome_escola}" foi cancelado!')
@@ -1224,6 +1559,7 @@ def cancelar_evento(request, evento_id):
 
 @csrf_protect
 @require_http_methods(["POST"])
+@idempotente
 def adicionar_voluntario_evento(request, evento_id):
     """Adicionar voluntário a um evento"""
     evento = get_object_or_404(Evento, id=evento_id)
@@ -1236,35 +1572,21 @@ def adicionar_voluntario_evento(request, evento_id):
         
         if not voluntario_id or not funcao:
             messages.error(request, 'Voluntário e função são obrigatórios.')
-            return redirect('vmm:detalhe_evento', evento_id=evento.id)
+            return _responder_detalhe(request, evento.id)
         
         voluntario = get_object_or_404(Voluntario, id=voluntario_id)
         
         # Verificar se já existe
         if VoluntarioEvento.objects.filter(evento=evento, voluntario=voluntario).exists():
             messages.warning(request, f'{voluntario.nome_completo} já está neste evento.')
-            return redirect('vmm:detalhe_evento', evento_id=evento.id)
+            return _responder_detalhe(request, evento.id)
         
         # Verificar veículo
         evento_veiculo = None
         vai_no_veiculo = False
         if evento_veiculo_id:
-            evento_veiculo = get_object_or_404(EventoVeiculo, id=evento_veiculo_id, evento=evento)
+            evento_veiculo = get_object_or_404(EventoVeiculo.ativos, id=evento_veiculo_id, evento=evento)
             vai_no_veiculo = True
-            
-            # Verificar capacidade
-            ocupacao_atual = VoluntarioEvento.objects.filter(
-                evento=evento,
-                evento_veiculo=evento_veiculo
-            ).count()
-            
-            if ocupacao_atual >= evento_veiculo.veiculo.capacidade:
-                messages.error(
-                    request, 
-                    f'O veículo {evento_veiculo.veiculo.nome} já está na capacidade máxima '
-                    f'({evento_veiculo.veiculo.capacidade} lugares).'
-                )
-                return redirect('vmm:detalhe_evento', evento_id=evento.id)
         
         # Criar vínculo
         vol_evento = VoluntarioEvento(
@@ -1276,32 +1598,40 @@ def adicionar_voluntario_evento(request, evento_id):
             evento_veiculo=evento_veiculo
         )
         
-        # Validar (inclui verificação de conflitos)
-        vol_evento.full_clean()
-        vol_evento.save()
+        # Conflitos de horário e capacidade do veículo são validados com as linhas travadas
+        vol_evento.alocar()
         
         messages.success(request, f'{voluntario.nome_completo} adicionado ao evento!')
         
     except ValidationError as e:
         for error in e.messages:
             messages.error(request, error)
+        return _responder_detalhe(request, evento.id)
     except Exception as e:
         messages.error(request, f'Erro ao adicionar voluntário: {str(e)}')
-    
-    return redirect('vmm:detalhe_evento', evento_id=evento.id)
+        return _responder_detalhe(request, evento.id)
+    
+    if evento_veiculo is None:
+        return _responder_detalhe(request, evento.id, fragmentos=FRAGMENTOS_VOLUNTARIOS)
+    return _responder_detalhe(
+        request, evento.id,
+        fragmentos=FRAGMENTOS_VOLUNTARIOS + FRAGMENTOS_OCUPACAO,
+        veiculos=[evento_veiculo.id],
+    )
 
 @csrf_protect
 @require_http_methods(["POST"])
 def atualizar_presenca_voluntario(request, voluntario_evento_id):
     """Atualizar presença do voluntário no evento"""
     vol_evento = get_object_or_404(VoluntarioEvento, id=voluntario_evento_id)
+    evento_id = vol_evento.evento_id
     
     try:
         nova_presenca = request.POST.get('presenca')
         
         if nova_presenca not in [p[0] for p in VoluntarioEvento.STATUS_PRESENCA]:
             messages.error(request, 'Status de presença inválido.')
-            return redirect('vmm:detalhe_evento', evento_id=vol_evento.evento.id)
+            return _responder_detalhe(request, evento_id)
         
         vol_evento.presenca = nova_presenca
         vol_evento.save()
@@ -1313,8 +1643,65 @@ def atualizar_presenca_voluntario(request, voluntario_evento_id):
         )
     except Exception as e:
         messages.error(request, 'Erro ao atualizar presença.')
+        return _responder_detalhe(request, evento_id)
     
-    return redirect('vmm:detalhe_evento', evento_id=vol_evento.evento.id)
+    return _responder_detalhe(
+        request, evento_id, fragmentos=['secao-estatisticas'], voluntarios=[vol_evento.id]
+    )
+
+
+# ==================== CHECK-IN POR QR CODE ====================
+
+RESPOSTAS_CHECKIN = {
+    checkin_qr.PRESENTE: (200, 'Presença registrada.'),
+    checkin_qr.JA_PRESENTE: (200, 'Presença já registrada anteriormente.'),
+    checkin_qr.INEXISTENTE: (404, 'Voluntário não está mais escalado neste evento.'),
+    checkin_qr.FORA_DO_HORARIO: (409, 'Check-in fora do horário do evento.'),
+    checkin_qr.CANCELADO: (409, 'Evento cancelado.'),
+}
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def checkin(request, token):
+    """
+    Leitura do QR code. O GET só mostra a página que confirma via POST (links
+    abertos por pré-visualização não marcam presença); o POST confere a
+    assinatura e marca a presença sem sessão e com um único UPDATE.
+    """
+    if request.method == 'GET':
+        return render(request, 'checkin.html', {'token': token})
+
+    ids = checkin_qr.ler_token(token)
+    if ids is None:
+        return JsonResponse({'erro': 'QR code inválido.'}, status=400)
+
+    resultado = checkin_qr.registrar_checkin(*ids)
+    status, mensagem = RESPOSTAS_CHECKIN[resultado]
+    if status != 200:
+        return JsonResponse({'erro': mensagem, 'resultado': resultado}, status=status)
+    return JsonResponse({'resultado': resultado, 'mensagem': mensagem})
+
+
+def qrcodes_checkin(request, evento_id):
+    """Página para imprimir os QR codes de check-in dos voluntários do evento"""
+    evento = get_object_or_404(Evento, id=evento_id)
+    voluntarios = evento.voluntarioevento_set.ativos().select_related(
+        'voluntario'
+    ).order_by('voluntario__nome_completo')
+
+    cartoes = []
+    for vol_evento in voluntarios:
+        url = request.build_absolute_uri(
+            reverse('vmm:checkin', args=[checkin_qr.gerar_token(vol_evento)])
+        )
+        cartoes.append({'vol_evento': vol_evento, 'url': url, 'qr': checkin_qr.qr_svg(url)})
+
+    return render(request, 'evento_checkin_qrcodes.html', {
+        'evento': evento,
+        'cartoes': cartoes,
+        'qr_disponivel': checkin_qr.segno is not None,
+    })
 
 
 # ==================== VIEWS AUXILIARES E API (continuação) ====================
@@ -1326,11 +1713,10 @@ def calendario_eventos(request):
     ano = int(request.GET.get('ano', timezone.now().year))
     
     # Eventos do mês
-    eventos = Evento.objects.filter(
-        ativo=True,
+    eventos = Evento.ativos.filter(
         data_evento__year=ano,
         data_evento__month=mes
-    ).prefetch_related('voluntarioevento_set')
+    )
     
     context = {
         'eventos': eventos,
@@ -1345,45 +1731,76 @@ def calendario_eventos(request):
     return render(request, 'calendario_eventos.html', context)
 
 
+# ==================== FEEDS ICALENDAR ====================
+
+def _resposta_ical(recurso, objeto_id, nome_arquivo):
+    corpo = conteudo_feed(recurso, objeto_id)
+    if isinstance(corpo, str):
+        response = HttpResponse(corpo, content_type='text/calendar; charset=utf-8')
+    else:
+        response = StreamingHttpResponse(corpo, content_type='text/calendar; charset=utf-8')
+
+    response['ETag'] = etag_feed(recurso, objeto_id)
+    response['Content-Disposition'] = f'inline; filename="{nome_arquivo}"'
+    # Clientes de calendário consultam a cada 15 minutos; revalidam via ETag
+    patch_cache_control(response, max_age=15 * 60)
+    return response
+
+
+@condition(etag_func=lambda request: etag_feed('geral'))
+def ical_eventos(request):
+    """Feed .ics com a agenda geral de eventos"""
+    return _resposta_ical('geral', 0, 'eventos.ics')
+
+
+@condition(etag_func=lambda request, voluntario_id: etag_feed('voluntario', voluntario_id))
+def ical_voluntario(request, voluntario_id):
+    """Feed .ics com a escala de um voluntário"""
+    return _resposta_ical('voluntario', voluntario_id, f'escala_voluntario_{voluntario_id}.ics')
+
+
+@condition(etag_func=lambda request, veiculo_id: etag_feed('veiculo', veiculo_id))
+def ical_veiculo(request, veiculo_id):
+    """Feed .ics com a agenda de um veículo"""
+    return _resposta_ical('veiculo', veiculo_id, f'agenda_veiculo_{veiculo_id}.ics')
+
+
 def dashboard_admin(request):
     """Dashboard principal com visão geral do sistema (apenas dados ativos)"""
     hoje = timezone.now().date()
     
     # Estatísticas apenas de registros ativos
-    total_voluntarios = Voluntario.objects.filter(ativo=True).count()
-    voluntarios_ativos = Voluntario.objects.filter(status='ativo', ativo=True).count()
-    total_eventos = Evento.objects.filter(ativo=True).count()
-    total_veiculos = Veiculo.objects.filter(ativo=True).count()
+    total_voluntarios = Voluntario.ativos.count()
+    voluntarios_ativos = Voluntario.ativos.filter(status='ativo').count()
+    total_eventos = Evento.ativos.count()
+    total_veiculos = Veiculo.ativos.count()
     
-    eventos_proximos = Evento.objects.filter(
-        ativo=True,
+    eventos_proximos = Evento.ativos.filter(
         data_evento__gte=hoje,
         data_evento__lte=hoje + timedelta(days=30),
         status__in=['planejamento', 'confirmado']
-    ).order_by('data_evento', 'hora_inicio')[:5]
+    ).with_counts().order_by('data_evento', 'hora_inicio')[:5]
     
-    eventos_mes = Evento.objects.filter(
-        ativo=True,
+    eventos_mes = Evento.ativos.filter(
         data_evento__year=hoje.year,
         data_evento__month=hoje.month
     ).count()
     
-    voluntarios_mais_ativos = Voluntario.objects.filter(ativo=True).annotate(
+    voluntarios_mais_ativos = Voluntario.ativos.all().annotate(
         num_eventos=Count('voluntarioevento', filter=Q(voluntarioevento__ativo=True))
     ).filter(num_eventos__gt=0).order_by('-num_eventos')[:5]
     
-    veiculos_mais_usados = Veiculo.objects.filter(ativo=True).annotate(
+    veiculos_mais_usados = Veiculo.ativos.all().annotate(
         num_eventos=Count('eventoveiculo', filter=Q(eventoveiculo__ativo=True))
     ).filter(num_eventos__gt=0).order_by('-num_eventos')[:5]
     
-    eventos_por_status = Evento.objects.filter(ativo=True).values('status').annotate(
+    eventos_por_status = Evento.ativos.all().values('status').annotate(
         total=Count('id')
     )
     
     alertas = []
     
-    eventos_sem_voluntarios = Evento.objects.filter(
-        ativo=True,
+    eventos_sem_voluntarios = Evento.ativos.filter(
         data_evento__gte=hoje,
         status__in=['planejamento', 'confirmado']
     ).annotate(
@@ -1396,13 +1813,29 @@ def dashboard_admin(request):
             'mensagem': f'{eventos_sem_voluntarios.count()} evento(s) futuro(s) sem voluntários alocados'
         })
     
-    veiculos_manutencao = Veiculo.objects.filter(status='manutencao', ativo=True).count()
+    # Dupla alocação nas próximas semanas (ex.: evento remarcado sobre outro)
+    conflitos_agenda = conflitos_proximos(hoje)
+    if conflitos_agenda:
+        alertas.append({
+            'tipo': 'error',
+            'mensagem': f'{len(conflitos_agenda)} conflito(s) de agenda nos próximos {JANELA_PAINEL.days} dias. '
+                        f'Primeiro: {descrever(conflitos_agenda[0])}'
+        })
+    
+    veiculos_manutencao = Veiculo.ativos.filter(status='manutencao').count()
     if veiculos_manutencao > 0:
         alertas.append({
             'tipo': 'info',
             'mensagem': f'{veiculos_manutencao} veículo(s) em manutenção'
         })
     
+    eventos_sem_frota = eventos_sem_veiculo().order_by().values('evento_id').distinct().count()
+    if eventos_sem_frota > 0:
+        alertas.append({
+            'tipo': 'warning',
+            'mensagem': f'{eventos_sem_frota} evento(s) futuro(s) com veículo em manutenção ou indisponível'
+        })
+    
     context = {
         'total_voluntarios': total_voluntarios,
         'voluntarios_ativos': voluntarios_ativos,
@@ -1420,41 +1853,84 @@ def dashboard_admin(request):
 
 # ==================== APIs JSON para AJAX ====================
 
+def _ler_horario(params):
+    """Converte data_evento, hora_inicio e hora_fim da query string (ValueError se inválidos)"""
+    data_evento = datetime.strptime(params.get('data_evento', ''), '%Y-%m-%d').date()
+    hora_inicio = datetime.strptime(params.get('hora_inicio', ''), '%H:%M').time()
+    hora_fim = datetime.strptime(params.get('hora_fim', ''), '%H:%M').time()
+    return data_evento, hora_inicio, hora_fim
+
+
+def _conflitos_voluntario(data_evento, hora_inicio, hora_fim, evento_id=None):
+    """Alocações ativas que se sobrepõem ao horário informado"""
+    conflitos = VoluntarioEvento.ativos.filter(evento__ativo=True).sobrepostos(
+        *intervalo_evento(data_evento, hora_inicio, hora_fim)
+    )
+    
+    # Excluir evento atual se estiver editando
+    if evento_id:
+        conflitos = conflitos.exclude(evento_id=evento_id)
+    
+    return conflitos
+
+
+def _conflitos_veiculo(data_evento, hora_inicio, hora_fim, evento_id=None):
+    """Veículos de eventos ativos que se sobrepõem ao horário informado"""
+    conflitos = EventoVeiculo.ativos.filter(evento__ativo=True).sobrepostos(
+        *intervalo_evento(data_evento, hora_inicio, hora_fim)
+    )
+    
+    if evento_id:
+        conflitos = conflitos.exclude(evento_id=evento_id)
+    
+    return conflitos
+
+
+def _voluntarios_livres(data_evento, hora_inicio, hora_fim, evento_id=None):
+    """Voluntários ativos sem conflito no horário, em uma única consulta"""
+    ocupados = _conflitos_voluntario(data_evento, hora_inicio, hora_fim, evento_id)
+    return Voluntario.ativos.filter(status='ativo').exclude(
+        id__in=ocupados.values('voluntario_id')
+    ).only('id', 'nome_completo', 'agencia', 'setor')
+
+
+def _mensagem_conflito(recurso, evento_conflito):
+    return (
+        f'{recurso} já alocado no evento "{evento_conflito.nome_escola}" '
+        f'em {evento_conflito.data_evento.strftime("%d/%m/%Y")} '
+        f'das {evento_conflito.hora_inicio.strftime("%H:%M")} '
+        f'às {evento_conflito.hora_fim.strftime("%H:%M")}'
+    )
+
+
+def _voluntario_json(vol):
+    return {
+        'id': vol.id,
+        'nome': vol.nome_completo,
+        'agencia': vol.get_agencia_display(),
+        'setor': vol.setor
+    }
+
+
 def api_verificar_disponibilidade_voluntario(request):
     """API para verificar se voluntário está disponível em determinado horário"""
     if request.method == "GET":
         voluntario_id = request.GET.get('voluntario_id')
-        data_evento = request.GET.get('data_evento')
-        hora_inicio = request.GET.get('hora_inicio')
-        hora_fim = request.GET.get('hora_fim')
         evento_id = request.GET.get('evento_id', None)  # Para excluir evento atual na edição
         
         try:
             voluntario = Voluntario.objects.get(id=voluntario_id)
-            data_evento_obj = datetime.strptime(data_evento, '%Y-%m-%d').date()
-            hora_inicio_obj = datetime.strptime(hora_inicio, '%H:%M').time()
-            hora_fim_obj = datetime.strptime(hora_fim, '%H:%M').time()
+            data_evento_obj, hora_inicio_obj, hora_fim_obj = _ler_horario(request.GET)
             
             # Verificar conflitos
-            conflitos = VoluntarioEvento.objects.filter(
-                voluntario=voluntario,
-                evento__data_evento=data_evento_obj,
-                evento__hora_inicio__lt=hora_fim_obj,
-                evento__hora_fim__gt=hora_inicio_obj
-            )
+            conflito = _conflitos_voluntario(
+                data_evento_obj, hora_inicio_obj, hora_fim_obj, evento_id
+            ).filter(voluntario=voluntario).select_related('evento').first()
             
-            # Excluir evento atual se estiver editando
-            if evento_id:
-                conflitos = conflitos.exclude(evento_id=evento_id)
-            
-            if conflitos.exists():
-                evento_conflito = conflitos.first().evento
+            if conflito:
                 return JsonResponse({
                     'disponivel': False,
-                    'mensagem': f'Voluntário já alocado no evento "{evento_conflito.nome_escola}" '
-                               f'em {evento_conflito.data_evento.strftime("%d/%m/%Y")} '
-                               f'das {evento_conflito.hora_inicio.strftime("%H:%M")} '
-                               f'às {evento_conflito.hora_fim.strftime("%H:%M")}'
+                    'mensagem': _mensagem_conflito('Voluntário', conflito.evento)
                 })
             
             return JsonResponse({
@@ -1475,16 +1951,11 @@ def api_verificar_disponibilidade_veiculo(request):
     """API para verificar se veículo está disponível em determinado horário"""
     if request.method == "GET":
         veiculo_id = request.GET.get('veiculo_id')
-        data_evento = request.GET.get('data_evento')
-        hora_inicio = request.GET.get('hora_inicio')
-        hora_fim = request.GET.get('hora_fim')
         evento_id = request.GET.get('evento_id', None)
         
         try:
             veiculo = Veiculo.objects.get(id=veiculo_id)
-            data_evento_obj = datetime.strptime(data_evento, '%Y-%m-%d').date()
-            hora_inicio_obj = datetime.strptime(hora_inicio, '%H:%M').time()
-            hora_fim_obj = datetime.strptime(hora_fim, '%H:%M').time()
+            data_evento_obj, hora_inicio_obj, hora_fim_obj = _ler_horario(request.GET)
             
             if veiculo.status != 'disponivel':
                 return JsonResponse({
@@ -1492,24 +1963,14 @@ def api_verificar_disponibilidade_veiculo(request):
                     'mensagem': f'Veículo está {veiculo.get_status_display()}'
                 })
             
-            conflitos = EventoVeiculo.objects.filter(
-                veiculo=veiculo,
-                evento__data_evento=data_evento_obj,
-                evento__hora_inicio__lt=hora_fim_obj,
-                evento__hora_fim__gt=hora_inicio_obj
-            )
-            
-            if evento_id:
-                conflitos = conflitos.exclude(evento_id=evento_id)
+            conflito = _conflitos_veiculo(
+                data_evento_obj, hora_inicio_obj, hora_fim_obj, evento_id
+            ).filter(veiculo=veiculo).select_related('evento').first()
             
-            if conflitos.exists():
-                evento_conflito = conflitos.first().evento
+            if conflito:
                 return JsonResponse({
                     'disponivel': False,
-                    'mensagem': f'Veículo já alocado no evento "{evento_conflito.nome_escola}" '
-                               f'em {evento_conflito.data_evento.strftime("%d/%m/%Y")} '
-                               f'das {evento_conflito.hora_inicio.strftime("%H:%M")} '
-                               f'às {evento_conflito.hora_fim.strftime("%H:%M")}'
+                    'mensagem': _mensagem_conflito('Veículo', conflito.evento)
                 })
             
             return JsonResponse({
@@ -1528,41 +1989,15 @@ def api_verificar_disponibilidade_veiculo(request):
 def api_voluntarios_disponiveis(request):
     """API para listar voluntários disponíveis em determinado horário (apenas ativos)"""
     if request.method == "GET":
-        data_evento = request.GET.get('data_evento')
-        hora_inicio = request.GET.get('hora_inicio')
-        hora_fim = request.GET.get('hora_fim')
         evento_id = request.GET.get('evento_id', None)
         
         try:
-            data_evento_obj = datetime.strptime(data_evento, '%Y-%m-%d').date()
-            hora_inicio_obj = datetime.strptime(hora_inicio, '%H:%M').time()
-            hora_fim_obj = datetime.strptime(hora_fim, '%H:%M').time()
+            data_evento_obj, hora_inicio_obj, hora_fim_obj = _ler_horario(request.GET)
             
-            # Buscar apenas voluntários ativos
-            voluntarios = Voluntario.objects.filter(status='ativo', ativo=True)
-            
-            # Filtrar disponíveis
-            disponiveis = []
-            for vol in voluntarios:
-                conflitos = VoluntarioEvento.objects.filter(
-                    voluntario=vol,
-                    evento__data_evento=data_evento_obj,
-                    evento__hora_inicio__lt=hora_fim_obj,
-                    evento__hora_fim__gt=hora_inicio_obj,
-                    evento__ativo=True,
-                    ativo=True
-                )
-                
-                if evento_id:
-                    conflitos = conflitos.exclude(evento_id=evento_id)
-                
-                if not conflitos.exists():
-                    disponiveis.append({
-                        'id': vol.id,
-                        'nome': vol.nome_completo,
-                        'agencia': vol.get_agencia_display(),
-                        'setor': vol.setor
-                    })
+            disponiveis = [
+                _voluntario_json(vol)
+                for vol in _voluntarios_livres(data_evento_obj, hora_inicio_obj, hora_fim_obj, evento_id)
+            ]
             
             return JsonResponse({
                 'total': len(disponiveis),
@@ -1576,28 +2011,125 @@ def api_voluntarios_disponiveis(request):
     
     return JsonResponse({'erro': 'Método não permitido'}, status=405)
 
+CANDIDATOS_POR_PAGINA = 20
+
+
+def api_candidatos_evento(request, evento_id):
+    """
+    Voluntários livres no horário do evento e ainda fora dele, filtrados por
+    nome, agência ou setor e paginados no banco (LIMIT), para o seletor do
+    modal de adicionar voluntário.
+    """
+    if request.method != "GET":
+        return JsonResponse({'erro': 'Método não permitido'}, status=405)
+    
+    evento = get_object_or_404(Evento.objects.only('data_evento', 'hora_inicio', 'hora_fim'), id=evento_id)
+    busca = request.GET.get('q', '').strip()
+    try:
+        pagina = max(int(request.GET.get('pagina', 1)), 1)
+    except ValueError:
+        return JsonResponse({'erro': 'Página inválida'}, status=400)
+    
+    candidatos = _voluntarios_livres(
+        evento.data_evento, evento.hora_inicio, evento.hora_fim, evento.id
+    ).exclude(
+        id__in=VoluntarioEvento.objects.filter(evento=evento).values('voluntario_id')
+    )
+    
+    if busca:
+        agencias = [
+            codigo for codigo, nome in Voluntario.AGENCIAS_CHOICES
+            if busca.lower() in nome.lower()
+        ]
+        candidatos = candidatos.filter(
+            Q(nome_completo__icontains=busca) |
+            Q(setor__icontains=busca) |
+            Q(agencia__in=agencias)
+        )
+    
+    # Um registro a mais indica se há próxima página, sem COUNT(*)
+    inicio = (pagina - 1) * CANDIDATOS_POR_PAGINA
+    linhas = list(candidatos.order_by('nome_completo', 'id')[inicio:inicio + CANDIDATOS_POR_PAGINA + 1])
+    
+    return JsonResponse({
+        'pagina': pagina,
+        'tem_mais': len(linhas) > CANDIDATOS_POR_PAGINA,
+        'voluntarios': [_voluntario_json(vol) for vol in linhas[:CANDIDATOS_POR_PAGINA]],
+    })
+
+
+MAX_SUBSTITUTOS = 20
+
+
+def api_impacto_reagendamento(request, evento_id):
+    """API com a prévia de uma mudança de horário: quem entraria em conflito e quem está livre"""
+    if request.method != "GET":
+        return JsonResponse({'erro': 'Método não permitido'}, status=405)
+    
+    try:
+        data_evento_obj, hora_inicio_obj, hora_fim_obj = _ler_horario(request.GET)
+    except ValueError:
+        return JsonResponse({'erro': 'Data ou horário inválido'}, status=400)
+    
+    if hora_inicio_obj == hora_fim_obj:
+        return JsonResponse({'erro': 'A hora de término deve ser diferente da hora de início'}, status=400)
+    
+    if not Evento.ativos.filter(id=evento_id).exists():
+        return JsonResponse({'erro': 'Evento não encontrado'}, status=404)
+    
+    horario = (data_evento_obj, hora_inicio_obj, hora_fim_obj)
+    alocados = VoluntarioEvento.ativos.filter(evento_id=evento_id).values('voluntario_id')
+    vinculados = EventoVeiculo.ativos.filter(evento_id=evento_id).values('veiculo_id')
+    
+    # Alocações atuais que colidiriam no novo horário (uma consulta por recurso)
+    voluntarios_conflito = _conflitos_voluntario(*horario, evento_id).filter(
+        voluntario_id__in=alocados
+    ).select_related('voluntario', 'evento').order_by('voluntario__nome_completo')
+    
+    veiculos_conflito = _conflitos_veiculo(*horario, evento_id).filter(
+        veiculo_id__in=vinculados
+    ).select_related('veiculo', 'evento').order_by('veiculo__nome')
+    
+    # Substitutos livres no novo horário que ainda não estão no evento
+    voluntarios_livres = _voluntarios_livres(*horario, evento_id).exclude(
+        id__in=alocados
+    ).order_by('nome_completo')[:MAX_SUBSTITUTOS]
+    
+    veiculos_livres = Veiculo.ativos.filter(status='disponivel').exclude(
+        id__in=_conflitos_veiculo(*horario, evento_id).values('veiculo_id')
+    ).exclude(id__in=vinculados).only('id', 'nome', 'placa', 'capacidade').order_by('nome')
+    
+    return JsonResponse({
+        'conflitos': {
+            'voluntarios': [
+                dict(_voluntario_json(ve.voluntario), mensagem=_mensagem_conflito(
+                    ve.voluntario.nome_completo, ve.evento
+                ))
+                for ve in voluntarios_conflito
+            ],
+            'veiculos': [
+                {
+                    'id': ev.veiculo.id,
+                    'nome': ev.veiculo.nome,
+                    'mensagem': _mensagem_conflito(ev.veiculo.nome, ev.evento),
+                }
+                for ev in veiculos_conflito
+            ],
+        },
+        'substitutos': {
+            'voluntarios': [_voluntario_json(vol) for vol in voluntarios_livres],
+            'veiculos': [
+                {'id': v.id, 'nome': v.nome, 'placa': v.placa, 'capacidade': v.capacidade}
+                for v in veiculos_livres
+            ],
+        },
+    })
+
 def api_estatisticas_evento(request, evento_id):
     """API para retornar estatísticas de um evento específico"""
     try:
-        evento = Evento.objects.get(id=evento_id)
-        voluntarios_evento = VoluntarioEvento.objects.filter(evento=evento)
-        
-        stats = {
-            'total_voluntarios': voluntarios_evento.count(),
-            'confirmados': voluntarios_evento.filter(presenca='confirmado').count(),
-            'presentes': voluntarios_evento.filter(presenca='presente').count(),
-            'ausentes': voluntarios_evento.filter(presenca='ausente').count(),
-            'cancelados': voluntarios_evento.filter(presenca='cancelado').count(),
-        }
-
-        
-        # Voluntários por função
-        por_funcao = {}
-        for ve in voluntarios_evento:
-            funcao = ve.funcao_customizada if ve.funcao == 'outro' else ve.get_funcao_display()
-            por_funcao[funcao] = por_funcao.get(funcao, 0) + 1
-        
-        stats['por_funcao'] = por_funcao
+        evento = Evento.objects.only('id').get(id=evento_id)
+        stats = estatisticas_eventos([evento.id])[evento.id]
         
         return JsonResponse(stats)
         
@@ -1607,6 +2139,251 @@ def api_estatisticas_evento(request, evento_id):
         return JsonResponse({'erro': str(e)}, status=400)
 
 
+MAX_EVENTOS_ESTATISTICAS = 100
+
+
+def api_estatisticas_eventos(request):
+    """API para retornar estatísticas de vários eventos de uma vez (ex.: ?ids=1,2,3)"""
+    if request.method == "GET":
+        ids_raw = ','.join(request.GET.getlist('ids'))
+        
+        try:
+            evento_ids = sorted({int(valor) for valor in ids_raw.split(',') if valor.strip()})
+        except ValueError:
+            return JsonResponse({'erro': 'IDs de eventos inválidos'}, status=400)
+        
+        if not evento_ids:
+            return JsonResponse({'erro': 'Informe ao menos um evento'}, status=400)
+        
+        if len(evento_ids) > MAX_EVENTOS_ESTATISTICAS:
+            return JsonResponse({
+                'erro': f'Máximo de {MAX_EVENTOS_ESTATISTICAS} eventos por consulta'
+            }, status=400)
+        
+        existentes = Evento.objects.filter(id__in=evento_ids).values_list('id', flat=True)
+        stats = estatisticas_eventos(existentes)
+        
+        return JsonResponse({
+            'eventos': {str(evento_id): dados for evento_id, dados in stats.items()}
+        })
+    
+    return JsonResponse({'erro': 'Método não permitido'}, status=405)
+
+
+def api_horas_voluntariado(request):
+    """API com horas servidas e taxa de faltas por agência, setor ou voluntário"""
+    if request.method == "GET":
+        agrupamento = request.GET.get('agrupar_por', 'agencia')
+        hoje = timezone.localdate()
+        data_inicio = request.GET.get('data_inicio')
+        data_fim = request.GET.get('data_fim')
+        
+        if agrupamento not in AGRUPAMENTOS:
+            return JsonResponse({
+                'erro': f'Agrupamento inválido. Use: {", ".join(AGRUPAMENTOS)}'
+            }, status=400)
+        
+        try:
+            data_inicio_obj = (
+                datetime.strptime(data_inicio, '%Y-%m-%d').date()
+                if data_inicio else hoje.replace(month=1, day=1)
+            )
+            data_fim_obj = (
+                datetime.strptime(data_fim, '%Y-%m-%d').date()
+                if data_fim else hoje.replace(month=12, day=31)
+            )
+        except ValueError:
+            return JsonResponse({'erro': 'Datas devem estar no formato AAAA-MM-DD'}, status=400)
+        
+        if data_inicio_obj > data_fim_obj:
+            return JsonResponse({'erro': 'A data inicial deve ser anterior à data final'}, status=400)
+        
+        resultados = resumo_horas(agrupamento, data_inicio_obj, data_fim_obj)
+        
+        return JsonResponse({
+            'agrupar_por': agrupamento,
+            'data_inicio': data_inicio_obj.isoformat(),
+            'data_fim': data_fim_obj.isoformat(),
+            'total': len(resultados),
+            'resultados': resultados,
+        })
+    
+    return JsonResponse({'erro': 'Método não permitido'}, status=405)
+
+
+# ==================== APIs JSON assíncronas (ASGI) ====================
+
+# Soma de voluntario_id e veiculo_id aceitos por consulta, como em api_estatisticas_eventos
+MAX_IDS_DISPONIBILIDADE = 100
+
+
+async def _averificar_voluntarios(voluntario_ids, horario, evento_id=None):
+    """Disponibilidade de vários voluntários em duas consultas (existência e conflitos)"""
+    existentes = {
+        vid async for vid in Voluntario.objects.filter(id__in=voluntario_ids).values_list('id', flat=True)
+    }
+    conflitos = {}
+    async for conflito in _conflitos_voluntario(*horario, evento_id).filter(
+        voluntario_id__in=existentes
+    ).select_related('evento').order_by('inicio'):
+        conflitos.setdefault(conflito.voluntario_id, conflito)
+    
+    resultados = []
+    for vid in voluntario_ids:
+        if vid not in existentes:
+            resultados.append({'id': vid, 'disponivel': False, 'mensagem': 'Voluntário não encontrado'})
+        elif vid in conflitos:
+            resultados.append({
+                'id': vid,
+                'disponivel': False,
+                'mensagem': _mensagem_conflito('Voluntário', conflitos[vid].evento)
+            })
+        else:
+            resultados.append({'id': vid, 'disponivel': True, 'mensagem': 'Voluntário disponível'})
+    return resultados
+
+
+async def _averificar_veiculos(veiculo_ids, horario, evento_id=None):
+    """Disponibilidade de vários veículos em duas consultas (status e conflitos)"""
+    veiculos = {
+        veiculo.id: veiculo
+        async for veiculo in Veiculo.objects.filter(id__in=veiculo_ids).only('status', 'ativo')
+    }
+    livres = [vid for vid, veiculo in veiculos.items() if veiculo.status == 'disponivel' and veiculo.ativo]
+    conflitos = {}
+    async for conflito in _conflitos_veiculo(*horario, evento_id).filter(
+        veiculo_id__in=livres
+    ).select_related('evento').order_by('inicio'):
+        conflitos.setdefault(conflito.veiculo_id, conflito)
+    
+    resultados = []
+    for vid in veiculo_ids:
+        veiculo = veiculos.get(vid)
+        if veiculo is None:
+            resultados.append({'id': vid, 'disponivel': False, 'mensagem': 'Veículo não encontrado'})
+        elif vid not in livres:
+            resultados.append({
+                'id': vid,
+                'disponivel': False,
+                'mensagem': f'Veículo está {veiculo.get_status_display()}'
+            })
+        elif vid in conflitos:
+            resultados.append({
+                'id': vid,
+                'disponivel': False,
+                'mensagem': _mensagem_conflito('Veículo', conflitos[vid].evento)
+            })
+        else:
+            resultados.append({'id': vid, 'disponivel': True, 'mensagem': 'Veículo disponível'})
+    return resultados
+
+
+def _ler_ids(params, nome):
+    return [int(valor) for valor in params.getlist(nome) if valor.strip()]
+
+
+async def api_disponibilidade_async(request):
+    """
+    API assíncrona para verificar vários voluntários e veículos de uma vez
+    (ex.: ?voluntario_id=1&voluntario_id=2&veiculo_id=3&data_evento=...).
+
+    O ORM assíncrono do Django executa cada consulta via sync_to_async em uma
+    única thread, então consultas disparadas com asyncio.gather rodariam uma
+    após a outra. Em vez de uma consulta por id, cada tipo de recurso é
+    verificado em duas consultas (quatro no total, qualquer que seja o número
+    de ids); o ganho do ASGI está em não prender um worker por requisição.
+    """
+    if request.method != "GET":
+        return JsonResponse({'erro': 'Método não permitido'}, status=405)
+    
+    try:
+        evento_id = int(request.GET['evento_id']) if request.GET.get('evento_id') else None
+        horario = _ler_horario(request.GET)
+        voluntario_ids = _ler_ids(request.GET, 'voluntario_id')
+        veiculo_ids = _ler_ids(request.GET, 'veiculo_id')
+    except ValueError as e:
+        return JsonResponse({'erro': f'Parâmetros inválidos: {str(e)}'}, status=400)
+    
+    if len(voluntario_ids) + len(veiculo_ids) > MAX_IDS_DISPONIBILIDADE:
+        return JsonResponse({
+            'erro': f'Máximo de {MAX_IDS_DISPONIBILIDADE} voluntários e veículos por consulta'
+        }, status=400)
+    
+    return JsonResponse({
+        'voluntarios': await _averificar_voluntarios(voluntario_ids, horario, evento_id),
+        'veiculos': await _averificar_veiculos(veiculo_ids, horario, evento_id),
+    })
+
+
+async def api_voluntarios_disponiveis_async(request):
+    """Versão assíncrona de api_voluntarios_disponiveis"""
+    if request.method != "GET":
+        return JsonResponse({'erro': 'Método não permitido'}, status=405)
+    
+    try:
+        evento_id = int(request.GET['evento_id']) if request.GET.get('evento_id') else None
+        horario = _ler_horario(request.GET)
+    except ValueError as e:
+        return JsonResponse({'erro': f'Erro ao buscar voluntários: {str(e)}'}, status=400)
+    
+    disponiveis = [
+        _voluntario_json(vol)
+        async for vol in _voluntarios_livres(*horario, evento_id)
+    ]
+    
+    return JsonResponse({
+        'total': len(disponiveis),
+        'voluntarios': disponiveis
+    })
+
+
+async def api_estatisticas_evento_async(request, evento_id):
+    """Versão assíncrona de api_estatisticas_evento"""
+    if not await Evento.objects.filter(id=evento_id).aexists():
+        return JsonResponse({'erro': 'Evento não encontrado'}, status=404)
+    
+    stats = await aestatisticas_eventos([evento_id])
+    return JsonResponse(stats[evento_id])
+
+
+# ==================== FEED AO VIVO (SSE) ====================
+
+INTERVALO_HEARTBEAT = 15
+
+
+def _feed_ao_vivo(request):
+    """O feed só roda sob ASGI: no WSGI cada conexão aberta prenderia um worker"""
+    return isinstance(request, ASGIRequest)
+
+
+async def stream_evento(request, evento_id):
+    """Server-sent events com as alterações de presença e veículos de um evento"""
+    if not _feed_ao_vivo(request):
+        # 204 faz o EventSource desistir em vez de reconectar
+        return HttpResponse(status=204)
+    if not await Evento.objects.filter(id=evento_id).aexists():
+        return JsonResponse({'erro': 'Evento não encontrado'}, status=404)
+    
+    async def fluxo():
+        assinatura = await get_broker().assinar(evento_id)
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                mensagem = await assinatura.receber(timeout=INTERVALO_HEARTBEAT)
+                if mensagem is None:
+                    # Comentário SSE mantém a conexão viva através de proxies
+                    yield ': ping\n\n'
+                else:
+                    yield f'event: {mensagem["tipo"]}\ndata: {json.dumps(mensagem)}\n\n'
+        finally:
+            await assinatura.fechar()
+    
+    response = StreamingHttpResponse(fluxo(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # ==================== FUNÇÕES AUXILIARES ====================
 
 def validar_cpf(cpf):